@@ -0,0 +1,260 @@
+# asset_codec.py
+# TextAsset 文本的加密/解密编解码器。
+# 游戏中的本地化 TextAsset 以 Base64(AES-256-ECB(UTF-8 文本, PKCS7)) 的形式保存在 m_Script 中，
+# 与 HollowKnight_TextAssetDecryptor.exe 的 -e/-d 处理结果一致 (外部工具写出的文件另带 UTF-8 BOM)。
+# - AesEcbCodec: 进程内加解密，需要可选依赖 cryptography 或 pycryptodome；
+# - SubprocessCodec: 回退方案，把文本暂存到临时目录后调用外部工具一次性处理；
+# - IdentityCodec: 不做任何变换，用于测试。
+import base64
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from localization_core import get_config
+
+HK_TEXT_KEY = b"UKu52ePUBwetZ9wNX88o54dnfKRu0T1l"
+AES_BLOCK_SIZE = 16
+
+# 已知答案：外部工具 -e 对 KAT_PLAINTEXT 的输出 (去掉 BOM)，'auto' 选用进程内加密前先核对
+KAT_PLAINTEXT = '<entry name="KAT">大黄蜂 Hornet ✓</entry>'
+KAT_CIPHERTEXT = 'E1ah1YtDDCPlQgDA3hpgUJIqX+7u+ptHrHHehSc60bY5h4zBwD1ZvYc7alNhhzeA'
+
+# 可选依赖：优先 cryptography，其次 pycryptodome
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    _AES_BACKEND = 'cryptography'
+except ImportError:
+    try:
+        from Crypto.Cipher import AES
+        _AES_BACKEND = 'pycryptodome'
+    except ImportError:
+        _AES_BACKEND = None
+
+
+def parse_path_id_from_filename(filename: str) -> str:
+    """
+    从形如 'Asset_46_46_base64.txt' 的文件名中解析出 Path ID (例如 '46')。
+    """
+    match = re.match(r'Asset_(\d+)_', filename)
+    if match:
+        return match.group(1)
+    # 对于不符合命名规范的文件，返回 None 或空字符串
+    return None
+
+def path_id_filename(path_id: str) -> str:
+    """parse_path_id_from_filename 的逆操作，生成外部工具可处理的文件名。"""
+    return f"Asset_{path_id}_{path_id}_base64.txt"
+
+def run_decryptor(input_dir, output_dir, mode):
+    """
+    调用 HollowKnight_TextAssetDecryptor.exe 进行解密或加密。
+
+    :param input_dir: 输入目录 (-d)
+    :param output_dir: 输出目录 (-o)
+    :param mode: 操作模式 ('-d' 解密, '-e' 加密)
+    :return: 外部程序运行是否成功 (bool)
+    """
+    DECRYPTOR_EXE = get_config('DECRYPTOR_TOOL_PATH')
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 构建命令行参数
+    command = [
+        DECRYPTOR_EXE,
+        mode, input_dir,
+        "-o", output_dir
+    ]
+
+    try:
+        # 使用 subprocess.run 运行外部程序
+        result = subprocess.run(
+            command,
+            capture_output=True,
+            text=True,
+            check=False # 即使外部程序返回非零退出码（失败），也不抛出异常
+        )
+
+        # 检查返回码：0 通常表示成功
+        if result.returncode == 0:
+            return True
+        else:
+            print(f"  ❌ 外部工具运行失败 (返回码 {result.returncode})")
+            print("  --- 外部工具输出 START ---")
+            print(result.stdout)
+            print(result.stderr)
+            print("  --- 外部工具输出 END ---")
+            return False
+
+    except FileNotFoundError:
+        print(f"  ❌ 错误: 找不到可执行文件 {DECRYPTOR_EXE}。请确保它在脚本目录下或已添加到系统PATH中。")
+        return False
+    except Exception as e:
+        print(f"  ❌ 运行外部程序时发生错误: {e}")
+        return False
+
+
+def write_text_file(path: str, text: str):
+    # m_Script 中的二进制内容以 surrogateescape 解码，原样写回
+    with open(path, 'w', encoding='utf-8', errors='surrogateescape', newline='') as f:
+        f.write(text)
+
+
+class TextAssetCodec:
+    """
+    编解码器接口：以 {Path ID: 文本} 为单位批量处理，便于子进程方案一次调用处理全部文件。
+    decrypt_many 会跳过无法解密的内容 (例如并非加密本地化文本的 TextAsset)，与外部工具的行为一致。
+    """
+    name = "base"
+
+    def encrypt_many(self, texts: Dict[str, str]) -> Dict[str, str]:
+        raise NotImplementedError
+
+    def decrypt_many(self, payloads: Dict[str, str]) -> Dict[str, str]:
+        raise NotImplementedError
+
+    def decrypt_files(self, payloads: Dict[str, str], input_dir: str, output_dir: str, max_workers: int = None) -> int:
+        """
+        一步解密全部 TextAsset，并写入 output_dir (文件名与 input_dir 中的 Base64 文件相同)。
+        payloads 为内存中的 {Path ID: Base64}，input_dir 中已有相同内容的文件。返回写出的文件数。
+        """
+        decrypted = self.decrypt_many(payloads)
+        if len(decrypted) < len(payloads):
+            print(f"  -> {len(payloads) - len(decrypted)} 个 TextAsset 不是加密文本，已跳过。")
+        os.makedirs(output_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(
+                lambda item: write_text_file(os.path.join(output_dir, path_id_filename(item[0])), item[1]),
+                decrypted.items()
+            ))
+        return len(decrypted)
+
+
+class IdentityCodec(TextAssetCodec):
+    """不加密，直接把明文作为 m_Script，用于测试打包流程。"""
+    name = "identity"
+
+    def encrypt_many(self, texts: Dict[str, str]) -> Dict[str, str]:
+        return dict(texts)
+
+    def decrypt_many(self, payloads: Dict[str, str]) -> Dict[str, str]:
+        return dict(payloads)
+
+
+class AesEcbCodec(TextAssetCodec):
+    """进程内 AES-256-ECB + PKCS7 + Base64，与外部工具的结果逐字节一致。"""
+    name = "aes"
+
+    def __init__(self, key: bytes = HK_TEXT_KEY):
+        if _AES_BACKEND is None:
+            raise RuntimeError("进程内加密需要安装 cryptography 或 pycryptodome。")
+        self.key = key
+
+    def self_check(self) -> bool:
+        """用外部工具生成的已知答案核对加密与解密结果。"""
+        return (self.encrypt_many({'0': KAT_PLAINTEXT}) == {'0': KAT_CIPHERTEXT}
+                and self.decrypt_many({'0': KAT_CIPHERTEXT}) == {'0': KAT_PLAINTEXT})
+
+    def _cipher_ops(self):
+        if _AES_BACKEND == 'cryptography':
+            cipher = Cipher(algorithms.AES(self.key), modes.ECB())
+            return (lambda data: cipher.encryptor().update(data)), (lambda data: cipher.decryptor().update(data))
+        cipher = AES.new(self.key, AES.MODE_ECB)
+        return cipher.encrypt, cipher.decrypt
+
+    def encrypt_many(self, texts: Dict[str, str]) -> Dict[str, str]:
+        encrypt, _ = self._cipher_ops()
+        result = {}
+        for path_id, text in texts.items():
+            data = text.encode('utf-8')
+            pad = AES_BLOCK_SIZE - len(data) % AES_BLOCK_SIZE
+            result[path_id] = base64.b64encode(encrypt(data + bytes([pad]) * pad)).decode('ascii')
+        return result
+
+    def decrypt_many(self, payloads: Dict[str, str]) -> Dict[str, str]:
+        _, decrypt = self._cipher_ops()
+        result = {}
+        for path_id, payload in payloads.items():
+            try:
+                raw = base64.b64decode(payload.lstrip('\ufeff').strip(), validate=True)
+                if not raw or len(raw) % AES_BLOCK_SIZE:
+                    continue
+                data = decrypt(raw)
+                pad = data[-1]
+                if not 1 <= pad <= AES_BLOCK_SIZE or data[-pad:] != bytes([pad]) * pad:
+                    continue
+                result[path_id] = data[:-pad].decode('utf-8')
+            except ValueError: # Base64 或 UTF-8 解码失败
+                continue
+        return result
+
+
+class SubprocessCodec(TextAssetCodec):
+    """回退方案：在临时目录中暂存文件，调用一次外部工具完成全部加密/解密。"""
+    name = "subprocess"
+
+    def _run(self, items: Dict[str, str], mode: str, strict: bool = True) -> Dict[str, str]:
+        if not items:
+            return {}
+        work_dir = tempfile.mkdtemp(prefix="hk_codec_")
+        try:
+            input_dir = os.path.join(work_dir, "input")
+            output_dir = os.path.join(work_dir, "output")
+            os.makedirs(input_dir)
+            for path_id, text in items.items():
+                with open(os.path.join(input_dir, path_id_filename(path_id)), 'w', encoding='utf-8') as f:
+                    f.write(text)
+            if not run_decryptor(input_dir, output_dir, mode):
+                raise RuntimeError(f"外部工具 ({mode}) 运行失败。")
+            result = {}
+            for filename in os.listdir(output_dir):
+                path_id = parse_path_id_from_filename(filename)
+                if path_id in items:
+                    # 外部工具写出的文件带 BOM，去掉后与 AesEcbCodec 的结果一致
+                    with open(os.path.join(output_dir, filename), 'r', encoding='utf-8-sig') as f:
+                        result[path_id] = f.read()
+            missing = set(items) - set(result)
+            if missing and strict:
+                raise RuntimeError(f"外部工具未输出 {len(missing)} 个文件，例如 Path ID {sorted(missing)[0]}。")
+            return result
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def encrypt_many(self, texts: Dict[str, str]) -> Dict[str, str]:
+        return self._run(texts, "-e")
+
+    def decrypt_many(self, payloads: Dict[str, str]) -> Dict[str, str]:
+        return self._run(payloads, "-d", strict=False)
+
+    def decrypt_files(self, payloads: Dict[str, str], input_dir: str, output_dir: str, max_workers: int = None) -> int:
+        # input_dir 中已经是外部工具需要的文件，直接整体解密，无需再暂存一次
+        if not run_decryptor(input_dir, output_dir, "-d"):
+            raise RuntimeError("外部工具 (-d) 运行失败。")
+        return sum(1 for filename in os.listdir(output_dir) if parse_path_id_from_filename(filename) in payloads)
+
+
+CODECS = {
+    IdentityCodec.name: IdentityCodec,
+    AesEcbCodec.name: AesEcbCodec,
+    SubprocessCodec.name: SubprocessCodec,
+}
+
+def get_codec(name: str = None) -> TextAssetCodec:
+    """
+    按名称 (默认读取配置 ASSET_CODEC) 创建编解码器。
+    'auto': 已安装 AES 依赖且通过已知答案核对时使用进程内加密，否则回退到外部工具。
+    """
+    name = name or get_config('ASSET_CODEC') or 'auto'
+    if name == 'auto':
+        name = SubprocessCodec.name
+        if _AES_BACKEND:
+            if AesEcbCodec().self_check():
+                name = AesEcbCodec.name
+            else:
+                print("  [警告] 进程内 AES 加密与外部工具的已知结果不一致，改用外部工具。")
+    if name not in CODECS:
+        raise ValueError(f"未知的编解码器: {name} (可选: auto, {', '.join(CODECS)})")
+    return CODECS[name]()
@@ -0,0 +1,208 @@
+# asset_patch.py
+# 资源补丁格式：只保存新 resources.assets 相对原始文件的差异，而不是每个版本一份完整副本。
+# 补丁由 COPY (从原始文件复制一段) 与 INSERT (补丁内携带的新数据) 两种操作组成，
+# 操作序列根据两份文件的对象布局 (Path ID -> 偏移/大小) 生成：未修改的对象直接引用原始文件。
+# 应用补丁时通过 mmap 读取原始文件并流式写出，1 GB 以上的资源文件也不需要整体读入内存。
+# 用法:
+#   python asset_patch.py create --source resources.assets --target output/resources_packed_v20.assets --output output/resources_v20.hkpatch
+#   python asset_patch.py apply --patch output/resources_v20.hkpatch --source resources.assets --output resources_new.assets
+#   python asset_patch.py apply --patch output/resources_v20.hkpatch --source resources.assets --in-place
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+from typing import Dict, List, Tuple, Any, BinaryIO
+
+import UnityPy
+
+MAGIC = b'HKPT'
+FORMAT_VERSION = 1
+OP_COPY = 0
+OP_INSERT = 1
+_HEADER = struct.Struct('<4sII')     # magic, 格式版本, JSON 头长度
+_COPY = struct.Struct('<BQQ')        # op, 原始文件偏移, 长度
+_INSERT = struct.Struct('<BQ')       # op, 长度 (后接数据)
+CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def _sha1_of(buffer) -> str:
+    """分块计算 sha1，buffer 可以是 bytes 或 mmap。"""
+    sha1 = hashlib.sha1()
+    view = memoryview(buffer)
+    for start in range(0, len(view), CHUNK_SIZE):
+        sha1.update(view[start:start + CHUNK_SIZE])
+    return sha1.hexdigest()
+
+def object_layout(serialized_file) -> Dict[int, Tuple[int, int]]:
+    """{Path ID: (文件内偏移, 大小)}，只读取对象表。"""
+    return {path_id: (obj.byte_start, obj.byte_size) for path_id, obj in serialized_file.objects.items()}
+
+def _diff_ops(source, target, source_layout: Dict[int, Tuple[int, int]],
+              target_layout: Dict[int, Tuple[int, int]]) -> List[Tuple[int, int, int]]:
+    """
+    按目标文件中的对象顺序生成操作序列 [(op, 偏移, 长度)]：
+    COPY 的偏移指向原始文件，INSERT 的偏移指向目标文件 (写补丁时从目标文件取数据)。
+    同一 Path ID 在原始文件中大小相同且内容逐字节相同时才使用 COPY。
+    """
+    ops: List[Tuple[int, int, int]] = []
+
+    def add(op: int, offset: int, length: int):
+        if length <= 0:
+            return
+        if ops and ops[-1][0] == op and ops[-1][1] + ops[-1][2] == offset:
+            # 与上一个同类操作首尾相接时合并
+            ops[-1] = (op, ops[-1][1], ops[-1][2] + length)
+        else:
+            ops.append((op, offset, length))
+
+    def add_gap(offset: int, length: int):
+        # 对象之间的对齐填充：若原始文件中紧接上一个 COPY 的字节相同，则延长该 COPY
+        if ops and ops[-1][0] == OP_COPY:
+            source_end = ops[-1][1] + ops[-1][2]
+            if source[source_end:source_end + length] == target[offset:offset + length]:
+                add(OP_COPY, source_end, length)
+                return
+        add(OP_INSERT, offset, length)
+
+    position = 0
+    for path_id, (start, size) in sorted(target_layout.items(), key=lambda item: item[1][0]):
+        if start > position:
+            add_gap(position, start - position) # 元数据与对齐填充
+        source_span = source_layout.get(path_id)
+        if source_span and source_span[1] == size and source[source_span[0]:source_span[0] + size] == target[start:start + size]:
+            add(OP_COPY, source_span[0], size)
+        else:
+            add(OP_INSERT, start, size)
+        position = start + size
+    if len(target) > position:
+        add_gap(position, len(target) - position)
+    return ops
+
+def create_patch(source_path: str, target, patch_path: str) -> Dict[str, Any]:
+    """
+    根据原始资源文件与新资源文件 (bytes 或文件路径) 生成补丁。
+    :return: 补丁头信息 (包含操作数量与补丁携带的数据量)。
+    """
+    if isinstance(target, str):
+        with open(target, 'rb') as f:
+            target = f.read()
+    target_view = memoryview(target)
+    source_layout = object_layout(UnityPy.load(source_path).file)
+    target_layout = object_layout(UnityPy.load(bytes(target)).file)
+
+    with open(source_path, 'rb') as source_file, \
+            mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as source:
+        ops = _diff_ops(source, target_view, source_layout, target_layout)
+        header = {
+            "source_size": len(source),
+            "source_sha1": _sha1_of(source),
+            "target_size": len(target_view),
+            "target_sha1": _sha1_of(target_view),
+            "ops": len(ops),
+            "insert_bytes": sum(length for op, _, length in ops if op == OP_INSERT),
+        }
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    os.makedirs(os.path.dirname(patch_path) or '.', exist_ok=True)
+    with open(patch_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for op, offset, length in ops:
+            if op == OP_COPY:
+                f.write(_COPY.pack(OP_COPY, offset, length))
+            else:
+                f.write(_INSERT.pack(OP_INSERT, length))
+                f.write(target_view[offset:offset + length])
+    return header
+
+def read_patch_header(patch_file: BinaryIO) -> Dict[str, Any]:
+    data = patch_file.read(_HEADER.size)
+    if len(data) != _HEADER.size:
+        raise ValueError("不是有效的资源补丁文件。")
+    magic, version, header_length = _HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError("不是有效的资源补丁文件。")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"不支持的补丁格式版本: {version}")
+    return json.loads(patch_file.read(header_length).decode('utf-8'))
+
+def apply_patch(patch_path: str, source_path: str, output_path: str = None, in_place: bool = False) -> str:
+    """
+    将补丁应用到原始资源文件，流式写出新文件；校验原始文件与结果的 sha1。
+    in_place=True 时先写入临时文件，校验通过后替换原始文件。
+    """
+    if not in_place and not output_path:
+        raise ValueError("需要指定输出文件或使用 in_place。")
+    write_path = source_path + ".patching" if in_place else output_path
+
+    with open(patch_path, 'rb') as patch_file:
+        header = read_patch_header(patch_file)
+        with open(source_path, 'rb') as source_file, \
+                mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as source:
+            if len(source) != header["source_size"] or _sha1_of(source) != header["source_sha1"]:
+                raise ValueError(f"{source_path} 与生成补丁时使用的原始文件不一致。")
+
+            sha1 = hashlib.sha1()
+            try:
+                with open(write_path, 'wb') as output:
+                    for _ in range(header["ops"]):
+                        op = patch_file.read(1)
+                        if op == bytes([OP_COPY]):
+                            _, offset, length = _COPY.unpack(op + patch_file.read(_COPY.size - 1))
+                            if offset + length > len(source):
+                                raise ValueError("补丁已损坏 (COPY 超出原始文件范围)。")
+                            chunks = (source[start:min(start + CHUNK_SIZE, offset + length)]
+                                      for start in range(offset, offset + length, CHUNK_SIZE))
+                        elif op == bytes([OP_INSERT]):
+                            _, length = _INSERT.unpack(op + patch_file.read(_INSERT.size - 1))
+                            chunks = (patch_file.read(min(CHUNK_SIZE, length - done))
+                                      for done in range(0, length, CHUNK_SIZE))
+                        else:
+                            raise ValueError("补丁已损坏 (未知操作)。")
+                        for chunk in chunks:
+                            sha1.update(chunk)
+                            output.write(chunk)
+                    if patch_file.read(1):
+                        raise ValueError("补丁已损坏 (结尾存在多余数据)。")
+                if sha1.hexdigest() != header["target_sha1"]:
+                    raise ValueError("补丁应用结果校验失败 (sha1 不一致)。")
+            except BaseException as e:
+                if os.path.exists(write_path):
+                    os.remove(write_path)
+                if isinstance(e, struct.error):
+                    raise ValueError("补丁已损坏 (文件被截断)。") from e
+                raise
+
+    if in_place:
+        os.replace(write_path, source_path)
+        return source_path
+    return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="resources.assets 补丁的生成与应用")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    create_parser = subparsers.add_parser('create', help="根据原始文件与打包结果生成补丁")
+    create_parser.add_argument('--source', default="resources.assets")
+    create_parser.add_argument('--target', required=True)
+    create_parser.add_argument('--output', required=True)
+    apply_parser = subparsers.add_parser('apply', help="将补丁应用到原始文件")
+    apply_parser.add_argument('--patch', required=True)
+    apply_parser.add_argument('--source', default="resources.assets")
+    apply_parser.add_argument('--output', default=None)
+    apply_parser.add_argument('--in-place', action='store_true', help="直接替换原始文件 (请先备份)")
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'create':
+            header = create_patch(args.source, args.target, args.output)
+            print(f"✅ 补丁已保存到 {args.output}: {header['ops']} 个操作，携带 {header['insert_bytes']} 字节新数据 "
+                  f"(目标文件 {header['target_size']} 字节)。")
+        else:
+            result = apply_patch(args.patch, args.source, args.output, args.in_place)
+            print(f"✅ 补丁应用成功，校验通过: {result}")
+    except (OSError, ValueError) as e:
+        print(f"  ❌ 错误: {e}")
+        exit(1)
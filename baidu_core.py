@@ -0,0 +1,156 @@
+# baidu_core.py
+# 百度通用文本翻译 API 的客户端，与 qcloud_core.TmtClient 提供相同的 attempt_batch 接口，
+# 因此可以直接使用 qcloud_core.run_batches 的分批、并发、重试与二分逻辑。
+# 百度接口把 q 按换行拆分为多条原文，每行返回一条译文：含换行的片段按行发送，译文再按行拼回，
+# 空行不发送 (原样保留)，保证译文与原文一一对应。
+import hashlib
+import random
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from qcloud_core import (
+    BatchOutcome, CredentialPool, PooledCredential, TokenBucket, TMT_DEFAULT_MAX_RETRIES, TMT_DEFAULT_WORKERS,
+    TMT_REQUEST_TIMEOUT_SECONDS, RETRY_THROTTLE, RETRY_TRANSIENT, BAD_INPUT, CREDENTIAL, FATAL, outcome_for_error
+)
+
+BAIDU_ENDPOINT = "https://fanyi-api.baidu.com/api/trans/vip/translate"
+BAIDU_MAX_QUERY_BYTES = 6000 # 官方建议单次请求的 q 不超过 6000 字节 (UTF-8)
+BAIDU_MAX_TEXT_COUNT = 300 # 官方没有行数限制，与 TMT 保持一致
+BAIDU_SPLIT_CHARS = (BAIDU_MAX_QUERY_BYTES - 1) // 4 # 单个片段切分后最多 4 字节/字符，加上换行仍不超过限制
+BAIDU_DEFAULT_QPS = 1 # 标准版 1 QPS，高级版 10 QPS
+
+# 本项目 (翻译顺序.csv) 的语言代码 -> 百度语言代码，未列出的相同
+BAIDU_LANGUAGE_CODES = {
+    'ja': 'jp', 'ko': 'kor', 'fr': 'fra', 'es': 'spa', 'ar': 'ara', 'zh-TW': 'cht', 'vi': 'vie',
+    'bg': 'bul', 'et': 'est', 'da': 'dan', 'fi': 'fin', 'ro': 'rom', 'sl': 'slo', 'sv': 'swe',
+}
+# 百度错误码 -> 重试策略 (与 qcloud_core 的错误分类相同)，未列出的按临时错误处理
+_BAIDU_ERROR_CATEGORIES = {
+    "52001": RETRY_TRANSIENT, # 请求超时
+    "52002": RETRY_TRANSIENT, # 系统错误
+    "52003": CREDENTIAL,      # 未授权用户
+    "54000": BAD_INPUT,       # 必填参数为空
+    "54001": CREDENTIAL,      # 签名错误 (APP_ID 与密钥不匹配)
+    "54003": RETRY_THROTTLE,  # 访问频率受限
+    "54004": CREDENTIAL,      # 账户余额不足
+    "54005": RETRY_THROTTLE,  # 长 query 请求频繁
+    "58000": CREDENTIAL,      # 客户端 IP 非法
+    "58001": FATAL,           # 译文语言方向不支持
+    "58002": CREDENTIAL,      # 服务当前已关闭
+    "58003": CREDENTIAL,      # IP 已被封禁
+    "90107": CREDENTIAL,      # 认证未通过或未生效
+    "20003": BAD_INPUT,       # 请求内容存在安全风险
+}
+
+
+def classify_baidu_error(error_code: str) -> str:
+    return _BAIDU_ERROR_CATEGORIES.get(error_code, RETRY_TRANSIENT)
+
+def utf8_query_size(text: str) -> int:
+    """片段在 q 中占用的字节数 (含分隔用的换行)。"""
+    return len(text.encode('utf-8')) + 1
+
+
+class BaiduClient:
+    """百度翻译客户端：持有 APP_ID / 密钥与带连接池的 requests.Session，接口与 TmtClient 相同。"""
+
+    def __init__(self, app_id: str, api_key: str, endpoint_url: str = None, pool_size: int = TMT_DEFAULT_WORKERS):
+        self.app_id = app_id
+        self.api_key = api_key
+        self.endpoint_url = endpoint_url or BAIDU_ENDPOINT
+        self.session = requests.Session()
+        self.pool_size = 0
+        self.resize_pool(pool_size)
+
+    def resize_pool(self, pool_size: int):
+        """连接池只增不减；应在提交请求之前调用。"""
+        if pool_size <= self.pool_size:
+            return
+        adapter = HTTPAdapter(pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.pool_size = pool_size
+
+    def _request(self, lines: List[str], from_lang: str, to_lang: str, limiter, attempt_number: int,
+                 report=None) -> Tuple[Optional[List[str]], Optional[str]]:
+        """发送一次请求，返回 (每行的译文, None) 或 (None, 错误码)。"""
+        query = "\n".join(lines)
+        salt = str(random.randint(32768, 65536))
+        sign = hashlib.md5((self.app_id + query + salt + self.api_key).encode('utf-8')).hexdigest()
+        payload = {'appid': self.app_id, 'q': query, 'from': from_lang, 'to': to_lang, 'salt': salt, 'sign': sign}
+        start = None
+        ok = False
+        throttled = False
+        try:
+            if limiter is not None:
+                limiter.acquire()
+            start = time.perf_counter()
+            # 表单放在请求体中 (而不是 URL 参数)，长 query 不会超出 URL 长度限制
+            response = self.session.post(self.endpoint_url, data=payload, timeout=TMT_REQUEST_TIMEOUT_SECONDS)
+            result = response.json()
+            error_code = str(result.get('error_code', '52000'))
+            if error_code != '52000': # 52000 表示成功
+                print(f"  ❌ 尝试 {attempt_number}: 百度翻译 API 错误 ({error_code}): {result.get('error_msg', '未知错误')}")
+                throttled = classify_baidu_error(error_code) == RETRY_THROTTLE
+                return None, error_code
+            translated = [item['dst'] for item in result.get('trans_result', [])]
+            if len(translated) != len(lines):
+                print(f"  ❌ 尝试 {attempt_number}: 返回 {len(translated)} 行译文，请求了 {len(lines)} 行。")
+                return None, "ResultCountMismatch"
+            ok = True
+            return translated, None
+        except requests.exceptions.RequestException as e:
+            print(f"  ❌ 尝试 {attempt_number}: 百度翻译请求失败: {e}")
+            return None, "NetworkError"
+        except Exception as e:
+            print(f"  ❌ 尝试 {attempt_number}: 发生意外错误: {e}")
+            return None, "UNKNOWN"
+        finally:
+            if start is not None:
+                latency = time.perf_counter() - start
+                if limiter is not None:
+                    limiter.feedback(latency, throttled)
+                if report is not None:
+                    report.record_request(latency, ok)
+
+    def attempt_batch(
+        self, texts: List[str], from_lang: str, to_lang: str,
+        limiter: TokenBucket = None, report=None,
+        attempt: int = 0, max_retries: int = TMT_DEFAULT_MAX_RETRIES
+    ) -> BatchOutcome:
+        """对一个批次发送一次请求，并根据错误码决定下一步动作 (见 qcloud_core.outcome_for_error)。"""
+        text_lines = [text.split('\n') for text in texts]
+        query_lines = [line for lines in text_lines for line in lines if line.strip()]
+        if not query_lines:
+            return BatchOutcome("done", list(texts))
+        translated, error_code = self._request(query_lines, from_lang, to_lang, limiter, attempt + 1, report)
+        if translated is None:
+            return outcome_for_error(error_code, classify_baidu_error(error_code), len(texts), attempt, max_retries)
+        results = iter(translated)
+        return BatchOutcome("done", [
+            "\n".join(next(results) if line.strip() else line for line in lines) for lines in text_lines
+        ])
+
+    def close(self):
+        self.session.close()
+
+
+_POOLS: Dict[Tuple[str, str, Optional[str], float], CredentialPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+def get_baidu_pool(config: Dict[str, Any]) -> CredentialPool:
+    """按配置复用只包含一个百度账号的凭据池 (各轮翻译共享限速器与连接池)。"""
+    app_id, api_key = config.get('Baidu_APP_ID'), config.get('Baidu_API_KEY')
+    endpoint_url = config.get('BAIDU_ENDPOINT_URL') or None
+    qps = config.get('BAIDU_QPS') or BAIDU_DEFAULT_QPS
+    key = (app_id, api_key, endpoint_url, qps)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            client = BaiduClient(app_id, api_key, endpoint_url)
+            pool = _POOLS[key] = CredentialPool([PooledCredential(f"baidu/{str(app_id)[:8]}", client, qps)])
+        return pool
@@ -0,0 +1,454 @@
+# benchmark.py
+# 离线性能基准：基于仓库自带的 data/ 数据集，不调用任何翻译 API (翻译基准使用本地 mock_tmt_server)。
+# 用法: python benchmark.py write-files [--data data/localization_translated_v20.json]
+#       python benchmark.py segment [--data data/localization_export.json]
+#       python benchmark.py json
+#       python benchmark.py translate [--limit 2000 --latency 0.1 --error-rate 0.02 --server-qps 20 --credentials 3]
+#       python benchmark.py translate --server-qps 8 --client-qps 2 --workers 10 --adaptive   # AIMD 限速收敛
+#       python benchmark.py suite               # 依次运行以上全部基准
+#       python benchmark.py compare [旧结果.json 新结果.json]   # 默认比较同一基准最近两次的结果
+# 每次运行的结果 (连同当前 commit) 保存在 BENCHMARK_DIR 中，便于比较不同提交之间的性能。
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Dict, Any, Tuple
+
+import qcloud_core
+from localization_core import (
+    init_config, get_config, load_translation_file, translate_entries_batch,
+    DELIMITERS, PUNC_MARK, Segmenter, _encode_text, _decode_text
+)
+from mock_tmt_server import start_mock_server
+from run_report import RunReport
+
+init_config()
+DEFAULT_DATA_FILE = "./data/localization_translated_v20.json"
+DEFAULT_EXPORT_FILE = "./data/localization_export.json"
+DEFAULT_RESULTS_DIR = "data/benchmarks/"
+
+
+def _timeit(func, repeat: int, setup=None) -> float:
+    """执行 repeat 次，返回最短用时 (秒)。setup 在每次计时前调用，不计入用时。"""
+    best = float('inf')
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# --- 中文 XML 改写 (import_data.build_modified_payloads) ---
+def _build_zh_fixture(data: List[Dict[str, Any]], target_dir: str) -> Tuple[List[Tuple[str, str, str, str]], Dict[str, str]]:
+    """
+    按 zh_filepath 分组，把数据集中的中文原文写成与解密结果相同结构的 XML 文件。
+    返回 (指向临时目录的 translation_results, {文件路径: 原始内容})。
+    """
+    grouped: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for item in data:
+        grouped[os.path.basename(item['zh_filepath'])].append(item)
+
+    contents = {}
+    translation_results = []
+    for filename, items in grouped.items():
+        filepath = os.path.join(target_dir, filename)
+        root = ET.Element('entries')
+        for item in items:
+            entry = ET.SubElement(root, 'entry', name=item['key'])
+            entry.text = item['original_zh_text']
+            translation_results.append((item['key'], filepath, item['original_zh_text'], item['secondary_translated_text']))
+        contents[filepath] = ET.tostring(root, encoding='unicode')
+    return translation_results, contents
+
+
+def _legacy_write_modified_files(translation_results: List[Tuple[str, str, str, str]]):
+    """改造前的实现 (每个 <entry> 都重新遍历全部翻译结果)，仅作为基准对照。"""
+    files_to_update = defaultdict(dict)
+    for key, zh_file, original_text, new_text in translation_results:
+        files_to_update[zh_file][original_text] = new_text
+    for filename in files_to_update:
+        tree = ET.parse(filename)
+        root = tree.getroot()
+        modified = False
+        for entry in root.findall('entry'):
+            key = entry.get('name')
+            for k, original_text, new_text in [(t[0], t[2], t[3]) for t in translation_results if t[1] == filename]:
+                if key == k:
+                    entry.text = new_text
+                    modified = True
+        if modified:
+            tree.write(filename, encoding='utf-8', xml_declaration=True)
+
+
+def bench_write_modified_files(data_file: str, repeat: int = 3) -> Dict[str, Any]:
+    """改造前逐条遍历并写回文件的实现 vs. 打包流程实际使用的 build_modified_payloads (按文件索引，只在内存中生成)。"""
+    from import_data import build_modified_payloads
+
+    data = load_translation_file(data_file)
+    work_dir = tempfile.mkdtemp(prefix="hk_bench_")
+    try:
+        translation_results, contents = _build_zh_fixture(data, work_dir)
+
+        def reset_files():
+            for filepath, content in contents.items():
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    f.write(content)
+
+        legacy_seconds = _timeit(lambda: _legacy_write_modified_files(translation_results), 1, reset_files)
+        serial_seconds = _timeit(lambda: build_modified_payloads(translation_results, max_workers=1), repeat, reset_files)
+        parallel_seconds = _timeit(lambda: build_modified_payloads(translation_results), repeat, reset_files)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "entries": len(translation_results),
+        "files": len(contents),
+        "legacy_seconds": legacy_seconds,
+        "indexed_serial_seconds": serial_seconds,
+        "indexed_parallel_seconds": parallel_seconds,
+        "speedup": legacy_seconds / parallel_seconds,
+    }
+
+
+# --- 分段编码/解码 ---
+def _legacy_encode_text(text: str) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """改造前的 _encode_text (逐项 str.replace + ('T'|'D', 片段) 元组列表)，仅作为基准对照。"""
+    if not text.strip():
+        return [], []
+    decoded_text = text
+    for item in PUNC_MARK:
+        decoded_text = decoded_text.replace(item, PUNC_MARK[item])
+    text_to_translate = []
+    reconstruction_map = []
+    last_end = 0
+    for match in DELIMITERS.finditer(decoded_text):
+        start, end = match.span()
+        text_segment = decoded_text[last_end:start]
+        if text_segment:
+            stripped_segment = text_segment.strip()
+            if stripped_segment:
+                text_to_translate.append(stripped_segment)
+                reconstruction_map.append(('T', text_segment))
+            else:
+                reconstruction_map.append(('D', text_segment))
+        reconstruction_map.append(('D', match.group(0)))
+        last_end = end
+    tail_segment = decoded_text[last_end:]
+    if tail_segment:
+        stripped_segment = tail_segment.strip()
+        if stripped_segment:
+            text_to_translate.append(stripped_segment)
+            reconstruction_map.append(('T', tail_segment))
+        else:
+            reconstruction_map.append(('D', tail_segment))
+    return text_to_translate, reconstruction_map
+
+
+def _legacy_decode_text(translated_texts: List[str], reconstruction_map: List[Tuple[str, str]]) -> str:
+    translated_index = 0
+    final_parts = []
+    for type, value in reconstruction_map:
+        if type == 'D':
+            final_parts.append(value)
+        elif translated_index < len(translated_texts):
+            final_parts.append(translated_texts[translated_index])
+            translated_index += 1
+    return "".join(final_parts)
+
+
+def bench_segment(data_file: str, repeat: int = 5, hops: int = 20) -> Dict[str, Any]:
+    """
+    模拟 hops 轮翻译中对同一批源文本的编码 + 解码 (译文用原片段代替)。
+    legacy 为旧实现；compat 为兼容接口 _encode_text/_decode_text (使用全局 SEGMENTER 及其缓存)；
+    cold 为每轮都清空缓存的 Segmenter；cached 为跨轮复用编码缓存。
+    """
+    texts = [item['original_en_text'] for item in load_translation_file(data_file, columns=['original_en_text'])]
+
+    def run_legacy():
+        for _ in range(hops):
+            for text in texts:
+                segments, mapping = _legacy_encode_text(text)
+                _legacy_decode_text(segments, mapping)
+
+    def run_compat():
+        # localization_core._encode_text / _decode_text (基于 SEGMENTER 的兼容接口)
+        for _ in range(hops):
+            for text in texts:
+                segments, mapping = _encode_text(text)
+                _decode_text(segments, mapping)
+
+    def run_segmenter(segmenter: Segmenter, clear_each_hop: bool):
+        for _ in range(hops):
+            if clear_each_hop:
+                segmenter.clear_cache()
+            for text in texts:
+                encoded = segmenter.encode(text)
+                segmenter.decode(encoded, encoded.segments)
+
+    cold = Segmenter()
+    cached = Segmenter()
+    legacy_seconds = _timeit(run_legacy, repeat)
+    compat_seconds = _timeit(run_compat, repeat)
+    cold_seconds = _timeit(lambda: run_segmenter(cold, True), repeat)
+    cached_seconds = _timeit(lambda: run_segmenter(cached, False), repeat, cached.clear_cache)
+
+    calls = len(texts) * hops
+    return {
+        "entries": len(texts),
+        "hops": hops,
+        "legacy_seconds": legacy_seconds,
+        "compat_seconds": compat_seconds,
+        "segmenter_seconds": cold_seconds,
+        "segmenter_cached_seconds": cached_seconds,
+        "legacy_entries_per_second": calls / legacy_seconds,
+        "segmenter_entries_per_second": calls / cold_seconds,
+        "segmenter_cached_entries_per_second": calls / cached_seconds,
+        "speedup": legacy_seconds / cold_seconds,
+        "cached_speedup": legacy_seconds / cached_seconds,
+    }
+
+
+# --- JSON 读写 ---
+def bench_json(data_files: List[str], repeat: int = 3) -> Dict[str, Any]:
+    """版本文件的 json.load 与 json.dump (与 save_translation_version 相同的参数)。"""
+    work_dir = tempfile.mkdtemp(prefix="hk_bench_")
+    files = {}
+    try:
+        for data_file in data_files:
+            size = os.path.getsize(data_file)
+            holder = {}
+
+            def load():
+                with open(data_file, 'r', encoding='utf-8') as f:
+                    holder['data'] = json.load(f)
+
+            def dump():
+                with open(os.path.join(work_dir, "dump.json"), 'w', encoding='utf-8') as f:
+                    json.dump(holder['data'], f, ensure_ascii=False, indent=4)
+
+            load_seconds = _timeit(load, repeat)
+            dump_seconds = _timeit(dump, repeat)
+            files[os.path.basename(data_file)] = {
+                "entries": len(holder['data']),
+                "bytes": size,
+                "load_seconds": load_seconds,
+                "dump_seconds": dump_seconds,
+                "load_mb_per_second": size / load_seconds / 1e6,
+                "dump_mb_per_second": size / dump_seconds / 1e6,
+            }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "files": files,
+        "load_seconds": sum(item["load_seconds"] for item in files.values()),
+        "dump_seconds": sum(item["dump_seconds"] for item in files.values()),
+    }
+
+
+# --- translate_entries_batch 端到端 (模拟服务器) ---
+def bench_translate(data_file: str, limit: int = 2000, latency: float = 0.1, jitter: float = 0.05,
+                    error_rate: float = 0.0, server_qps: float = 0, client_qps: float = 20,
+                    workers: int = 5, retry_delay: float = 0.5, seed: int = 0, credentials: int = 1,
+                    adaptive: bool = False, max_qps: float = 0) -> Dict[str, Any]:
+    """
+    用本地模拟服务器执行一轮 EN -> ZH 的 translate_entries_batch (不使用翻译记忆库)。
+    :param limit: 只取前 limit 个条目，0 表示全部。
+    :param server_qps: 模拟服务器的限频阈值，client_qps 为客户端令牌桶速率 (每个凭据各自生效)。
+    :param retry_delay: 重试退避的基础等待 (替代正式运行时的 TMT_RETRY_DELAY_SECONDS)。
+    :param credentials: 模拟的账号数，每个账号一个独立的模拟服务器 (TMT_CREDENTIALS)。
+    :param adaptive: 开启 AIMD 自适应限速 (TMT_ADAPTIVE_RATE)，client_qps 为起始速率，max_qps 为上限。
+    """
+    entries = load_translation_file(data_file)
+    if limit:
+        entries = entries[:limit]
+    servers = [start_mock_server(latency=latency, jitter=jitter, error_rate=error_rate, qps=server_qps, seed=seed + i)
+               for i in range(credentials)]
+    config = get_config()
+    saved_config = dict(config)
+    saved_delay = qcloud_core.TMT_RETRY_DELAY_SECONDS
+    config.update({
+        'Tencent_Secret_Id': 'benchmark', 'Tencent_Secret_Key': 'benchmark',
+        'TMT_ENDPOINT_URL': servers[0][1], 'TMT_QPS': client_qps, 'TMT_MAX_WORKERS': workers, 'TM_ENABLED': False,
+        'TMT_ADAPTIVE_RATE': adaptive, 'TMT_MAX_QPS': max_qps,
+        'TMT_CREDENTIALS': [
+            {"Name": f"mock{i}", "Secret_Id": f"benchmark{i}", "Secret_Key": "benchmark", "Endpoint_URL": url}
+            for i, (_, url) in enumerate(servers)
+        ] if credentials > 1 else [],
+    })
+    qcloud_core.TMT_RETRY_DELAY_SECONDS = retry_delay
+    report = RunReport('benchmark_translate')
+    try:
+        start = time.perf_counter()
+        result = translate_entries_batch([dict(entry) for entry in entries], 'en', 'zh',
+                                         source_key='original_en_text', verbose=False, report=report)
+        seconds = time.perf_counter() - start
+    finally:
+        for server, _ in servers:
+            server.shutdown()
+        config.clear()
+        config.update(saved_config)
+        qcloud_core.TMT_RETRY_DELAY_SECONDS = saved_delay
+
+    report_data = report.to_dict()
+    return {
+        "entries": len(entries),
+        "latency": latency, "jitter": jitter, "error_rate": error_rate,
+        "server_qps": server_qps, "client_qps": client_qps, "workers": workers, "credentials": credentials,
+        "adaptive": adaptive,
+        "seconds": seconds,
+        "entries_per_second": len(entries) / seconds,
+        "server_requests": sum(server.request_count for server, _ in servers),
+        "server_connections": sum(server.connection_count for server, _ in servers),
+        "server_throttled": sum(server.throttled_count for server, _ in servers),
+        "server_errors": sum(server.error_count for server, _ in servers),
+        "error_entries": sum(1 for entry in result if '&&error&&' in (entry.get('secondary_translated_text') or '')),
+        "stages": report_data["stages"],
+        "api": report_data["api"],
+        "credential_usage": report_data.get("credentials", {}),
+        "rate_control": report_data.get("rate_control", {}),
+    }
+
+
+# --- 结果保存与比较 ---
+def _git_revision() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": False}
+    return {"commit": commit, "dirty": dirty}
+
+def save_result(command: str, params: Dict[str, Any], result: Dict[str, Any], results_dir: str = None) -> str:
+    """保存为 <results_dir>/<命令>_<时间>_<commit>.json，返回文件路径。"""
+    results_dir = results_dir or get_config('BENCHMARK_DIR') or DEFAULT_RESULTS_DIR
+    os.makedirs(results_dir, exist_ok=True)
+    revision = _git_revision()
+    now = datetime.now()
+    record = {
+        "command": command,
+        **revision,
+        "timestamp": now.isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": params,
+        "result": result,
+    }
+    path = os.path.join(results_dir, f"{command}_{now:%Y%m%d-%H%M%S}_{revision['commit']}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False, indent=4)
+    return path
+
+def _flatten(data: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+def compare_results(old_path: str, new_path: str) -> Dict[str, Dict[str, float]]:
+    """比较两次结果中的所有 *seconds 指标，ratio = 旧用时 / 新用时 (大于 1 表示变快)。"""
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, 'r', encoding='utf-8') as f:
+        new = json.load(f)
+    old_flat, new_flat = _flatten(old["result"]), _flatten(new["result"])
+    print(f"-> {old['command']}: {old['commit']} ({old['timestamp']}) -> {new['commit']} ({new['timestamp']})")
+    comparison = {}
+    for key in old_flat:
+        if key.endswith("seconds") and key in new_flat and new_flat[key] > 0:
+            comparison[key] = {"old": old_flat[key], "new": new_flat[key], "ratio": old_flat[key] / new_flat[key]}
+            print(f"  {key:<60} {old_flat[key]:>12.4f} -> {new_flat[key]:>12.4f}  x{comparison[key]['ratio']:.2f}")
+    return comparison
+
+def latest_results(command: str, results_dir: str = None, count: int = 2) -> List[str]:
+    results_dir = results_dir or get_config('BENCHMARK_DIR') or DEFAULT_RESULTS_DIR
+    return sorted(glob.glob(os.path.join(results_dir, f"{command}_*.json")), key=os.path.getmtime)[-count:]
+
+
+def _add_translate_arguments(subparser):
+    subparser.add_argument('--export', default=DEFAULT_EXPORT_FILE)
+    subparser.add_argument('--limit', type=int, default=2000, help="只翻译前 N 个条目，0 表示全部")
+    subparser.add_argument('--latency', type=float, default=0.1)
+    subparser.add_argument('--jitter', type=float, default=0.05)
+    subparser.add_argument('--error-rate', type=float, default=0.0)
+    subparser.add_argument('--server-qps', type=float, default=0, help="模拟服务器限频阈值，0 表示不限")
+    subparser.add_argument('--client-qps', type=float, default=20)
+    subparser.add_argument('--workers', type=int, default=5)
+    subparser.add_argument('--retry-delay', type=float, default=0.5)
+    subparser.add_argument('--seed', type=int, default=0)
+    subparser.add_argument('--credentials', type=int, default=1, help="模拟的账号数 (每个账号一个模拟服务器)")
+    subparser.add_argument('--adaptive', action='store_true', help="AIMD 自适应限速，--client-qps 为起始速率")
+    subparser.add_argument('--max-qps', type=float, default=0, help="自适应限速的上限，0 表示默认值")
+
+def _run_translate(args) -> Dict[str, Any]:
+    return bench_translate(args.export, args.limit, args.latency, args.jitter, args.error_rate,
+                           args.server_qps, args.client_qps, args.workers, args.retry_delay, args.seed,
+                           args.credentials, args.adaptive, args.max_qps)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="离线性能基准")
+    parser.add_argument('--no-save', action='store_true', help="不保存结果")
+    parser.add_argument('--results-dir', default=None, help="结果目录 (默认: 配置 BENCHMARK_DIR)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    write_parser = subparsers.add_parser('write-files', help="中文 XML 改写 (import_data.build_modified_payloads)")
+    write_parser.add_argument('--data', default=DEFAULT_DATA_FILE)
+    write_parser.add_argument('--repeat', type=int, default=3)
+    segment_parser = subparsers.add_parser('segment', help="分段编码/解码 (localization_core.Segmenter)")
+    segment_parser.add_argument('--data', default=DEFAULT_EXPORT_FILE)
+    segment_parser.add_argument('--repeat', type=int, default=5)
+    segment_parser.add_argument('--hops', type=int, default=20)
+    json_parser = subparsers.add_parser('json', help="版本文件的 JSON 读取与写出")
+    json_parser.add_argument('--data', nargs='+', default=[DEFAULT_EXPORT_FILE, DEFAULT_DATA_FILE])
+    json_parser.add_argument('--repeat', type=int, default=3)
+    translate_parser = subparsers.add_parser('translate', help="translate_entries_batch 端到端 (本地模拟服务器)")
+    _add_translate_arguments(translate_parser)
+    suite_parser = subparsers.add_parser('suite', help="依次运行全部基准")
+    suite_parser.add_argument('--data', default=DEFAULT_DATA_FILE)
+    suite_parser.add_argument('--repeat', type=int, default=3)
+    _add_translate_arguments(suite_parser)
+    compare_parser = subparsers.add_parser('compare', help="比较两次保存的结果")
+    compare_parser.add_argument('files', nargs='*', help="旧结果与新结果；省略时比较 --name 最近两次的结果")
+    compare_parser.add_argument('--name', default='suite', help="省略文件时按哪个基准查找 (默认: suite)")
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        files = args.files or latest_results(args.name, args.results_dir)
+        if len(files) != 2:
+            print(f"  ❌ 错误: 需要两个结果文件，找到 {len(files)} 个。")
+            exit(1)
+        compare_results(*files)
+        exit(0)
+
+    if args.command == 'write-files':
+        result = bench_write_modified_files(args.data, args.repeat)
+    elif args.command == 'segment':
+        result = bench_segment(args.data, args.repeat, args.hops)
+    elif args.command == 'json':
+        result = bench_json(args.data, args.repeat)
+    elif args.command == 'translate':
+        result = _run_translate(args)
+    elif args.command == 'suite':
+        result = {
+            "segment": bench_segment(args.export, args.repeat),
+            "write_files": bench_write_modified_files(args.data, args.repeat),
+            "json": bench_json([args.export, args.data], args.repeat),
+            "translate": _run_translate(args),
+        }
+    print(json.dumps(result, ensure_ascii=False, indent=4))
+    if not args.no_save:
+        params = {key: value for key, value in vars(args).items() if key not in ('no_save', 'results_dir', 'command')}
+        print(f"-> 结果已保存到 {save_result(args.command, params, result, args.results_dir)}")
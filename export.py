@@ -1,20 +1,22 @@
 # export.py
+import argparse
+import hashlib
 import os
 import json
+import time
 from localization_core import (
     init_config, get_config, 
     read_and_parse_txt, simple_detect_file_language, 
     TextAssetInfo
 )
+from asset_codec import get_codec, path_id_filename, write_text_file
+from run_report import start_report, get_report
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 # from typing import List, Dict
 
 import UnityPy
-import subprocess
-import shutil
-import xml.etree.ElementTree as ET
-import re
-from typing import List, Tuple, Dict, Union, Any
+from typing import List, Tuple, Dict, Any
 
 # 初始化配置
 init_config()
@@ -29,6 +31,182 @@ INPUT_BASE64_DIR = os.path.join(TEMP_BASE_DIR, "input_base64")
 OUTPUT_DECRYPTED_DIR = os.path.join(TEMP_BASE_DIR, "output_decrypted")
 OUTPUT_ENCRYPTED_DIR = os.path.join(TEMP_BASE_DIR, "output_encrypted")
 FINAL_OUTPUT_ASSET = "resources_new.assets"
+PARSE_CACHE_FILE = os.path.join(TEMP_BASE_DIR, "parse_cache.json")
+EXTRACT_CACHE_FILE = os.path.join(TEMP_BASE_DIR, "extract_cache.json")
+EXPORT_LANGUAGES = {'EN', 'ZH'}
+
+def _file_sha1(path: str, chunk_size: int = 16 * 1024 * 1024) -> str:
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def extract_text_assets(env, output_dir: str, max_workers: int = None) -> Dict[str, str]:
+    """
+    只读取 TextAsset 对象，把 m_Script (Base64 密文) 写入 output_dir/Asset_<PathID>_<PathID>_base64.txt。
+    UnityPy 的读取共享同一个文件游标，因此按顺序读取，写文件在线程池中并行。
+    :return: {Path ID: Base64 密文}
+    """
+    payloads = {}
+    with get_report().stage('extract') as stats:
+        for path_id, obj in env.file.objects.items():
+            if getattr(obj.type, 'name', None) == 'TextAsset':
+                data = obj.read()
+                payloads[str(path_id)] = data.m_Script
+        os.makedirs(output_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(
+                lambda item: write_text_file(os.path.join(output_dir, path_id_filename(item[0])), item[1]),
+                payloads.items()
+            ))
+        stats.items = len(payloads)
+        stats.chars = sum(len(payload) for payload in payloads.values())
+    return payloads
+
+def _file_signatures(directory: str, names) -> Dict[str, List[int]]:
+    """{文件名: [大小, 修改时间]}，不存在的文件不包含在结果中。"""
+    signatures = {}
+    for name in names:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            signatures[name] = [stat.st_size, stat.st_mtime_ns]
+    return signatures
+
+def prepare_decrypted_files(asset_path: str, decrypted_dir: str, force: bool = False) -> bool:
+    """
+    从资源文件中提取 TextAsset 并一次性解密到 decrypted_dir。
+    结果以资源文件的 sha1 为键缓存：同一游戏版本再次导出时直接跳过 UnityPy 加载与解密。
+    缓存同时记录每个解密文件的大小与修改时间，文件被删除或改动 (例如写入了译文) 时重新解密。
+    :return: 是否成功 (缓存命中也视为成功)。
+    """
+    asset_hash = _file_sha1(asset_path)
+    cache = {}
+    if os.path.exists(EXTRACT_CACHE_FILE):
+        try:
+            with open(EXTRACT_CACHE_FILE, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            cache = {}
+    cached_files = cache.get("files")
+    if (not force and cache.get("asset_sha1") == asset_hash and cache.get("decrypted_dir") == decrypted_dir
+            and isinstance(cached_files, dict) and _file_signatures(decrypted_dir, cached_files) == cached_files):
+        print(f"✅ {asset_path} 未变化 (sha1 {asset_hash[:12]})，跳过提取与解密。")
+        return True
+    if not force and cache.get("asset_sha1") == asset_hash:
+        print(f"  -> {decrypted_dir} 中的解密文件已被删除或改动，重新解密。")
+
+    UnityPy.config.FALLBACK_UNITY_VERSION = FALLBACK_VERSION
+    env = UnityPy.load(asset_path)
+    print(f"✅ {asset_path} 加载成功。")
+
+    workers = get_config('EXPORT_WORKERS') or None
+    payloads = extract_text_assets(env, INPUT_BASE64_DIR, workers)
+    print(f"  -> 已提取 {len(payloads)} 个 TextAsset 到 {INPUT_BASE64_DIR}。")
+
+    codec = get_codec()
+    try:
+        with get_report().stage('decrypt', chars=sum(len(payload) for payload in payloads.values())) as stats:
+            count = codec.decrypt_files(payloads, INPUT_BASE64_DIR, decrypted_dir, workers)
+            stats.items = count
+    except RuntimeError as e:
+        print(f"  ❌ 解密失败: {e}")
+        return False
+    print(f"  -> 使用编解码器 {codec.name} 解密了 {count} 个文件到 {decrypted_dir}。")
+
+    files = _file_signatures(decrypted_dir, sorted(name for name in os.listdir(decrypted_dir) if name.endswith(".txt")))
+    with open(EXTRACT_CACHE_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"asset_sha1": asset_hash, "decrypted_dir": decrypted_dir, "files": files}, f, ensure_ascii=False, indent=4)
+    return True
+
+def _parse_and_detect(filepath: str) -> Tuple[str, List[Tuple[str, str]], Dict[str, float]]:
+    """
+    子进程任务：解析单个文件并识别语言。
+    只有 EN/ZH 文件需要返回条目，其他语言只返回语言代码，减少进程间传输和缓存体积。
+    第三个返回值为本文件的解析/识别用时与条目数，由主进程汇总到运行报告。
+    """
+    start = time.perf_counter()
+    entries_list = read_and_parse_txt(filepath)
+    parsed = time.perf_counter()
+    timings = {"parse": parsed - start, "detect": 0.0, "entries": len(entries_list),
+               "chars": sum(len(entry.text) for entry in entries_list)}
+    if not entries_list:
+        return 'UNKNOWN', [], timings
+    file_lang = simple_detect_file_language(entries_list)
+    timings["detect"] = time.perf_counter() - parsed
+    if file_lang not in EXPORT_LANGUAGES:
+        return file_lang, [], timings
+    return file_lang, [(entry.key, entry.text) for entry in entries_list], timings
+
+def _record_parse_timings(timings: List[Dict[str, float]], files: List[str]):
+    # 用时为各 worker 进程的累计用时 (并行时大于墙钟时间)
+    report = get_report()
+    entries = sum(t["entries"] for t in timings)
+    chars = sum(t["chars"] for t in timings)
+    report.add('parse', sum(t["parse"] for t in timings), items=entries, chars=chars,
+               bytes=sum(os.path.getsize(filepath) for filepath in files), calls=len(timings))
+    report.add('detect', sum(t["detect"] for t in timings), items=entries, chars=chars, calls=len(timings))
+
+def _file_signature(filepath: str) -> List[int]:
+    stat = os.stat(filepath)
+    return [stat.st_mtime_ns, stat.st_size]
+
+def _load_parse_cache(cache_file: str) -> Dict[str, Any]:
+    if not os.path.exists(cache_file):
+        return {}
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"  [警告] 解析缓存 {cache_file} 无法读取，将重新解析全部文件: {e}")
+        return {}
+
+def parse_decrypted_files(files: List[str], max_workers: int = None,
+                          cache_file: str = PARSE_CACHE_FILE) -> Dict[str, Tuple[str, List[Tuple[str, str]]]]:
+    """
+    并行解析所有解密文件并识别语言，返回 {文件路径: (语言, [(key, text), ...])}。
+    结果按 (mtime, size) 缓存在 cache_file 中，重新导出时未变化的文件直接复用缓存。
+    """
+    cache = _load_parse_cache(cache_file) if cache_file else {}
+    results: Dict[str, Tuple[str, List[Tuple[str, str]]]] = {}
+    signatures = {}
+    pending = []
+    for filepath in files:
+        signatures[filepath] = _file_signature(filepath)
+        cached = cache.get(filepath)
+        if cached and cached['signature'] == signatures[filepath]:
+            results[filepath] = (cached['language'], [tuple(e) for e in cached['entries']])
+        else:
+            pending.append(filepath)
+
+    print(f"  -> 缓存命中 {len(results)} 个文件，需要解析 {len(pending)} 个文件。")
+    get_report().extra["parse_cache_hits"] = len(results)
+    if pending:
+        timings = []
+        if max_workers == 1 or len(pending) == 1:
+            parsed = map(_parse_and_detect, pending)
+            for filepath, (lang, entries, timing) in zip(pending, parsed):
+                results[filepath] = (lang, entries)
+                timings.append(timing)
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                chunksize = max(1, len(pending) // ((max_workers or os.cpu_count() or 1) * 4))
+                for filepath, (lang, entries, timing) in zip(pending, executor.map(_parse_and_detect, pending, chunksize=chunksize)):
+                    results[filepath] = (lang, entries)
+                    timings.append(timing)
+        _record_parse_timings(timings, pending)
+
+        if cache_file:
+            new_cache = {
+                filepath: {"signature": signatures[filepath], "language": lang, "entries": entries}
+                for filepath, (lang, entries) in results.items()
+            }
+            os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump(new_cache, f, ensure_ascii=False)
+
+    return results
 
 def export_localization_data(files: List[str]):
     """
@@ -40,24 +218,20 @@ def export_localization_data(files: List[str]):
     
     print(f"  -> 正在解析 {len(files)} 个文件...")
     
-    # 1. 解析所有文件并识别语言
+    # 1. 并行解析所有文件并识别语言 (未变化的文件直接使用缓存)
+    workers = get_config('EXPORT_WORKERS') or None
+    parsed_files = parse_decrypted_files(files, max_workers=workers)
     for filepath in files:
-        entries_list = read_and_parse_txt(filepath)
-        if not entries_list:
-            continue
-            
-        file_lang = simple_detect_file_language(entries_list)
-        
+        file_lang, entries = parsed_files[filepath]
+
         # 仅处理英文和中文文件
-        if file_lang not in {'EN', 'ZH'}:
+        if file_lang not in EXPORT_LANGUAGES:
             continue
         
         # 填充映射字典
-        for entry_info in entries_list:
-            key = entry_info.key
-            if key and entry_info.text.strip():
-                entry_info.language = file_lang
-                all_mapped_entries[key][file_lang] = entry_info
+        for key, text in entries:
+            if key and text.strip():
+                all_mapped_entries[key][file_lang] = TextAssetInfo(key=key, text=text, filepath=filepath, language=file_lang)
 
     # 2. 构建导出列表并应用白名单
     export_list = []
@@ -88,21 +262,29 @@ def export_localization_data(files: List[str]):
     
     # 3. 写入 JSON 文件
     output_file = "./data/" + get_config('EXPORT_FILE_NAME')
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(export_list, f, ensure_ascii=False, indent=4)
+    with get_report().stage('json_dump', items=len(export_list)) as stats:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(export_list, f, ensure_ascii=False, indent=4)
+        stats.bytes = os.path.getsize(output_file)
         
     print(f"  -> 数据已保存到 {output_file}。")
     return output_file
 
 # --- 主执行逻辑 ---
 if __name__ == "__main__":
-    
-    # 加载文件
-    UnityPy.config.FALLBACK_UNITY_VERSION = FALLBACK_VERSION
-    env = UnityPy.load(ASSET_FILE_PATH)
-    print(f"✅ {ASSET_FILE_PATH} 加载成功。")
+    parser = argparse.ArgumentParser(description="提取、解密并导出待翻译数据")
+    parser.add_argument('--force', action='store_true', help="忽略提取缓存，重新加载资源文件并解密")
+    args = parser.parse_args()
 
     DECRYPTED_DIR = get_config('DECRYPTED_FILES_DIR')
+    report = start_report('export')
+
+    # 提取 TextAsset 并解密 (资源文件未变化时使用缓存)
+    if os.path.exists(ASSET_FILE_PATH):
+        if not prepare_decrypted_files(ASSET_FILE_PATH, DECRYPTED_DIR, args.force):
+            exit(1)
+    else:
+        print(f"[警告] 找不到 {ASSET_FILE_PATH}，直接使用 {DECRYPTED_DIR} 中已解密的文件。")
     
     if not os.path.isdir(DECRYPTED_DIR):
         print(f"[错误] 目录 {DECRYPTED_DIR} 不存在。请检查 config.json。")
@@ -117,4 +299,5 @@ if __name__ == "__main__":
     if not all_decrypted_files:
          print(f"[警告] 目录 {DECRYPTED_DIR} 中未找到任何 .txt 文件。")
          
-    export_localization_data(all_decrypted_files)
\ No newline at end of file
+    export_localization_data(all_decrypted_files)
+    print(f"  -> 运行报告已保存到 {report.save(get_config('REPORT_DIR'))}。")
\ No newline at end of file
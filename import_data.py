@@ -1,82 +1,36 @@
 # import_data.py
+import argparse
+import hashlib
 import json
 import os
-import re
 import shutil # 用于文件操作，如复制/清理
-import subprocess
+import time
 from localization_core import (
-    init_config, get_config, find_latest_translation_file 
+    init_config, get_config, find_latest_translation_file, get_version_catalog, load_translation_file
 )
+from asset_codec import TextAssetCodec, get_codec, parse_path_id_from_filename, run_decryptor
+from asset_patch import create_patch
+from run_report import start_report, get_report
 from collections import defaultdict
-from typing import List, Dict, Any,Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any,Tuple, Callable, Optional
 import UnityPy 
 import xml.etree.ElementTree as ET
 
 init_config()
 DECRYPTED_FILES_DIR = get_config('DECRYPTED_FILES_DIR')
 ENCRYPTED_BASE64_DIR = get_config('ENCRYPTED_BASE64_DIR')
+BUILD_CACHE_DIR = get_config('BUILD_CACHE_DIR') or "temp_hk_modding/build_cache/"
 
+def patch_output_enabled() -> bool:
+    """PACKED_OUTPUT_MODE 为 patch 时只输出相对原始资源文件的补丁，不保存完整的资源文件副本。"""
+    return get_config('PACKED_OUTPUT_MODE') == 'patch'
 
-def parse_path_id_from_filename(filename: str) -> str:
-    """
-    从形如 'Asset_46_46_base64.txt' 的文件名中解析出 Path ID (例如 '46')。
-    """
-    match = re.match(r'Asset_(\d+)_', filename)
-    if match:
-        return match.group(1)
-    # 对于不符合命名规范的文件，返回 None 或空字符串
-    return None
-def run_decryptor(input_dir, output_dir, mode):
-    """
-    调用 HollowKnight_TextAssetDecryptor.exe 进行解密或加密。
-    
-    :param input_dir: 输入目录 (-d)
-    :param output_dir: 输出目录 (-o)
-    :param mode: 操作模式 ('-d' 解密, '-e' 加密)
-    :return: 外部程序运行是否成功 (bool)
-    """
-    # 确保 DECRYPTOR_EXE 已经被定义为最新的配置值
-    global DECRYPTOR_EXE
-    DECRYPTOR_EXE = get_config('DECRYPTOR_TOOL_PATH') 
-    
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # 构建命令行参数
-    command = [
-        DECRYPTOR_EXE, 
-        mode, input_dir, 
-        "-o", output_dir
-    ]
-    
-    try:
-        # 使用 subprocess.run 运行外部程序
-        result = subprocess.run(
-            command, 
-            capture_output=True, 
-            text=True,
-            check=False # 即使外部程序返回非零退出码（失败），也不抛出异常
-        )
-        
-        # 检查返回码：0 通常表示成功
-        if result.returncode == 0:
-            return True
-        else:
-            print(f"  ❌ 外部工具运行失败 (返回码 {result.returncode})")
-            print("  --- 外部工具输出 START ---")
-            print(result.stdout)
-            print(result.stderr)
-            print("  --- 外部工具输出 END ---")
-            return False
-
-    except FileNotFoundError:
-        print(f"  ❌ 错误: 找不到可执行文件 {DECRYPTOR_EXE}。请确保它在脚本目录下或已添加到系统PATH中。")
-        return False
-    except Exception as e:
-        print(f"  ❌ 运行外部程序时发生错误: {e}")
-        return False
-def encrypt_modified_assets() -> Dict[str, str]:
+
+def encrypt_modified_assets(path_ids=None) -> Dict[str, str]:
     """
     读取外部工具加密修改后的文件，并将翻译后的 .txt 文件复制到加密输入目录。
+    :param path_ids: 只读取这些 Path ID 的文件，默认读取目录中的全部文件。
     """
     encrypted_data = {}
     
@@ -84,7 +38,7 @@ def encrypt_modified_assets() -> Dict[str, str]:
         if filename.endswith("_base64.txt"):
             path_id = parse_path_id_from_filename(filename)
             
-            if path_id:
+            if path_id and (path_ids is None or path_id in path_ids):
                 encrypted_filename = os.path.join(ENCRYPTED_BASE64_DIR, filename)
                 try:
                     with open(encrypted_filename, 'r', encoding='utf-8') as f:
@@ -98,139 +52,335 @@ def encrypt_modified_assets() -> Dict[str, str]:
 
     print(f"  ✅ 成功获取 {len(encrypted_data)} 个 Path ID 的 Base64 加密数据。")
     return encrypted_data
-def repack_assets(encrypted_data: Dict[str, str], version: int) -> str:
+def repack_assets(encrypted_data: Dict[str, str], version: int, base_asset_path: str = None) -> str:
     """
     使用 UnityPy 将加密后的 Base64 字符串注入 AssetBundle 并保存。
+    :param base_asset_path: 在哪个资源文件的基础上修补，默认为原始资源文件 (ORIGINAL_ASSET_PATH)。
+    :return: 输出文件路径；补丁模式下为补丁文件路径。
     """
     
-    ORIGINAL_ASSET_PATH = get_config('ORIGINAL_ASSET_PATH')
+    ORIGINAL_ASSET_PATH = base_asset_path or get_config('ORIGINAL_ASSET_PATH')
     OUTPUT_ASSET_PATH = get_config('PACKED_ASSET_FORMAT').format(version)
     
     if not os.path.exists(ORIGINAL_ASSET_PATH):
         print(f"  ❌ 错误: 找不到原始资源文件: {ORIGINAL_ASSET_PATH}")
         return ""
 
+    start = time.perf_counter()
     try:
         env = UnityPy.load(ORIGINAL_ASSET_PATH)
     except Exception as e:
         print(f"  ❌ 错误: 无法加载原始资源文件 {ORIGINAL_ASSET_PATH}: {e}")
         return ""
 
+    # 按 Path ID 直接从对象表取出需要修改的对象，其余对象不解析
+    objects = {}
+    for path_id in encrypted_data:
+        obj = env.file.objects.get(int(path_id))
+        if obj is None:
+            print(f"  ❌ 错误: 资源文件中不存在 Path ID {path_id}，跳过。")
+            continue
+        objects[path_id] = obj
+
     # 注入加密数据
-    for obj in env.objects:
-        path_id = str(obj.path_id)
-        if path_id in encrypted_data:
-            data = obj.read()
-            new_encrypted_string = encrypted_data[path_id]
-            updated = False
-            
-            # TextAsset 的两种常见存储方式
-            if hasattr(data, 'm_Script'):
+    patched = 0
+    for path_id, obj in objects.items():
+        data = obj.read()
+        new_encrypted_string = encrypted_data[path_id]
+        updated = False
+        
+        # TextAsset 的两种常见存储方式；内容未变化的对象不重新序列化
+        if hasattr(data, 'm_Script'):
+            if data.m_Script != new_encrypted_string:
                 data.m_Script = new_encrypted_string
                 updated = True
-            elif hasattr(data, 'bytes'):
-                data.bytes = new_encrypted_string 
-                updated = True
-            
-            if updated:
+        elif hasattr(data, 'bytes'):
+            data.bytes = new_encrypted_string 
+            updated = True
+        
+        if updated:
+            try:
+                # 遵循你提供的 TextAsset 示例，使用 data.save()
+                data.save() 
+            except AttributeError:
+                # 某些版本或类型不支持 data.save()，退回到 obj.save(data)
                 try:
-                    # 遵循你提供的 TextAsset 示例，使用 data.save()
-                    data.save() 
-                except AttributeError:
-                    # 某些版本或类型不支持 data.save()，退回到 obj.save(data)
-                    try:
-                        obj.save(data)
-                    except Exception as e:
-                        print(f"  ❌ 致命错误：Path ID {path_id} 无法保存: {e}")
-                # print(f"  [重新打包] 更新 Path ID: {path_id}", end='\n')
+                    obj.save(data)
+                except Exception as e:
+                    print(f"  ❌ 致命错误：Path ID {path_id} 无法保存: {e}")
+            patched += 1
+            # print(f"  [重新打包] 更新 Path ID: {path_id}", end='\n')
+    print(f"  -> 共更新 {patched}/{len(encrypted_data)} 个 Path ID。")
+
+    packed_bytes = env.file.save()
+    report = get_report()
+    report.add('repack', time.perf_counter() - start, items=patched, bytes=len(packed_bytes))
+    if patch_output_enabled():
+        # 只保存补丁：python asset_patch.py apply 可还原出完整文件
+        patch_path = get_config('PATCH_FILE_FORMAT').format(version)
+        with report.stage('patch', items=patched) as stats:
+            header = create_patch(get_config('ORIGINAL_ASSET_PATH'), packed_bytes, patch_path)
+            stats.bytes = header['insert_bytes']
+        print(f"\n  ✅ 补丁生成完成: {patch_path} ({header['ops']} 个操作，携带 {header['insert_bytes']} 字节，"
+              f"完整文件 {header['target_size']} 字节)。")
+        return patch_path
 
     # 保存新的 Asset Bundle
     with open(OUTPUT_ASSET_PATH, 'wb') as f:
-        f.write(env.file.save())
+        f.write(packed_bytes)
         
     print(f"\n  ✅ 资源打包完成。新文件: {OUTPUT_ASSET_PATH}")
     return OUTPUT_ASSET_PATH
-def write_modified_files(translation_results: List[Tuple[str, str, str, str]]):
-    """
-    将新翻译的文本写入对应的中文 TXT 文件中。
+def render_zh_file(filepath: str, text_map: Dict[str, str]) -> Tuple[ET.ElementTree, int]:
+    """加载单个中文 TXT (XML) 文件，按 entry name 一次遍历替换文本，返回 (修改后的 XML 树, 替换条数)。"""
+    tree = ET.parse(filepath)
+    root = tree.getroot()
+    updated = 0
+    for entry in root.findall('entry'):
+        new_text = text_map.get(entry.get('name'))
+        if new_text is not None:
+            entry.text = new_text
+            updated += 1
+    return tree, updated
 
-    :param translation_results: 步骤 3 得到的 (entry name, 中文文件名, 原始中文文本, 新中文文本) 列表。
-    """
-    
-    
+def _render_zh_payload(filepath: str, text_map: Dict[str, str]) -> Tuple[str, str, int, str]:
+    """进程池任务：返回 (文件名, 修改后的 XML 文本, 替换条数, 错误信息)，不写回磁盘。"""
+    if not os.path.exists(filepath):
+        return filepath, "", 0, f"文件 {filepath} 不存在，跳过。"
+    try:
+        tree, updated = render_zh_file(filepath, text_map)
+        # 与 tree.write(..., xml_declaration=True) 写出的文件内容完全一致
+        content = ET.tostring(tree.getroot(), encoding='utf-8', xml_declaration=True).decode('utf-8') if updated else ""
+        return filepath, content, updated, ""
+    except Exception as e:
+        return filepath, "", 0, f"处理文件 {filepath} 时发生错误: {e}"
+
+def _group_by_file(translation_results: List[Tuple[str, str, str, str]]) -> Dict[str, Dict[str, str]]:
+    """按文件名分组整理需要更新的 Key-Value 对 (同一 key 出现多次时以最后一次为准)。"""
     files_to_update: Dict[str, Dict[str, str]] = defaultdict(dict)
-    
-    # 1. 整理需要更新的 Key-Value 对，按文件名分组
     for key, zh_file, original_text, new_text in translation_results:
-        files_to_update[zh_file][original_text] = new_text
+        files_to_update[zh_file][key] = new_text
+    return files_to_update
+
+def _map_files(func, files_to_update: Dict[str, Dict[str, str]], max_workers: int = None) -> list:
+    """对每个文件执行 func(文件名, text_map)，文件较多时在进程池中并行。"""
+    max_workers = max_workers or get_config('IMPORT_WORKERS') or os.cpu_count()
+    if len(files_to_update) <= 1 or max_workers <= 1:
+        return [func(filename, text_map) for filename, text_map in files_to_update.items()]
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(files_to_update))) as executor:
+        return list(executor.map(func, files_to_update.keys(), files_to_update.values()))
 
-    # 2. 遍历每个需要更新的文件
-    for filename, text_map in files_to_update.items():
-        filepath = filename
-        if not os.path.exists(filepath):
-            print(f"  ❌ 错误: 文件 {filepath} 不存在，跳过写入。")
+def build_modified_payloads(translation_results: List[Tuple[str, str, str, str]], max_workers: int = None,
+                            filenames: Dict[str, str] = None) -> Dict[str, str]:
+    """
+    在内存中生成修改后的中文 XML 文本，不写回 DECRYPTED_FILES_DIR。
+    :param filenames: 可选的输出字典，填入 {Path ID: 来源文件名}。
+    :return: {Path ID: 修改后的 XML 文本}，只包含确实有条目被替换的文件。
+    """
+    files_to_update = _group_by_file(translation_results)
+    payloads = {}
+    total_updated = 0
+    start = time.perf_counter()
+    for filename, content, updated, error in _map_files(_render_zh_payload, files_to_update, max_workers):
+        if error:
+            print(f"  ❌ 错误: {error}")
             continue
-            
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-            original_content = content
-            
-            # 遍历并替换文件中的所有原始文本
-            # for original_text, new_text in text_map.items():
-            #     print(original_text)
-                # 注意：这里我们使用字符串替换。如果原始文本包含特殊字符或 XML 实体，
-                # 最好在步骤 3 就直接操作 XML 元素 (如果使用类封装的话)。
-                # 鉴于你之前发现的结构，这里尝试精确替换：
-                
-                # 查找原始的 <entry name="KEY">ORIGINAL_TEXT</entry> 结构
-                # 并替换其中的 ORIGINAL_TEXT
-                # 我们假设 <entry> 标签体就是原始文本
-                
-                # 安全替换：查找并替换 XML 标签内的内容
-                # 由于我们只关心中文文件，并且假设它们已经被解密为纯文本XML
-                # 我们可以尝试查找并替换整个 <entry> 标签体
-                
-                # 查找 pattern：<entry name="KEY">ORIGINAL_TEXT</entry>
-                # 我们必须再次解析 XML 来保证修改的精准性。
-                # 由于我们在 read_and_parse_txt 中没有保存 XML 元素，我们必须重新加载。
-
-            # 重新加载 XML，并进行精准修改
-            tree = ET.parse(filepath)
-            root = tree.getroot()
-            modified = False
-            
-            for entry in root.findall('entry'):
-                key = entry.get('name')
-                
-                for k, original_text, new_text in [(t[0], t[2], t[3]) for t in translation_results if t[1] == filename]:
-                    if key == k:
-                        entry.text = new_text
-                        modified = True
-                        # if entry.text.strip() == original_text.strip():
-                        #     entry.text = new_text
-                        #     modified = True
-                        # else:
-                        #     # 警告：Key 匹配，但文本内容不匹配，可能是代码逻辑错误或文件已修改
-                        #     print(f"  ⚠️ 警告: Key {key} 内容不匹配，跳过替换。")
-            
-            if modified:
-                tree.write(filepath, encoding='utf-8', xml_declaration=True)
-                # print(f"  [写入成功] 文件 {filename} 已更新。")
-                
-        except Exception as e:
-            print(f"  ❌ 写入文件 {filename} 时发生错误: {e}")
+        path_id = parse_path_id_from_filename(os.path.basename(filename))
+        if not path_id:
+            print(f"  ❌ 错误: 无法从文件名 {filename} 解析 Path ID，跳过。")
+            continue
+        if updated:
+            payloads[path_id] = content
+            total_updated += updated
+            if filenames is not None:
+                filenames[path_id] = filename
+    get_report().add('xml_rewrite', time.perf_counter() - start, items=total_updated,
+                     chars=sum(len(content) for content in payloads.values()))
+    print(f"  ✅ 已在内存中生成 {len(payloads)} 个文件 ({total_updated} 个条目)。")
+    return payloads
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+def _file_signature(path: str) -> List[int]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class BuildState:
+    """
+    上一次打包的状态：每个 Path ID 的明文内容哈希、按内容哈希缓存的加密结果、上一次的输出文件。
+    再次打包时只需加密内容变化的文件，并在上一次的输出上只修补这些 Path ID。
+    """
+    def __init__(self, cache_dir: str = BUILD_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.payload_dir = os.path.join(cache_dir, "payloads")
+        self.state_path = os.path.join(cache_dir, "state.json")
+        self.previous_asset_path = os.path.join(cache_dir, "previous.assets")
+        os.makedirs(self.payload_dir, exist_ok=True)
+        self.state: Dict[str, Any] = {}
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    self.state = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"  [警告] 打包状态文件 {self.state_path} 无法读取，将完整重新打包: {e}")
+
+    @property
+    def file_hashes(self) -> Dict[str, str]:
+        return self.state.get("files", {})
+
+    def changed(self, hashes: Dict[str, str]) -> List[str]:
+        """返回内容哈希与上一次打包不同 (或新增) 的 Path ID。"""
+        return [path_id for path_id, content_hash in hashes.items() if self.file_hashes.get(path_id) != content_hash]
+
+    def cached_payload(self, content_hash: str) -> Optional[str]:
+        path = os.path.join(self.payload_dir, content_hash + ".txt")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def store_payload(self, content_hash: str, payload: str):
+        with open(os.path.join(self.payload_dir, content_hash + ".txt"), 'w', encoding='utf-8') as f:
+            f.write(payload)
+
+    def previous_output(self, original_asset_path: str) -> Optional[str]:
+        """上一次的输出文件仍存在、未被改动且基于同一个原始资源文件时返回其路径。"""
+        output = self.state.get("output")
+        if not output or output.get("mode") != "asset" or not os.path.exists(output["path"]):
+            return None
+        if output["signature"] != _file_signature(output["path"]):
+            return None
+        if self.state.get("original") != _file_signature(original_asset_path):
+            return None
+        return output["path"]
+
+    def save(self, hashes: Dict[str, str], output_path: str, original_asset_path: str):
+        self.state = {
+            "original": _file_signature(original_asset_path),
+            "files": hashes,
+            "output": {"path": output_path, "signature": _file_signature(output_path),
+                       "mode": "patch" if patch_output_enabled() else "asset"},
+        }
+        with open(self.state_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=4)
+
+
+def repack_changed(payloads: Dict[str, str], version: int,
+                   encrypt: Callable[[Dict[str, str]], Dict[str, str]], state: BuildState = None) -> str:
+    """
+    增量打包：
+    1. 计算每个文件的内容哈希，与上一次打包比较，找出变化的 Path ID；
+    2. 只加密变化且没有缓存的文件 (加密结果按内容哈希缓存)；
+    3. 上一次的输出可用时只在其上修补变化的 Path ID，否则从原始资源文件修补全部 Path ID。
+    :param encrypt: {Path ID: 明文} -> {Path ID: 加密结果}，例如 codec.encrypt_many。
+    """
+    state = state or BuildState()
+    original_asset_path = get_config('ORIGINAL_ASSET_PATH')
+    output_path = get_config('PACKED_ASSET_FORMAT').format(version)
+
+    hashes = {path_id: _content_hash(content) for path_id, content in payloads.items()}
+    changed = state.changed(hashes)
+    encrypted_all = {}
+    to_encrypt = {}
+    for path_id, content_hash in hashes.items():
+        cached = state.cached_payload(content_hash)
+        if cached is None:
+            to_encrypt[path_id] = payloads[path_id]
+        else:
+            encrypted_all[path_id] = cached
+    print(f"  -> {len(changed)}/{len(payloads)} 个文件与上一次打包不同，需要加密 {len(to_encrypt)} 个 (其余使用缓存)。")
+    if to_encrypt:
+        with get_report().stage('encrypt', items=len(to_encrypt),
+                                chars=sum(len(content) for content in to_encrypt.values())) as stats:
+            encrypted = encrypt(to_encrypt)
+            stats.bytes = sum(len(payload) for payload in encrypted.values())
+        for path_id, payload in encrypted.items():
+            state.store_payload(hashes[path_id], payload)
+        encrypted_all.update(encrypted)
+
+    # 补丁总是相对原始资源文件生成，因此补丁模式下不在上一次的输出上修补
+    previous = None if patch_output_enabled() else state.previous_output(original_asset_path)
+    # 上一次修补过、这次不再修改的 Path ID 需要恢复原文，只能从原始资源文件重新打包
+    if previous and set(state.file_hashes) <= set(hashes):
+        if not changed:
+            if os.path.abspath(previous) != os.path.abspath(output_path):
+                shutil.copyfile(previous, output_path)
+            print(f"  ✅ 没有文件发生变化，直接使用上一次的输出: {output_path}")
+            state.save(hashes, output_path, original_asset_path)
+            return output_path
+        if os.path.abspath(previous) == os.path.abspath(output_path):
+            # 不能在读取的同时覆盖同一个文件
+            shutil.move(previous, state.previous_asset_path)
+            previous = state.previous_asset_path
+        print(f"  -> 在上一次的输出 {previous} 上修补 {len(changed)} 个 Path ID。")
+        packed = repack_assets({path_id: encrypted_all[path_id] for path_id in changed}, version,
+                               base_asset_path=previous)
+    else:
+        packed = repack_assets(encrypted_all, version)
+
+    if packed:
+        state.save(hashes, packed, original_asset_path)
+    return packed
+
+def repack_in_memory(translation_results: List[Tuple[str, str, str, str]], version: int,
+                     codec: TextAssetCodec = None) -> str:
+    """
+    内存打包：生成修改后的 XML -> 编解码器加密 -> 只修补这些 Path ID。
+    全程不经过 output_decrypted / output_encrypted 临时目录。
+    """
+    codec = codec or get_codec()
+    payloads = build_modified_payloads(translation_results)
+    if not payloads:
+        print("[提示] 没有翻译数据需要重新打包。")
+        return ""
+    print(f"  -> 使用编解码器 {codec.name}。")
+    return repack_changed(payloads, version, codec.encrypt_many)
+
+def encrypt_with_staging(payloads: Dict[str, str], filenames: Dict[str, str]) -> Dict[str, str]:
+    """
+    files 模式的加密：只把变化的文件写入单独的暂存目录 (文件名与 DECRYPTED_FILES_DIR 中相同)，
+    外部工具只加密暂存目录中的文件。DECRYPTED_FILES_DIR 保持为原始解密结果，export.py 可继续使用。
+    """
+    staging_dir = os.path.join(BUILD_CACHE_DIR, "staged_decrypted")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+    for path_id, content in payloads.items():
+        with open(os.path.join(staging_dir, os.path.basename(filenames[path_id])), 'w', encoding='utf-8') as f:
+            f.write(content)
+    print(f"  -> 已暂存 {len(payloads)} 个文件，运行外部加密工具...")
+    if not run_decryptor(staging_dir, ENCRYPTED_BASE64_DIR, "-e"):
+        raise RuntimeError("加密步骤失败，跳过重新打包。")
+    encrypted_data = encrypt_modified_assets(set(payloads))
+    missing = set(payloads) - set(encrypted_data)
+    if missing:
+        raise RuntimeError(f"外部工具未输出 {len(missing)} 个文件，例如 Path ID {sorted(missing)[0]}。")
+    return encrypted_data
 
 # --- 主执行逻辑 ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="将翻译结果写回并重新打包资源文件")
+    parser.add_argument('--mode', choices=['files', 'memory'], default=None,
+                        help="files: 经由临时目录和外部工具 (默认，可用配置 REPACK_MODE 修改)；memory: 全程在内存中完成")
+    parser.add_argument('--codec', default=None, help="memory 模式使用的编解码器: auto/aes/subprocess/identity")
+    parser.add_argument('--patch', action='store_true', help="只输出补丁文件 (等同于配置 PACKED_OUTPUT_MODE=patch)")
+    args = parser.parse_args()
+
     # 必须在开头初始化配置
     init_config()
+    if args.patch:
+        get_config()['PACKED_OUTPUT_MODE'] = 'patch'
     # 1. 查找最新版本的翻译文件
     translated_json_file, latest_version,_ = find_latest_translation_file()
     print(f"---1. 查找最新版本的翻译文件,文件版本:{latest_version}---")
-    with open(translated_json_file, 'r', encoding='utf-8') as f:
-        translated_data = json.load(f)
+    # 只比较文件大小与修改时间，不重新读取版本文件
+    for problem in get_version_catalog().verify([latest_version]) if latest_version else []:
+        print(f"  [警告] 版本目录: {problem}")
+    report = start_report('import', latest_version)
+    translated_data = load_translation_file(
+        translated_json_file, ['key', 'zh_filepath', 'original_zh_text', 'secondary_translated_text']
+    )
 
     # 2. 按原始文件路径分组翻译结果
     translation_results = []
@@ -244,23 +394,27 @@ if __name__ == "__main__":
             item['secondary_translated_text']
         )
         translation_results.append(translation_item)
-    print(f"---2.写入结果到明码txt文件---")
-    write_modified_files(translation_results) # 写入结果到文件
 
-    print(f"---3.运行外部加密工具---")
-    if not run_decryptor(DECRYPTED_FILES_DIR, ENCRYPTED_BASE64_DIR, "-e"):
-        print("  ❌ 加密步骤失败，跳过重新打包。")
-    else:
-        print("加密成功")
+    if (args.mode or get_config('REPACK_MODE') or 'files') == 'memory':
+        print("---2.内存打包 (不经过临时目录)---")
+        packed_asset_path = repack_in_memory(translation_results, latest_version, get_codec(args.codec))
+        print(f"打包完成,文件名{packed_asset_path}")
+        print(f"  -> 运行报告已保存到 {report.save(get_config('REPORT_DIR'))}。")
+        exit(0)
 
-    print("---4.准备加密和获取 Base64 字符串---")
-    encrypted_data = encrypt_modified_assets()
-    
-    # 5. 打包 (保持不变)
-    print("---5.重新打包 Asset Bundle---")
-    if encrypted_data:
-        _, latest_version,_ = find_latest_translation_file()
-        packed_asset_path = repack_assets(encrypted_data, latest_version)
-    else:
+    print("---2.生成修改后的明码txt内容---")
+    filenames = {}
+    payloads = build_modified_payloads(translation_results, filenames=filenames)
+    if not payloads:
         print("[提示] 没有翻译数据需要重新打包。")
+        exit(0)
+
+    # 3~5. 只把内容变化的文件暂存到 BUILD_CACHE_DIR 并加密，再只修补它们的 Path ID
+    print("---3.暂存变化的文件、运行外部加密工具并重新打包---")
+    try:
+        packed_asset_path = repack_changed(payloads, latest_version, lambda items: encrypt_with_staging(items, filenames))
+    except RuntimeError as e:
+        print(f"  ❌ {e}")
+        exit(1)
     print(f"打包完成,文件名{packed_asset_path}")
+    print(f"  -> 运行报告已保存到 {report.save(get_config('REPORT_DIR'))}。")
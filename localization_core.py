@@ -1,16 +1,21 @@
 import json
 import os
 import re
-import requests
 import time
-import random
 import hashlib
 from typing import List, Tuple, Dict
 from collections import defaultdict
-from typing import List, Tuple, Dict, Any # 引入 Any
-from qcloud_core import tmt_translate_batch
+from typing import List, Tuple, Dict, Any, NamedTuple # 引入 Any
+from translation_backends import get_translator
+from translation_memory import TranslationMemory
+from version_store import VersionStore, VERSION_FILE_PATTERN
+from version_catalog import VersionCatalog, DEFAULT_CATALOG_PATH
+from run_report import RunReport, get_report
 # --- 全局配置变量，将在 init_config 中加载 ---
 _CONFIGURATION = {}
+_TRANSLATION_MEMORY = None
+_VERSION_STORE = None
+_VERSION_CATALOG = None
 def init_config(config_file="config.json"):
     """加载配置并初始化白名单。"""
     global _CONFIGURATION
@@ -45,6 +50,20 @@ def get_config(key: str = None):
     if key is None:
         return _CONFIGURATION
     return _CONFIGURATION.get(key)
+def get_translation_memory():
+    """
+    获取（首次调用时打开）片段级翻译记忆库。配置 TM_ENABLED 为 false 时返回 None。
+    打开时会按 TM_MAX_ENTRIES / TM_MAX_AGE_DAYS 执行一次淘汰。
+    """
+    global _TRANSLATION_MEMORY
+    if not get_config('TM_ENABLED'):
+        return None
+    if _TRANSLATION_MEMORY is None:
+        db_path = get_config('TM_DB_PATH') or "./data/translation_memory.db"
+        _TRANSLATION_MEMORY = TranslationMemory(db_path)
+        removed = _TRANSLATION_MEMORY.evict(get_config('TM_MAX_ENTRIES'), get_config('TM_MAX_AGE_DAYS'))
+        print(f"  [配置] 已加载翻译记忆库 {db_path}，共 {len(_TRANSLATION_MEMORY)} 条" + (f"，淘汰 {removed} 条。" if removed else "。"))
+    return _TRANSLATION_MEMORY
 # --- 核心常量 ---
 # 特殊字符分隔符（包含编码和非编码，以及数字占位符）
 # ENCODED_DELIMITER_TAGS = r'(&lt;br&gt;|&lt;page&gt;|&lt;hpage&gt;|<br>|<hpage>|<page>|&lt;page=M&gt;|"&lt;page=S&gt;|&lt;page=B&gt;)'
@@ -52,6 +71,7 @@ def get_config(key: str = None):
 ENCODED_DELIMITER_TAGS = r'(&lt;[a-zA-Z0-9_/=]+&gt;|&amp;lt;[a-zA-Z0-9_/=]+&amp;gt;|<br>|<hpage>|<page>|&amp;#\d+;|&amp;)'
 OTHER_DELIMITERS = r'(&amp;#[0-9]+;|{[0-9]+})'
 DELIMITERS = re.compile(f'({ENCODED_DELIMITER_TAGS}|{OTHER_DELIMITERS})', re.IGNORECASE)
+DELIMITER_LEAD_CHARS = '&<{' # 所有分隔符的首字符
 
 PUNC_MARK= {  # 标点替换
     "&#8220;" : "“",
@@ -75,189 +95,201 @@ class TextAssetInfo:
         return self.__dict__
 
 # --- 语言检测函数 ---
+# 判定为英文的特征句 (优先级最高)
+EN_MARKERS = (
+    'Act1Start',
+    'Full Chamber to the kingdom of the White Wyrm',
+    'The blade is honed to a fine edge',
+)
+# 单次扫描的字符类计数器，分组编号对应 _LANG_GROUPS
+_LANG_CHAR_PATTERN = re.compile(
+    r'([\u3040-\u309F\u30A0-\u30FF])'   # 1: 日文假名 (平假名 + 片假名)
+    r'|([\u4e00-\u9fff])'                # 2: 汉字
+    r'|([\uac00-\ud7af])'                # 3: 韩文谚文
+    r'|([\u0400-\u04ff])'                # 4: 西里尔字母
+    r'|([\u0370-\u03ff])'                # 5: 希腊字母
+    r'|((?i:[ãõçáéíóúàèìòùäüßö]))'       # 6: 葡萄牙语等特殊拉丁字符 (忽略大小写)
+)
+_LANG_GROUPS = {1: 'JP', 2: 'ZH', 3: 'KO', 4: 'RU', 5: 'EL', 6: 'PT'}
+_KANA_PATTERN = re.compile(r'[\u3040-\u309F\u30A0-\u30FF]')
+
 def simple_detect_file_language(entries_list: List[TextAssetInfo]) -> str:
     """
     根据文件中所有条目聚合的字符特征，快速判断文件的语言。
+    逐条目单次扫描各字符类的计数，并在结果确定后提前结束：
+    假名超过 3 个即判定为日文；汉字超过 1 个后只需继续统计假名。
 
     :param entries_list: 文件中所有 TextAssetInfo 对象的列表。
-    :return: 文件的语言代码 ('ZH', 'JP', 'KO', 'RU', 'PT', 'EN', 'UNKNOWN')。
+    :return: 文件的语言代码 ('ZH', 'JP', 'KO', 'RU', 'EL', 'PT', 'EN', 'UNKNOWN')。
     """
     if not entries_list:
         return 'UNKNOWN'
 
-    # 聚合所有非空文本
-    full_text = " ".join(e.text for e in entries_list if e.text.strip())
-    
-    # 设定一个阈值，例如至少需要 5 个特征字符
-    THRESHOLD = 3
+    # 只统计非空文本
+    texts = [e.text for e in entries_list if e.text.strip()]
 
     # 使用 Python 的 in 操作符进行简单、高效的字符串包含检查
-    if 'Act1Start' in full_text:
-        return 'EN'
-    if 'Full Chamber to the kingdom of the White Wyrm' in full_text:
-        return 'EN'
-    if 'The blade is honed to a fine edge' in full_text:
-        return 'EN'
-    # --- 3. 日文 (JP) ---
-    # 平假名/片假名：优先识别日文的独有字符
-    # 范围: \u3040-\u309F (平假名) 和 \u30A0-\u30FF (片假名)
-    if len(re.findall(r'[\u3040-\u309F\u30A0-\u30FF]', full_text)) > 3:
-        return 'JP'
-    # --- 4. 中文 (ZH) ---
-    # 汉字：最后检查汉字，因为它与日文有重叠，但日文假名优先排除
-    # 范围: \u4e00-\u9fff
-    if len(re.findall(r'[\u4e00-\u9fff]', full_text)) > 1:
+    for text in texts:
+        if any(marker in text for marker in EN_MARKERS):
+            return 'EN'
+
+    counts = {code: 0 for code in _LANG_GROUPS.values()}
+    for text in texts:
+        if counts['ZH'] > 1:
+            # 已确定至少是中文，只有日文假名能改变结果
+            counts['JP'] += len(_KANA_PATTERN.findall(text))
+        else:
+            for match in _LANG_CHAR_PATTERN.finditer(text):
+                counts[_LANG_GROUPS[match.lastindex]] += 1
+        if counts['JP'] > 3:
+            return 'JP'
+
+    # 优先级：日文假名 > 汉字 > 谚文 > 西里尔 > 希腊 > 特殊拉丁
+    if counts['ZH'] > 1:
         return 'ZH'
-    # --- 1. 韩语 (KO) ---
-    # 谚文 (Hangul) 范围: \uac00-\ud7af
-    if len(re.findall(r'[\uac00-\ud7af]', full_text)) >= 1:
-        return 'KO'
-    
-    # --- 2. 俄语 (RU) ---
-    # 西里尔字母 (Cyrillic) 范围: \u0400-\u04ff
-    if len(re.findall(r'[\u0400-\u04ff]', full_text)) >= 1:
-        return 'RU'
-    
-    # --- 3. 希腊语 (EL/GR) --- 【新增部分】
-    # 希腊字母范围: \u0370-\u03ff
-    greek_chars = re.findall(r'[\u0370-\u03ff]', full_text)
-    if len(greek_chars) >= 1:
-        return 'EL'
-
-    # --- 5. 葡萄牙语 (PT) ---
-    # 特殊拉丁字符
-    pt_chars = re.findall(r'[ãõçáéíóúàèìòùäüßö]', full_text, re.IGNORECASE)
-    if len(pt_chars) >= 1:
-        return 'PT'
-
-    # --- 6. 英文/其他 (EN) ---
-    # 如果文本足够长（比如 50 个字符以上），且没有检测到上述特征，默认为英文。
-    if len(full_text.strip()) > 1:
+    for code in ('KO', 'RU', 'EL', 'PT'):
+        if counts[code] >= 1:
+            return code
+
+    # --- 英文/其他 (EN) ---
+    # 没有检测到上述特征且聚合文本长度超过 1 个字符，默认为英文。
+    if len(texts) > 1 or (texts and len(texts[0].strip()) > 1):
         return 'EN'
 
     return 'UNKNOWN'
 
-# --- 百度翻译核心函数 ---
-def baidu_translate_single_batch(texts: List[str], from_lang: str, to_lang: str) -> List[str]:
-    # ... (与你之前的实现相同，包含 "哈基米" 错误返回逻辑) ...
-    
-    APP_ID = get_config('Baidu_APP_ID')
-    API_KEY = get_config('Baidu_API_KEY')
-    DELAY = get_config('API_DELAY_SECONDS')
-    
-    if not texts:
-        return []
+# 字符解码和编码
+class EncodedText(NamedTuple):
+    """
+    单个文本的紧凑重构计划。
+    text 为预处理 (标点替换) 后的文本；第 i 个待翻译片段占据 text[starts[i]:ends[i]] (含首尾空白)，
+    segments[i] 为其 strip 后的内容。片段之外的部分 (分隔符与纯空白) 在解码时原样保留。
+    """
+    text: str
+    segments: Tuple[str, ...]
+    starts: Tuple[int, ...]
+    ends: Tuple[int, ...]
 
-    ERROR_PLACEHOLDER = ["哈基米"] * len(texts) 
-    # return ERROR_PLACEHOLDER
-    
-    time.sleep(DELAY) # 强制延时以遵守 QPS 限制
+EMPTY_ENCODING = EncodedText("", (), (), ())
 
-    query = "\n".join(texts)
-    salt = str(random.randint(32768, 65536))
-    sign = hashlib.md5((APP_ID + query + salt + API_KEY).encode()).hexdigest()
+class Segmenter:
+    """
+    分段/编码引擎：标点替换与分隔符都预编译为单个正则，编码结果按原文缓存。
+    多轮翻译中不变的源文本 (以及收敛为相同译文的条目) 只需编码一次。
+    """
+    def __init__(self, delimiters: re.Pattern = DELIMITERS, punc_mark: Dict[str, str] = PUNC_MARK,
+                 lead_chars: str = DELIMITER_LEAD_CHARS, cache_size: int = 200000):
+        lead_class = '[' + ''.join(re.escape(char) for char in sorted(set(lead_chars))) + ']'
+        # 先用前瞻断言排除不可能开始分隔符的位置，避免在每个字符上尝试整组忽略大小写的分支
+        self.delimiters = re.compile(f'(?={lead_class})' + delimiters.pattern, delimiters.flags)
+        self.punc_mark = punc_mark
+        # 按长度降序排列，保证 '&amp;#8217;' 优先于 '&#8217;'，与逐项 str.replace 的结果一致
+        self.punc_pattern = re.compile('|'.join(re.escape(item) for item in sorted(punc_mark, key=len, reverse=True)))
+        # 分隔符与标点实体的首字符，文本中不含这些字符时可跳过正则扫描
+        trigger_chars = set(lead_chars) | {item[0] for item in punc_mark}
+        self.trigger_pattern = re.compile('[' + ''.join(re.escape(char) for char in sorted(trigger_chars)) + ']')
+        self.cache_size = cache_size
+        self._cache: Dict[str, EncodedText] = {}
 
-    # ... (API 请求和错误处理逻辑保持不变) ...
-    URL = 'http://api.fanyi.baidu.com/api/trans/vip/translate'
-    payload = {'appid': APP_ID, 'q': query, 'from': from_lang, 'to': to_lang, 'salt': salt, 'sign': sign}
-    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-    
-    try:
-        r = requests.post(URL, params=payload, headers=headers, proxies=None)
-        r.raise_for_status() 
-        result = r.json()
-        
-        if 'trans_result' in result:
-            return [item['dst'] for item in result['trans_result']]
-            
-        elif 'error_code' in result:
-            if result['error_code'] == '54003':
-                 print("  ❌ 百度翻译 API 错误：QPS 限制触发！请检查延时设置。")
-            else:
-                 print(f"  ❌ 百度翻译 API 错误：{result['error_code']} - {result.get('error_msg', '未知错误')}")
-            return ERROR_PLACEHOLDER 
-            
-        else:
-            print(f"  ❌ 百度翻译 API 响应格式错误：{result}")
-            return ERROR_PLACEHOLDER
+    def encode(self, text: str) -> EncodedText:
+        cached = self._cache.get(text)
+        if cached is not None:
+            return cached
+        encoded = self._encode(text)
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[text] = encoded
+        return encoded
+
+    def _encode(self, text: str) -> EncodedText:
+        if not text.strip():
+            return EMPTY_ENCODING
+        if self.trigger_pattern.search(text) is None:
+            return EncodedText(text, (text.strip(),), (0,), (len(text),))
+
+        # 预处理：将双重编码实体解码为字符，以便翻译时被视作普通标点
+        decoded_text = self.punc_pattern.sub(lambda m: self.punc_mark[m.group(0)], text)
+
+        segments, starts, ends = [], [], []
+        last_end = 0
+        # 分隔符之间的文本片段：strip 后非空的需要翻译，纯空白的与分隔符一样原样保留
+        for match in self.delimiters.finditer(decoded_text):
+            start, end = match.span()
+            if start > last_end:
+                stripped_segment = decoded_text[last_end:start].strip()
+                if stripped_segment:
+                    segments.append(stripped_segment)
+                    starts.append(last_end)
+                    ends.append(start)
+            last_end = end
+
+        # 最后一个分隔符之后的尾部文本
+        stripped_segment = decoded_text[last_end:].strip()
+        if stripped_segment:
+            segments.append(stripped_segment)
+            starts.append(last_end)
+            ends.append(len(decoded_text))
+
+        return EncodedText(decoded_text, tuple(segments), tuple(starts), tuple(ends))
+
+    @staticmethod
+    def decode(encoded: EncodedText, translated_texts: List[str]) -> str:
+        """按偏移量把译文填回片段位置；译文数量不足时缺少译文的片段被丢弃 (与旧实现一致)。"""
+        text = encoded.text
+        if len(encoded.starts) == 1 and len(translated_texts) == 1:
+            # 绝大多数条目只有一个片段
+            return text[:encoded.starts[0]] + translated_texts[0] + text[encoded.ends[0]:]
+        parts = []
+        last_end = 0
+        for start, end, translated in zip(encoded.starts, encoded.ends, translated_texts):
+            parts.append(text[last_end:start])
+            parts.append(translated)
+            last_end = end
+        for start, end in zip(encoded.starts[len(translated_texts):], encoded.ends[len(translated_texts):]):
+            parts.append(text[last_end:start])
+            last_end = end
+        parts.append(text[last_end:])
+        return "".join(parts)
+
+    def clear_cache(self):
+        self._cache.clear()
+
+SEGMENTER = Segmenter()
 
-    except requests.exceptions.RequestException as e:
-        print(f"  ❌ 百度翻译请求失败: {e}")
-        return ERROR_PLACEHOLDER
-        
-    except Exception as e:
-        print(f"  ❌ 翻译过程中发生未知错误: {e}")
-        return ERROR_PLACEHOLDER
-# 字符解码和编码
 def _encode_text(text: str) -> Tuple[List[str], List[Tuple[str, str]]]:
     """
-    对单个文本进行分段和编码，生成纯文本片段和重构映射表。
-    使用 re.finditer 手动控制分词，避免 re.split 产生空字符串和重复。
-    
+    对单个文本进行分段和编码，生成纯文本片段和重构映射表 [('T'|'D', 原始片段), ...]。
+    兼容旧接口，内部使用 SEGMENTER；新代码请直接使用 SEGMENTER.encode / SEGMENTER.decode。
+
     :return: (纯文本片段列表, 重构映射表)
     """
-    if not text.strip():
+    encoded = SEGMENTER.encode(text)
+    if not encoded.text:
         return [], []
-    
-    # 预处理：将双重编码实体解码为字符，以便翻译时被视作普通标点
-    decoded_text = text
-    for item in PUNC_MARK:
-        decoded_text = decoded_text.replace(item, PUNC_MARK[item])
-
-    # decoded_text = text.replace('&amp;#8217;', '’') 
-    # decoded_text = decoded_text.replace('&#8217;', '’')
-    # decoded_text = decoded_text.replace('&amp;#8216;', '‘') 
-    # decoded_text = decoded_text.replace('&#8216;', '‘')
-    
-    
-    text_to_translate: List[str] = []
+    text = encoded.text
     reconstruction_map: List[Tuple[str, str]] = []
-    
     last_end = 0
-    
-    # 遍历所有匹配到的分隔符
-    for match in DELIMITERS.finditer(decoded_text):
-        start, end = match.span()
-        delimiter_value = match.group(0) # 获取匹配到的整个分隔符字符串
+    for start, end in zip(encoded.starts, encoded.ends):
+        reconstruction_map.extend(_split_delimiters(text[last_end:start]))
+        reconstruction_map.append(('T', text[start:end]))
+        last_end = end
+    reconstruction_map.extend(_split_delimiters(text[last_end:]))
+    return list(encoded.segments), reconstruction_map
 
-        # 1. 提取匹配项之前的“文本片段”
-        # 提取从上一个匹配项结束位置到当前匹配项开始位置之间的文本
-        text_segment = decoded_text[last_end:start]
-        
-        # 只有在文本片段非空时才处理
-        if text_segment:
-            stripped_segment = text_segment.strip()
-            
-            # 如果 strip 后还有内容，则这是一个需要翻译的文本片段
-            if stripped_segment:
-                text_to_translate.append(stripped_segment)
-                # 映射表存储原始片段 (保留空格)
-                reconstruction_map.append(('T', text_segment))
-            else:
-                # 如果是纯空格（如 "  "），将其视为分隔符（D）保留
-                reconstruction_map.append(('D', text_segment))
-                
-        # 2. 提取分隔符本身
-        # 避免连续分隔符时产生重复，因为这里是按 finditer 的结果逐个处理的
-        reconstruction_map.append(('D', delimiter_value))
-        
-        # 更新上一个匹配项的结束位置
+def _split_delimiters(text: str) -> List[Tuple[str, str]]:
+    """把两个待翻译片段之间的部分拆回旧映射表中的分隔符/空白项。"""
+    items = []
+    last_end = 0
+    for match in DELIMITERS.finditer(text):
+        start, end = match.span()
+        if start > last_end:
+            items.append(('D', text[last_end:start]))
+        items.append(('D', match.group(0)))
         last_end = end
+    if last_end < len(text):
+        items.append(('D', text[last_end:]))
+    return items
 
-    # 3. 处理最后一个分隔符之后的“尾部文本”
-    tail_segment = decoded_text[last_end:]
-    if tail_segment:
-        stripped_segment = tail_segment.strip()
-        
-        if stripped_segment:
-            text_to_translate.append(stripped_segment)
-            reconstruction_map.append(('T', tail_segment))
-        else:
-            # 尾部是纯空格
-            reconstruction_map.append(('D', tail_segment))
-    
-    # 注意：我们不再需要 _decode_text 中那些处理空格的复杂逻辑，因为空格已被包含在 'T' 或 'D' 片段中。
-    return text_to_translate, reconstruction_map
 def _decode_text(translated_texts: List[str], reconstruction_map: List[Tuple[str, str]]) -> str:
     """
     使用翻译结果和映射表重构单个文本。
@@ -278,7 +310,11 @@ def _decode_text(translated_texts: List[str], reconstruction_map: List[Tuple[str
     final_result = "".join(final_parts)
     
     return final_result
-def translate_entries_batch(entry_list: List[Dict[str, Any]], from_lang: str, to_lang: str, source_key: str = None) -> List[Dict[str, Any]]:
+def translate_entries_batch(
+    entry_list: List[Dict[str, Any]], from_lang: str, to_lang: str, source_key: str = None,
+    journal=None, rate_limiter=None, verbose: bool = True, report: RunReport = None,
+    stats: Dict[str, int] = None
+) -> List[Dict[str, Any]]:
     """
     【批量翻译核心函数】
     对整个 entry 列表进行批量分段、翻译和重构。
@@ -286,14 +322,23 @@ def translate_entries_batch(entry_list: List[Dict[str, Any]], from_lang: str, to
     :param entry_list: 待翻译的条目列表 (来自 JSON 文件)。
     :param from_lang: 源语言代码。
     :param to_lang: 目标语言代码。
+    :param journal: 可选的断点日志 (见 translate.TranslationJournal)，提供 translations 字典与 record(原文列表, 译文列表)。
+    :param rate_limiter: 可选的额外限速器 (各账号自身的 QPS 限速始终生效)。
+    :param verbose: 为 False 时不打印进度信息 (流式流水线中多个阶段并行时使用)。
+    :param report: 记录 encode / api_batch / decode 阶段统计的 RunReport，默认使用当前报告。
+    :param stats: 可选的统计字典，累加片段数、字符数与实际发送到 API 的量 (由调用方持有，并行阶段互不覆盖)。
     :return: 包含翻译结果的条目列表。
     """
     # -----------------------------------------------------------
     # 阶段 1: 全局分段和编码
     # -----------------------------------------------------------
     global_pure_text_list = []
-    global_reconstruction_maps = []
+    global_encodings: List[EncodedText] = []
     global_text_pointer = [] # 记录每个 entry 对应 pure_text_list 的起始索引
+    log = print if verbose else (lambda *args, **kwargs: None)
+    report = report or get_report()
+    stage_start = time.perf_counter()
+    source_chars = 0
 
     for entry in entry_list:
         if source_key == 'original_en_text':
@@ -309,49 +354,112 @@ def translate_entries_batch(entry_list: List[Dict[str, Any]], from_lang: str, to
         #     # 迭代翻译时，我们使用上一个版本的中文翻译结果
         #     source_text = entry.get('translated_zh_text') or entry['original_zh_text']
             
-        pure_texts, mapping = _encode_text(source_text)
+        encoded = SEGMENTER.encode(source_text)
         
         global_text_pointer.append(len(global_pure_text_list)) # 记录该 entry 的起始索引
-        global_pure_text_list.extend(pure_texts)
-        global_reconstruction_maps.append(mapping)
+        global_pure_text_list.extend(encoded.segments)
+        global_encodings.append(encoded)
+        source_chars += len(encoded.text)
+    report.add('encode', time.perf_counter() - stage_start, items=len(entry_list), chars=source_chars)
     
     if not global_pure_text_list:
-        print("  [警告] 待翻译的纯文本列表为空。")
+        log("  [警告] 待翻译的纯文本列表为空。")
         return entry_list
 
     # -----------------------------------------------------------
-    # 阶段 2: 批量翻译 (调用腾讯云 API)
+    # 阶段 2: 批量翻译 (调用 TRANSLATION_BACKENDS 中的翻译服务)
     # -----------------------------------------------------------
-    print(f"  -> 总共需要翻译 {len(global_pure_text_list)} 个文本片段。")
+    log(f"  -> 总共需要翻译 {len(global_pure_text_list)} 个文本片段。")
 
-    # 从配置中获取所有需要的参数，并以字典形式传递给 qcloud_core
-    config_for_qcloud = {
+    # 从配置中获取所有需要的参数，并以字典形式传递给翻译服务 (translation_backends)
+    config_for_backends = {
         'Tencent_Secret_Id': get_config('Tencent_Secret_Id'),
         'Tencent_Secret_Key': get_config('Tencent_Secret_Key'),
         'Tencent_Region': get_config('Tencent_Region'),
         'Tencent_Project_ID': get_config('Tencent_Project_ID'),
+        'TMT_CREDENTIALS': get_config('TMT_CREDENTIALS'),
         'API_DELAY_SECONDS': get_config('API_DELAY_SECONDS'),
+        'TMT_QPS': get_config('TMT_QPS'),
+        'TMT_ADAPTIVE_RATE': get_config('TMT_ADAPTIVE_RATE'),
+        'TMT_MAX_QPS': get_config('TMT_MAX_QPS'),
+        'TMT_MAX_WORKERS': get_config('TMT_MAX_WORKERS'),
+        'TMT_MAX_RETRIES': get_config('TMT_MAX_RETRIES'),
+        'TMT_ENDPOINT_URL': get_config('TMT_ENDPOINT_URL'),
+        'Baidu_APP_ID': get_config('Baidu_APP_ID'),
+        'Baidu_API_KEY': get_config('Baidu_API_KEY'),
+        'BAIDU_QPS': get_config('BAIDU_QPS'),
+        'BAIDU_ENDPOINT_URL': get_config('BAIDU_ENDPOINT_URL'),
+        'TRANSLATION_BACKENDS': get_config('TRANSLATION_BACKENDS'),
+        'BACKEND_CHUNK_SIZE': get_config('BACKEND_CHUNK_SIZE'),
+        'RATE_LIMITER': rate_limiter,
+        'VERBOSE': verbose,
+        'RUN_REPORT': report,
     }
     
-    # 假设 tmt_translate_batch 会处理分批和限制，并返回一个完整的翻译结果列表
-    translated_pure_text_list = tmt_translate_batch(
-        global_pure_text_list, 
+    # 去重：相同片段只翻译一次，结果再通过映射扇出到每个出现位置
+    unique_text_list = list(dict.fromkeys(global_pure_text_list))
+    total_chars = sum(len(text) for text in global_pure_text_list)
+    unique_chars = sum(len(text) for text in unique_text_list)
+    log(f"  -> 去重后剩余 {len(unique_text_list)}/{len(global_pure_text_list)} 个片段 "
+          f"({len(unique_text_list) / len(global_pure_text_list):.1%})，"
+          f"字符 {unique_chars}/{total_chars} ({unique_chars / max(total_chars, 1):.1%})。")
+
+    # 断点日志中已完成的片段直接复用
+    translation_map = {}
+    if journal is not None:
+        translation_map = {text: journal.translations[text] for text in unique_text_list if text in journal.translations}
+        if translation_map:
+            log(f"  -> 从断点日志恢复 {len(translation_map)} 个片段。")
+
+    # 再查询翻译记忆库，只有未命中的片段才发送到 API
+    tm = get_translation_memory()
+    if tm is not None:
+        lookup_list = [text for text in unique_text_list if text not in translation_map]
+        tm_hits = tm.lookup(lookup_list, from_lang, to_lang)
+        translation_map.update(tm_hits)
+        log(f"  -> 翻译记忆库命中 {len(tm_hits)} 个片段，未命中 {len(lookup_list) - len(tm_hits)} 个。")
+    pending_text_list = [text for text in unique_text_list if text not in translation_map]
+    if stats is not None:
+        for key, value in dict(
+            segments=len(global_pure_text_list),
+            unique_segments=len(unique_text_list),
+            chars=total_chars,
+            api_segments=len(pending_text_list),
+            api_chars=sum(len(text) for text in pending_text_list),
+        ).items():
+            stats[key] = stats.get(key, 0) + value
+
+    def on_batch_done(sources: List[str], targets: List[str]):
+        # 每个批次完成后立即写入，崩溃后重跑可直接命中
+        if tm is not None:
+            tm.store(zip(sources, targets), from_lang, to_lang)
+        if journal is not None:
+            journal.record(sources, targets)
+
+    # 翻译服务负责分批、限速与重试，并返回一个完整的翻译结果列表
+    translated_pending_list = get_translator(config_for_backends).translate(
+        pending_text_list, 
         from_lang, 
         to_lang,
-        config_for_qcloud # 传递配置字典
-    )
+        on_batch_done=on_batch_done
+    ) if pending_text_list else []
 
-    if len(translated_pure_text_list) != len(global_pure_text_list):
+    if len(translated_pending_list) != len(pending_text_list):
         print("  [严重错误] API 返回的翻译片段数量与发送数量不匹配！跳过重构。")
         return entry_list
+
+    # 合并记忆库结果与 API 结果，扇出为与 global_pure_text_list 一一对应的列表（供 global_text_pointer 切片）
+    translation_map.update(zip(pending_text_list, translated_pending_list))
+    translated_pure_text_list = [translation_map[text] for text in global_pure_text_list]
     
     # -----------------------------------------------------------
     # 阶段 3: 全局重构和解码
     # -----------------------------------------------------------
-    
+    stage_start = time.perf_counter()
+    decoded_chars = 0
     for i, entry in enumerate(entry_list):
         start_index = global_text_pointer[i]
-        mapping = global_reconstruction_maps[i]
+        encoded = global_encodings[i]
         # 确定该 entry 包含多少个纯文本片段
         if i + 1 < len(global_text_pointer):
             end_index = global_text_pointer[i+1]
@@ -360,8 +468,9 @@ def translate_entries_batch(entry_list: List[Dict[str, Any]], from_lang: str, to
         # 提取该 entry 对应的翻译结果片段
         entry_translated_texts = translated_pure_text_list[start_index:end_index]
         # 重构文本
-        final_text = _decode_text(entry_translated_texts, mapping)
+        final_text = SEGMENTER.decode(encoded, entry_translated_texts)
         entry['secondary_translated_text'] = final_text
+        decoded_chars += len(final_text)
         
         # # 将结果写回 entry
         # if to_lang == 'zh':
@@ -369,9 +478,11 @@ def translate_entries_batch(entry_list: List[Dict[str, Any]], from_lang: str, to
         # elif to_lang == 'en':
         #     # 仅在回译时使用，作为中间结果存储
         #     entry['translated_en_text_temp'] = final_text 
+    report.add('decode', time.perf_counter() - stage_start, items=len(entry_list), chars=decoded_chars)
 
     return entry_list
-# ---文件解析函数(保持不变)---
+# ---文件解析函数---
+ENTRY_PATTERN = re.compile(r'<entry\s+name="([^"]+)"\s*>(.*?)</entry>', re.DOTALL | re.IGNORECASE)
 def read_and_parse_txt(filepath: str) -> List[TextAssetInfo]:
     """读取并解析单个 XML 文件，提取所有 <entry> 标签的内容。"""
     entries: List[TextAssetInfo] = []
@@ -381,8 +492,7 @@ def read_and_parse_txt(filepath: str) -> List[TextAssetInfo]:
     except Exception as e:
         print(f"  [错误] 无法读取文件 {filepath}: {e}")
         return entries
-    pattern = re.compile(r'<entry\s+name="([^"]+)"\s*>(.*?)</entry>', re.DOTALL | re.IGNORECASE)
-    matches = pattern.findall(content)
+    matches = ENTRY_PATTERN.findall(content)
 
     for key, text in matches:
         entries.append(TextAssetInfo(
@@ -393,26 +503,101 @@ def read_and_parse_txt(filepath: str) -> List[TextAssetInfo]:
     return entries
 def find_latest_translation_file() -> tuple[str, int]:
     """
-    查找当前目录下最新的翻译结果文件，并返回其路径和版本号。
+    从版本目录 (data/catalog.json) 中查找最新的翻译结果文件，并返回其路径和版本号。
+    同一版本同时有 JSON 与列式存储 (data/store/vN.col) 时，目录中登记的是列式存储。
     返回: (最新的文件路径, 目前版本号)
     """
-    format_string = get_config('TRANSLATED_FILE_FORMAT')
-    # 转换为正则表达式模式：例如 localization_translated_v(\d+)\.json
-    pattern = re.compile(format_string.replace('{}', r'(\d+)').replace('.', r'\.') + '$')
-    
-    latest_version = 0
-    latest_file = get_config('EXPORT_FILE_NAME') # 默认从 export.json 开始
-
-    current_dir = "./data/"
-    for filename in os.listdir(current_dir):
-        match = pattern.match(filename)
-        if match:
-            version = int(match.group(1))
-            if version > latest_version:
-                latest_version = version
-                latest_file = filename
-    
-    # 如果找到了最新的 vN.json，那么下一个输入就是 vN.json，输出是 v(N+1).json
-    # 如果没找到，输入是 export.json，输出是 v1.json
-    next_version = latest_version + 1
-    return current_dir+latest_file, latest_version,next_version
+    latest = get_version_catalog().latest()
+    if latest is None:
+        # 尚无任何版本：输入是 export.json，输出是 v1.json
+        return "./data/" + get_config('EXPORT_FILE_NAME'), 0, 1
+    # 找到了最新的 vN，那么下一个输入就是 vN，输出是 v(N+1)
+    return latest['path'], latest['version'], latest['version'] + 1
+
+# ---版本文件读写 (JSON / 列式存储)---
+def get_version_store() -> VersionStore:
+    """获取列式版本库 (目录由 VERSION_STORE_DIR 配置)。"""
+    global _VERSION_STORE
+    if _VERSION_STORE is None:
+        _VERSION_STORE = VersionStore(get_config('VERSION_STORE_DIR') or "./data/store/")
+    return _VERSION_STORE
+
+def get_version_catalog() -> VersionCatalog:
+    """获取版本目录 (路径由 VERSION_CATALOG_PATH 配置)；目录文件不存在时从现有版本文件重建一次。"""
+    global _VERSION_CATALOG
+    if _VERSION_CATALOG is None:
+        _VERSION_CATALOG = VersionCatalog(get_config('VERSION_CATALOG_PATH') or DEFAULT_CATALOG_PATH)
+        if not _VERSION_CATALOG.loaded:
+            print(f"-> 版本目录 {_VERSION_CATALOG.catalog_path} 不存在，正在从现有版本文件重建...")
+            rebuild_version_catalog()
+    return _VERSION_CATALOG
+
+def rebuild_version_catalog() -> int:
+    """重新扫描 data/ 与列式存储，重建版本目录，返回登记的版本数。"""
+    global _VERSION_CATALOG
+    if _VERSION_CATALOG is None:
+        _VERSION_CATALOG = VersionCatalog(get_config('VERSION_CATALOG_PATH') or DEFAULT_CATALOG_PATH)
+    return _VERSION_CATALOG.rebuild("./data/", get_config('TRANSLATED_FILE_FORMAT'), get_version_store(),
+                                    load_translation_file)
+
+def translation_version_path(version: int) -> str:
+    """返回某个版本已存在的文件路径 (列式存储优先)，不存在时返回 None。"""
+    record = get_version_catalog().get(version)
+    return record['path'] if record else None
+
+def load_translation_file(path: str, columns: List[str] = None) -> List[Dict[str, Any]]:
+    """
+    读取版本文件 (JSON 或列式存储 .col)，返回条目列表。
+    columns 仅对列式存储生效，用于只读取需要的字段。
+    """
+    match = VERSION_FILE_PATTERN.match(os.path.basename(path))
+    if match:
+        return get_version_store().load(int(match.group(1)), columns)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_translation_version(data: List[Dict[str, Any]], version: int, **metadata) -> str:
+    """
+    按 STORAGE_FORMAT ('json' 或 'columnar') 保存一个版本 (及其内容哈希索引)，并登记到版本目录，返回文件路径。
+    :param metadata: 传给 VersionCatalog.record 的 parent / source / target / api_chars / seconds。
+    """
+    catalog = get_version_catalog()
+    if get_config('STORAGE_FORMAT') == 'columnar':
+        output_file = get_version_store().save(version, data)
+        # 下一版本依赖本版本的译文时，列式存储会同时重写它
+        child = catalog.get(version + 1)
+        if child and child['path'] == get_version_store().version_path(version + 1):
+            catalog.relocate(version + 1, child['path'])
+    else:
+        output_file = "./data/" + get_config('TRANSLATED_FILE_FORMAT').format(version)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+    save_content_index(output_file, data)
+    catalog.record(version, output_file, data, **metadata)
+    return output_file
+# ---内容哈希索引(增量翻译)---
+CONTENT_INDEX_SUFFIX = ".index.json"
+
+def compute_entry_hash(entry: Dict[str, Any]) -> str:
+    """计算条目的内容哈希 (key + original_en_text)，用于判断源文本是否变化。"""
+    content = entry['key'] + "\0" + entry['original_en_text']
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+def save_content_index(version_file: str, data: List[Dict[str, Any]]) -> str:
+    """在版本文件旁边保存 {key: 内容哈希} 索引，返回索引文件路径。"""
+    index_file = os.path.splitext(version_file)[0] + CONTENT_INDEX_SUFFIX
+    index = {entry['key']: compute_entry_hash(entry) for entry in data}
+    with open(index_file, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    return index_file
+
+def load_content_index(version_file: str) -> Dict[str, str]:
+    """
+    读取版本文件的内容哈希索引；旧版本没有索引文件时，直接从版本文件计算。
+    """
+    index_file = os.path.splitext(version_file)[0] + CONTENT_INDEX_SUFFIX
+    if os.path.exists(index_file):
+        with open(index_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    data = load_translation_file(version_file, ['key', 'original_en_text'])
+    return {entry['key']: compute_entry_hash(entry) for entry in data}
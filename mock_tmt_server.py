@@ -0,0 +1,201 @@
+# mock_tmt_server.py
+# 本地模拟腾讯云 TextTranslateBatch 接口，用于在不消耗 API 配额的情况下调试/测试翻译流程。
+# 用法: python mock_tmt_server.py --port 8765 [--latency 0.2 --jitter 0.1 --error-rate 0.02 --qps 5]
+# 然后在 config.json 中设置 "TMT_ENDPOINT_URL": "http://127.0.0.1:8765"
+# 可模拟网络延迟、随机的服务端错误、超过 QPS 配额时的限频错误 (RequestLimitExceeded)、
+# 包含指定字符串的无效输入 (InvalidParameterValue)、签名时间戳过期 (AuthFailure.SignatureExpire)
+# 以及字符配额用尽 (FailedOperation.NoFreeAmount)，供 benchmark.py 使用。
+# 启动多个实例 (不同端口) 即可模拟 TMT_CREDENTIALS 中的多个账号。
+# 同一服务器也按百度通用翻译接口的格式响应 BAIDU_PATH 上的请求 (BAIDU_ENDPOINT_URL 指向 http://127.0.0.1:8765/api/trans/vip/translate)。
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs
+
+# 与腾讯云返回的错误码一致
+ERROR_RATE_LIMITED = "RequestLimitExceeded"
+ERROR_INTERNAL = "InternalError"
+ERROR_INVALID_INPUT = "InvalidParameterValue"
+ERROR_SIGNATURE_EXPIRE = "AuthFailure.SignatureExpire"
+ERROR_NO_FREE_AMOUNT = "FailedOperation.NoFreeAmount"
+SIGNATURE_MAX_AGE = 300 # 腾讯云允许的签名时间戳偏差 (秒)
+BAIDU_PATH = "/api/trans/vip/translate"
+# 模拟的错误 -> 百度错误码
+BAIDU_ERROR_CODES = {
+    ERROR_RATE_LIMITED: "54003",
+    ERROR_INTERNAL: "52002",
+    ERROR_INVALID_INPUT: "54000",
+    ERROR_NO_FREE_AMOUNT: "54004",
+}
+
+
+class MockTmtHandler(BaseHTTPRequestHandler):
+    """按照 TextTranslateBatch 的响应结构返回结果：译文 = "[目标语言]原文"。"""
+    protocol_version = "HTTP/1.1" # 支持 keep-alive，与真实接口一致
+    disable_nagle_algorithm = True # 头部与正文分两次写出，避免 keep-alive 连接上的 Nagle/延迟确认等待
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connection_count += 1
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length).decode('utf-8')
+        if self.path.startswith(BAIDU_PATH):
+            self._handle_baidu(raw)
+            return
+        body = json.loads(raw)
+        texts = body.get('SourceTextList', [])
+        target = body.get('Target', '')
+        timestamp = int(self.headers.get('X-TC-Timestamp') or time.time())
+        if abs(time.time() - timestamp) > SIGNATURE_MAX_AGE:
+            self._send_error(ERROR_SIGNATURE_EXPIRE, "签名过期。")
+            return
+        error = self._simulate(texts)
+        if error:
+            self._send_error(*error)
+            return
+
+        response = {
+            "Response": {
+                "Source": body.get('Source', ''),
+                "Target": target,
+                "TargetTextList": [f"[{target}]{t}" for t in texts],
+                "RequestId": str(uuid.uuid4()),
+            }
+        }
+        self._send_json(200, response)
+
+    def _handle_baidu(self, raw: str):
+        # 百度接口：表单参数 q 中每行一条原文，trans_result 中每行一条译文
+        params = {key: values[0] for key, values in parse_qs(raw, keep_blank_values=True).items()}
+        lines = params.get('q', '').split('\n')
+        target = params.get('to', '')
+        error = self._simulate(lines)
+        if error:
+            self._send_json(200, {"error_code": BAIDU_ERROR_CODES[error[0]], "error_msg": error[1]})
+            return
+        self._send_json(200, {
+            "from": params.get('from', ''),
+            "to": target,
+            "trans_result": [{"src": line, "dst": f"[{target}]{line}"} for line in lines],
+        })
+
+    def _simulate(self, texts) -> Optional[Tuple[str, str]]:
+        """按服务器设置模拟配额、限频、延迟与随机错误；返回 (错误码, 错误信息) 或 None。"""
+        server = self.server
+        if server.reject and any(server.reject in t for t in texts):
+            return ERROR_INVALID_INPUT, "参数取值错误。"
+        chars = sum(len(t) for t in texts)
+        with server.stats_lock:
+            exhausted = bool(server.char_quota) and server.char_count + chars > server.char_quota
+            if not exhausted:
+                server.request_count += 1
+                server.char_count += chars
+        if exhausted:
+            return ERROR_NO_FREE_AMOUNT, "本月免费额度已经用完。"
+
+        with server.stats_lock:
+            # 限频：最近 1 秒内已接受的请求数达到 qps 时拒绝
+            now = time.monotonic()
+            while server.recent and now - server.recent[0] >= 1.0:
+                server.recent.popleft()
+            throttled = bool(server.qps) and len(server.recent) >= server.qps
+            if throttled:
+                server.throttled_count += 1
+            else:
+                server.recent.append(now)
+            failed = not throttled and server.random.random() < server.error_rate
+            if failed:
+                server.error_count += 1
+            delay = server.latency + (server.random.uniform(0, server.jitter) if server.jitter else 0.0)
+
+        if delay > 0:
+            time.sleep(delay)
+        if throttled:
+            return ERROR_RATE_LIMITED, "请求的次数超过了频率限制。"
+        if failed:
+            return ERROR_INTERNAL, "模拟的服务端内部错误。"
+        return None
+
+    def _send_error(self, code: str, message: str):
+        # 腾讯云 API 的业务错误同样以 HTTP 200 返回，错误信息在 Response.Error 中
+        self._send_json(200, {"Response": {"Error": {"Code": code, "Message": message}, "RequestId": str(uuid.uuid4())}})
+
+    def _send_json(self, status: int, data: dict):
+        payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass # 保持输出干净
+
+
+def start_mock_server(host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                      error_rate: float = 0.0, qps: float = 0, seed: int = None,
+                      reject: str = None, char_quota: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    在后台线程启动模拟服务器。port 为 0 时自动分配端口。
+    返回 (server, endpoint_url)，用完后调用 server.shutdown()。
+
+    :param latency: 每个请求的固定延迟 (秒)。
+    :param jitter: 在固定延迟上额外增加 [0, jitter) 秒的随机延迟。
+    :param error_rate: 随机返回 InternalError 的概率。
+    :param qps: 每秒最多接受的请求数，超出时返回 RequestLimitExceeded；0 表示不限。
+    :param seed: 随机数种子，便于复现基准结果。
+    :param reject: 批次中任一文本包含该字符串时整批返回 InvalidParameterValue。
+    :param char_quota: 可翻译的总字符数，超出后返回 FailedOperation.NoFreeAmount；0 表示不限。
+    """
+    server = ThreadingHTTPServer((host, port), MockTmtHandler)
+    server.daemon_threads = True
+    server.stats_lock = threading.Lock()
+    server.request_count = 0
+    server.connection_count = 0
+    server.char_count = 0
+    server.throttled_count = 0
+    server.error_count = 0
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    server.qps = qps
+    server.recent = deque()
+    server.random = random.Random(seed)
+    server.reject = reject
+    server.char_quota = char_quota
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地模拟 TextTranslateBatch 服务器")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="每个请求的固定延迟 (秒)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="额外的随机延迟上限 (秒)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="随机返回 InternalError 的概率")
+    parser.add_argument('--qps', type=float, default=0, help="每秒最多接受的请求数，0 表示不限")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--reject', default=None, help="包含该字符串的批次返回 InvalidParameterValue")
+    parser.add_argument('--char-quota', type=int, default=0, help="可翻译的总字符数，超出后返回 FailedOperation.NoFreeAmount")
+    args = parser.parse_args()
+
+    server, url = start_mock_server(args.host, args.port, args.latency, args.jitter, args.error_rate, args.qps,
+                                    args.seed, args.reject, args.char_quota)
+    print(f"✅ 模拟 TMT 服务器已启动: {url} (Ctrl-C 退出)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"-> 共处理 {server.request_count} 次请求, {server.char_count} 字符，"
+              f"限频 {server.throttled_count} 次，模拟错误 {server.error_count} 次。")
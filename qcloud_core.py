@@ -1,12 +1,19 @@
 # qcloud_core.py
+import functools
+import heapq
 import json
+import random
+import re
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import hashlib
 import hmac
 from datetime import datetime
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Callable, NamedTuple, Optional
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from tqdm import tqdm
 if sys.version_info[0] <= 2:
     from httplib import HTTPSConnection
@@ -31,7 +38,187 @@ TMT_VERSION = "2018-03-21"
 TMT_ACTION = "TextTranslateBatch"
 TMT_SERVICE = "tmt"
 TMT_ALGORITHM = "TC3-HMAC-SHA256"
+TMT_DEFAULT_QPS = 5 # 腾讯云 TextTranslateBatch 默认 QPS 配额
+TMT_DEFAULT_WORKERS = 5
+TMT_REQUEST_TIMEOUT_SECONDS = 30
+TMT_RETRY_DELAY_SECONDS = 1.0 # 指数退避的基础等待时间 (benchmark.py 可调小)
+TMT_RETRY_MAX_DELAY_SECONDS = 30.0
+TMT_DEFAULT_MAX_RETRIES = 5
+TMT_THROTTLE_RETRY_FACTOR = 3 # 限频不是批次本身的问题，允许 3 倍的重试次数
+TMT_CREDENTIAL_SUSPEND_SECONDS = 600.0 # 鉴权失败、欠费的凭据暂停轮换的时间
+# --- AIMD 自适应限速 (TMT_ADAPTIVE_RATE) ---
+TMT_AIMD_INCREASE_QPS = 1.0 # 健康时每秒约增加的 QPS (每个成功请求增加 1/当前速率)
+TMT_AIMD_DECREASE_FACTOR = 0.7 # 被限频时速率乘以该系数
+TMT_AIMD_DECREASE_INTERVAL_SECONDS = 1.0 # 两次降速的最小间隔，避免同一波限频响应连续降速
+TMT_AIMD_MIN_QPS = 0.5
+TMT_AIMD_DEFAULT_MAX_QPS = 20.0
+TMT_AIMD_LATENCY_FACTOR = 2.0 # 平均延迟超过 最小延迟 x 系数 + 余量 时视为拥塞，暂停提速
+TMT_AIMD_LATENCY_SLACK_SECONDS = 0.05
+TMT_ERROR_MARKER = "&&error&&"
 
+# --- 错误分类 ---
+RETRY_THROTTLE = "throttle"   # 限频：指数退避 + 随机抖动后重试
+RETRY_RESIGN = "resign"       # 签名过期/时钟偏差：用新时间戳重新签名后立即重试
+RETRY_TRANSIENT = "transient" # 网络错误、服务端内部错误：指数退避后重试
+BAD_INPUT = "bad_input"       # 输入无效：二分批次以隔离出错的片段
+CREDENTIAL = "credential"     # 鉴权失败、欠费、未开通：暂停该凭据，批次改由其他凭据发送
+FATAL = "fatal"               # 语言不支持等：重试无意义
+# 按前缀匹配，先匹配更具体的错误码
+_ERROR_CATEGORIES = (
+    ("RequestLimitExceeded", RETRY_THROTTLE),
+    ("LimitExceeded", RETRY_THROTTLE),
+    ("AuthFailure.SignatureExpire", RETRY_RESIGN),
+    ("AuthFailure.SignatureFailure", RETRY_RESIGN),
+    ("AuthFailure", CREDENTIAL),
+    ("UnauthorizedOperation", CREDENTIAL),
+    ("FailedOperation.NoFreeAmount", CREDENTIAL),
+    ("FailedOperation.ServiceIsolate", CREDENTIAL),
+    ("FailedOperation.UserNotRegistered", CREDENTIAL),
+    ("UnsupportedOperation.TextTooLong", BAD_INPUT),
+    ("UnsupportedOperation", FATAL), # 不支持的语言等
+    ("InvalidParameter", BAD_INPUT), # 同时匹配 InvalidParameterValue
+    ("MissingParameter", BAD_INPUT),
+)
+# 超长片段的切分位置：先按句子边界，其次按分句标点与空白，最后按字符数硬切
+_SPLIT_PATTERNS = (
+    re.compile(r'(?<=[.!?。！？…])(\s*)'),
+    re.compile(r'((?<=[,;:，；：、])\s*|\s+)'),
+)
+# 译文拼接时不需要空格的目标语言
+NO_SPACE_LANGS = {'zh', 'zh-TW', 'ja', 'th'}
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶限速器。
+    所有 worker 共享同一个实例，保证总体请求速率不超过账号的 QPS 配额。
+    """
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self.waits = 0 # 需要等待令牌的次数，说明请求速率受限速器约束
+
+    def acquire(self):
+        """阻塞直到取得一个令牌。"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                self.waits += 1
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def feedback(self, latency: float, throttled: bool):
+        """请求完成后的反馈 (延迟、是否被限频)；固定速率的令牌桶忽略。"""
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    AIMD 自适应限速器：从配置的 QPS 出发，请求成功、延迟正常且速率确实受限速器约束时加性提速
+    (每秒约 +TMT_AIMD_INCREASE_QPS)，收到限频错误时乘性降速 (x TMT_AIMD_DECREASE_FACTOR)，
+    最终在账号的真实 QPS 上限附近收敛，无需手动调整 TMT_QPS / API_DELAY_SECONDS。
+    桶容量固定为 1 个令牌 (匀速发送)，避免提速后的突发请求触发服务端的滑动窗口限频。
+    """
+    def __init__(self, rate: float, min_rate: float = TMT_AIMD_MIN_QPS, max_rate: float = None):
+        super().__init__(rate, capacity=1.0)
+        self.start_rate = self.rate
+        self.min_rate = min(float(min_rate), self.rate)
+        self.max_rate = max(float(max_rate or TMT_AIMD_DEFAULT_MAX_QPS), self.rate)
+        self.peak_rate = self.rate
+        self.increases = 0
+        self.decreases = 0
+        self.throttled = 0
+        self.latency_ewma: Optional[float] = None
+        self.latency_min: Optional[float] = None
+        self._waits_seen = 0
+        self._last_decrease = float('-inf')
+
+    def feedback(self, latency: float, throttled: bool):
+        with self._lock:
+            now = time.monotonic()
+            if throttled:
+                self.throttled += 1
+                if now - self._last_decrease >= TMT_AIMD_DECREASE_INTERVAL_SECONDS:
+                    self.rate = max(self.min_rate, self.rate * TMT_AIMD_DECREASE_FACTOR)
+                    self._tokens = min(self._tokens, 0.0) # 丢弃积攒的令牌，立即按新速率发送
+                    self._last_decrease = now
+                    self.decreases += 1
+                return
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+            self.latency_min = latency if self.latency_min is None else min(self.latency_min, latency)
+            congested = self.latency_ewma > self.latency_min * TMT_AIMD_LATENCY_FACTOR + TMT_AIMD_LATENCY_SLACK_SECONDS
+            # 并发数不足 (令牌用不完) 时提速没有意义，只会在之后造成突发
+            limited = self.waits > self._waits_seen
+            self._waits_seen = self.waits
+            if limited and not congested and self.rate < self.max_rate \
+                    and now - self._last_decrease >= TMT_AIMD_DECREASE_INTERVAL_SECONDS:
+                self.rate = min(self.max_rate, self.rate + TMT_AIMD_INCREASE_QPS / self.rate)
+                self.peak_rate = max(self.peak_rate, self.rate)
+                self.increases += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """当前速率与观测到的延迟，写入运行报告的 rate_control。"""
+        with self._lock:
+            result = {
+                "qps": round(self.rate, 3),
+                "start_qps": round(self.start_rate, 3),
+                "peak_qps": round(self.peak_rate, 3),
+                "max_qps": round(self.max_rate, 3),
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "throttled_responses": self.throttled,
+            }
+            if self.latency_ewma is not None:
+                result["latency_ms_ewma"] = round(self.latency_ewma * 1000, 2)
+                result["latency_ms_min"] = round(self.latency_min * 1000, 2)
+            return result
+
+
+class CompositeLimiter:
+    """
+    组合限速器：依次从每个子限速器取得令牌。
+    用于流式流水线中"阶段自身限速 + 账号总配额"同时生效。
+    """
+    def __init__(self, limiters: List[TokenBucket]):
+        self.limiters = limiters
+
+    def acquire(self):
+        for limiter in self.limiters:
+            limiter.acquire()
+
+    def feedback(self, latency: float, throttled: bool):
+        for limiter in self.limiters:
+            limiter.feedback(latency, throttled)
+
+
+def config_qps(config: Dict[str, Any]) -> float:
+    """账号 QPS：优先使用 TMT_QPS，未配置时由 API_DELAY_SECONDS 换算。"""
+    qps = config.get('TMT_QPS')
+    if not qps:
+        delay = config.get('API_DELAY_SECONDS')
+        qps = 1.0 / delay if delay else TMT_DEFAULT_QPS
+    return qps
+
+def create_rate_limiter(config: Dict[str, Any]) -> TokenBucket:
+    """
+    根据配置创建限速器：优先使用 TMT_QPS，未配置时由 API_DELAY_SECONDS 换算。
+    """
+    return TokenBucket(config_qps(config))
+
+
+@functools.lru_cache(maxsize=64)
+def _derive_signing_key(secret_key: str, date_utc: str) -> bytes:
+    """派生签名密钥 (secret_date -> secret_service -> secret_signing) 只取决于 SecretKey 与 UTC 日期，同一天内缓存复用。"""
+    secret_date = sign(("TC3" + secret_key).encode("utf-8"), date_utc)
+    secret_service = sign(secret_date, TMT_SERVICE)
+    return sign(secret_service, "tc3_request")
 
 def _get_signed_headers(action: str, payload: str, timestamp: int, region: str, secret_id: str, secret_key: str) -> Dict[str, str]:
     """
@@ -65,9 +252,7 @@ def _get_signed_headers(action: str, payload: str, timestamp: int, region: str,
                       hashed_canonical_request)
 
     # ************* 步骤 3：计算签名 *************
-    secret_date = sign(("TC3" + secret_key).encode("utf-8"), date_utc)
-    secret_service = sign(secret_date, TMT_SERVICE)
-    secret_signing = sign(secret_service, "tc3_request")
+    secret_signing = _derive_signing_key(secret_key, date_utc)
     signature = hmac.new(secret_signing, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
 
     # ************* 步骤 4：拼接 Authorization *************
@@ -88,22 +273,43 @@ def _get_signed_headers(action: str, payload: str, timestamp: int, region: str,
     }
     return headers
 
-def _make_tmt_request(TMT_ENDPOINT, headers, payload, delay, texts, attempt_number):
+def classify_tmt_error(error_code: str) -> str:
+    """把 TMT 错误码归类为重试策略，未知错误码按临时错误处理。"""
+    for prefix, category in _ERROR_CATEGORIES:
+        if error_code.startswith(prefix):
+            return category
+    return RETRY_TRANSIENT
+
+def retry_delay(category: str, attempt: int) -> float:
+    """第 attempt 次 (从 0 开始) 重试前的等待：指数退避，并在 [50%, 100%] 之间随机抖动，避免各批次同时重试。"""
+    if category == RETRY_RESIGN:
+        return 0.0
+    base = TMT_RETRY_DELAY_SECONDS * (2 if category == RETRY_THROTTLE else 1)
+    return min(TMT_RETRY_MAX_DELAY_SECONDS, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+def _make_tmt_request(endpoint_url, headers, payload, limiter, texts, attempt_number, report=None,
+                      session: requests.Session = None) -> Tuple[Optional[List[str]], Optional[str]]:
     """
     执行单次腾讯机器翻译（TMT）API 请求。
-    如果失败，返回 None 和错误信息。
-    如果成功，返回 TargetTextList。
+    如果成功，返回 (TargetTextList, None)；如果失败，返回 (None, 错误码)。
+    网络错误的错误码为 NetworkError，返回条数与请求不一致时为 ResultCountMismatch。
+    :param report: 可选的 RunReport，记录本次请求的延迟 (不含等待令牌的时间) 与成败。
+    :param session: 复用连接的 requests.Session (见 TmtClient)；为 None 时每次新建连接。
     """
     # return ["哈基米"] * len(texts)
+    start = None
+    ok = False
+    throttled = False
     try:
-        response = requests.post(
-            f"https://{TMT_ENDPOINT}", 
+        if limiter is not None:
+            limiter.acquire() # 遵守 API 限制（所有 worker 共享令牌桶）
+        start = time.perf_counter()
+        response = (session or requests).post(
+            endpoint_url, 
             headers=headers, 
             data=payload.encode("utf-8"), 
-            timeout=30 
+            timeout=TMT_REQUEST_TIMEOUT_SECONDS 
         )
-        
-        time.sleep(delay) # 遵守 API 限制
 
         resp_json = response.json()
         
@@ -113,122 +319,567 @@ def _make_tmt_request(TMT_ENDPOINT, headers, payload, delay, texts, attempt_numb
             error_code = resp_json.get('Response', {}).get('Error', {}).get('Code', 'UNKNOWN')
             request_id = resp_json.get('Response', {}).get('RequestId', '无 RequestId')
             
-            print(f"  ❌ 尝试 {attempt_number}: API 返回错误 ({error_code}): {error_msg}, request_id: {request_id}")
-            return None # 失败返回 None
+            print(f"  ❌ 尝试 {attempt_number}: API 返回错误 ({error_code}): {error_msg}, request_id: {request_id}")
+            throttled = classify_tmt_error(error_code) == RETRY_THROTTLE
+            return None, error_code
 
         # 2. 成功
-        return resp_json['Response']['TargetTextList']
+        result = resp_json['Response']['TargetTextList']
+        if len(result) != len(texts):
+            print(f"  ❌ 尝试 {attempt_number}: 返回 {len(result)} 条译文，请求了 {len(texts)} 条。")
+            return None, "ResultCountMismatch"
+        ok = True
+        return result, None
         
     except requests.exceptions.RequestException as e:
-        print(f"  ❌ 尝试 {attempt_number}: 网络请求失败: {e}")
-        return None # 失败返回 None
+        print(f"  ❌ 尝试 {attempt_number}: 网络请求失败: {e}")
+        return None, "NetworkError"
         
     except Exception as e:
-        print(f"  ❌ 尝试 {attempt_number}: 发生意外错误: {e}")
-        return None # 失败返回 None
-    
+        print(f"  ❌ 尝试 {attempt_number}: 发生意外错误: {e}")
+        return None, "UNKNOWN"
+
+    finally:
+        if start is not None:
+            latency = time.perf_counter() - start
+            if limiter is not None:
+                limiter.feedback(latency, throttled) # 自适应限速器据此调整速率
+            if report is not None:
+                report.record_request(latency, ok)
+
+
+class BatchOutcome(NamedTuple):
+    """单次批次请求的结果与下一步动作：done / retry (delay 秒后) / bisect / reroute (换用其他凭据) / fail。"""
+    action: str
+    result: Optional[List[str]] = None
+    delay: float = 0.0
+    error_code: Optional[str] = None
+
+
+def outcome_for_error(error_code: str, category: str, batch_size: int, attempt: int,
+                      max_retries: int = TMT_DEFAULT_MAX_RETRIES) -> BatchOutcome:
+    """按错误类别决定失败批次的下一步动作 (各服务商的客户端共用同一重试策略)。"""
+    if category == BAD_INPUT:
+        return BatchOutcome("bisect" if batch_size > 1 else "fail", error_code=error_code)
+    if category == CREDENTIAL:
+        return BatchOutcome("reroute", error_code=error_code)
+    retry_limit = max_retries * TMT_THROTTLE_RETRY_FACTOR if category == RETRY_THROTTLE else max_retries
+    if category == FATAL or attempt >= retry_limit:
+        return BatchOutcome("fail", error_code=error_code)
+    return BatchOutcome("retry", delay=retry_delay(category, attempt), error_code=error_code)
+
+
+class TmtClient:
+    """
+    TMT 客户端：持有一组凭据与带连接池的 requests.Session。
+    连接保持 keep-alive，请求之间不再重复建立 TCP/TLS 连接；Session 由所有 worker 线程共享，
+    连接池大小应不小于并发数。每次请求都用当前时间戳重新签名，派生签名密钥按日期缓存。
+    """
+
+    def __init__(self, secret_id: str, secret_key: str, region: str, project_id: int,
+                 endpoint_url: str = None, pool_size: int = TMT_DEFAULT_WORKERS):
+        self.secret_id = secret_id
+        self.secret_key = secret_key
+        self.region = region
+        self.project_id = project_id
+        self.endpoint_url = endpoint_url or f"https://{TMT_ENDPOINT}"
+        self.session = requests.Session()
+        self.pool_size = 0
+        self.resize_pool(pool_size)
+
+    def resize_pool(self, pool_size: int):
+        """连接池只增不减；应在提交请求之前调用。"""
+        if pool_size <= self.pool_size:
+            return
+        adapter = HTTPAdapter(pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.pool_size = pool_size
+
+    def signed_headers(self, payload: str, timestamp: int = None) -> Dict[str, str]:
+        timestamp = int(time.time()) if timestamp is None else timestamp
+        return _get_signed_headers(TMT_ACTION, payload, timestamp, self.region, self.secret_id, self.secret_key)
+
+    def attempt_batch(
+        self, texts: List[str], from_lang: str, to_lang: str,
+        limiter: TokenBucket = None, report=None,
+        attempt: int = 0, max_retries: int = TMT_DEFAULT_MAX_RETRIES
+    ) -> BatchOutcome:
+        """
+        对一个批次发送一次请求 (每次都用当前时间戳重新签名)，并根据错误码决定下一步动作。
+        本方法从不等待重试，等待由调用方调度，因此不会占用 worker 线程。
+        """
+        payload = json.dumps({
+            "Source": from_lang,
+            "Target": to_lang,
+            "ProjectId": self.project_id,
+            "SourceTextList": texts
+        })
+        headers = self.signed_headers(payload)
+
+        result, error_code = _make_tmt_request(self.endpoint_url, headers, payload, limiter, texts, attempt + 1,
+                                               report=report, session=self.session)
+        if result is not None:
+            return BatchOutcome("done", result)
+        return outcome_for_error(error_code, classify_tmt_error(error_code), len(texts), attempt, max_retries)
+
+    def translate_single_batch(
+        self, texts: List[str], from_lang: str, to_lang: str,
+        limiter: TokenBucket = None, report=None, max_retries: int = TMT_DEFAULT_MAX_RETRIES
+    ) -> List[str]:
+        """
+        同步翻译一个批次 (在当前线程中等待重试)，失败的片段返回错误标记。
+        批量翻译请使用 tmt_translate_batch，它的重试不会阻塞其他批次。
+        """
+        attempt = 0
+        while True:
+            outcome = self.attempt_batch(texts, from_lang, to_lang, limiter, report, attempt, max_retries)
+            if outcome.action == "done":
+                return outcome.result
+            if outcome.action == "bisect":
+                middle = len(texts) // 2
+                return (self.translate_single_batch(texts[:middle], from_lang, to_lang, limiter, report, max_retries)
+                        + self.translate_single_batch(texts[middle:], from_lang, to_lang, limiter, report, max_retries))
+            if outcome.action in ("fail", "reroute"): # 单个客户端没有其他凭据可换
+                if report is not None:
+                    report.record_failed_batch()
+                return [TMT_ERROR_MARKER] * len(texts)
+            if report is not None:
+                report.record_retry()
+            time.sleep(outcome.delay)
+            attempt += 1
+
+    def close(self):
+        self.session.close()
+
+
+_CLIENTS: Dict[Tuple[str, str, str, int, Optional[str]], TmtClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+def get_tmt_client(secret_id: str, secret_key: str, region: str, project_id: int,
+                   endpoint_url: str = None, pool_size: int = TMT_DEFAULT_WORKERS) -> TmtClient:
+    """按凭据与端点复用客户端，使同一进程中的多轮翻译 (例如流水线的各个跳转) 共享连接池。"""
+    key = (secret_id, secret_key, region, project_id, endpoint_url)
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = _CLIENTS[key] = TmtClient(secret_id, secret_key, region, project_id, endpoint_url, pool_size)
+        else:
+            client.resize_pool(pool_size)
+        return client
+
+def tmt_attempt_batch(
+    texts: List[str], from_lang: str, to_lang: str,
+    secret_id: str, secret_key: str, region: str, project_id: int,
+    limiter: TokenBucket = None, endpoint_url: str = None, report=None,
+    attempt: int = 0, max_retries: int = TMT_DEFAULT_MAX_RETRIES
+) -> BatchOutcome:
+    """TmtClient.attempt_batch 的函数形式，使用 get_tmt_client 复用的客户端。"""
+    client = get_tmt_client(secret_id, secret_key, region, project_id, endpoint_url)
+    return client.attempt_batch(texts, from_lang, to_lang, limiter, report, attempt, max_retries)
+
 def tmt_translate_single_batch(
     texts: List[str], from_lang: str, to_lang: str, 
-    secret_id: str, secret_key: str, region: str, project_id: int, delay: float
+    secret_id: str, secret_key: str, region: str, project_id: int,
+    limiter: TokenBucket = None, endpoint_url: str = None, report=None,
+    max_retries: int = TMT_DEFAULT_MAX_RETRIES
+) -> List[str]:
+    """TmtClient.translate_single_batch 的函数形式，使用 get_tmt_client 复用的客户端。"""
+    client = get_tmt_client(secret_id, secret_key, region, project_id, endpoint_url)
+    return client.translate_single_batch(texts, from_lang, to_lang, limiter, report, max_retries)
+
+class PooledCredential:
+    """
+    凭据池中的一个账号：客户端、独立的 QPS 限速器、权重与本进程内的字符配额。
+    client 只需提供 attempt_batch 与 resize_pool (TmtClient、baidu_core.BaiduClient)。
+    """
+
+    def __init__(self, name: str, client, qps: float, weight: float = None, char_quota: int = None,
+                 adaptive: bool = False, max_qps: float = None):
+        self.name = name
+        self.client = client
+        self.qps = float(qps)
+        # adaptive 时 qps 只是起始速率，之后按 AIMD 调整 (见 AdaptiveRateLimiter)
+        self.limiter = AdaptiveRateLimiter(self.qps, max_rate=max_qps) if adaptive else TokenBucket(self.qps)
+        self._weight = float(weight) if weight else None
+        self.char_quota = char_quota # None 或 0 表示不限
+        self.chars_used = 0
+        self.suspended_until = 0.0
+        self.last_error: Optional[str] = None
+        self._current_weight = 0.0
+
+    @property
+    def weight(self) -> float:
+        """未配置 Weight 时按限速器的当前速率分配批次 (自适应限速时随之变化)。"""
+        return self._weight or self.limiter.rate
+
+
+class CredentialPool:
+    """
+    多凭据池：按权重 (平滑加权轮询) 把批次分配给各个凭据，每个凭据有自己的限速器与剩余字符配额，
+    总吞吐量为各账号 QPS 之和。凭据级错误 (见 CREDENTIAL) 会让该凭据暂停轮换
+    TMT_CREDENTIAL_SUSPEND_SECONDS 秒，期间的批次由其他凭据发送。
+    """
+
+    def __init__(self, credentials: List[PooledCredential]):
+        self.credentials = credentials
+        self._lock = threading.Lock()
+
+    @property
+    def total_qps(self) -> float:
+        return sum(credential.limiter.rate for credential in self.credentials)
+
+    def resize_pools(self, pool_size: int):
+        for credential in self.credentials:
+            credential.client.resize_pool(pool_size)
+
+    def acquire(self, chars: int) -> Optional[PooledCredential]:
+        """选出一个可用凭据并预留 chars 个字符的配额；没有可用凭据时返回 None。"""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                credential for credential in self.credentials
+                if credential.suspended_until <= now
+                and (not credential.char_quota or credential.chars_used + chars <= credential.char_quota)
+            ]
+            if not candidates:
+                return None
+            total = sum(credential.weight for credential in candidates)
+            for credential in candidates:
+                credential._current_weight += credential.weight
+            chosen = max(candidates, key=lambda credential: credential._current_weight)
+            chosen._current_weight -= total
+            chosen.chars_used += chars
+            return chosen
+
+    def release(self, credential: PooledCredential, chars: int):
+        """请求未成功时退还预留的字符配额。"""
+        with self._lock:
+            credential.chars_used -= chars
+
+    def suspend(self, credential: PooledCredential, error_code: str, seconds: float = None) -> bool:
+        """暂停一个凭据；返回 False 表示它已处于暂停状态 (同一凭据的多个批次先后报错)。"""
+        with self._lock:
+            now = time.monotonic()
+            already = credential.suspended_until > now
+            credential.suspended_until = now + (TMT_CREDENTIAL_SUSPEND_SECONDS if seconds is None else seconds)
+            credential.last_error = error_code
+            return not already
+
+
+_POOLS: Dict[str, CredentialPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+def credential_specs(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """TMT_CREDENTIALS 中的凭据列表；未配置时由 Tencent_* 单个凭据构成。"""
+    return config.get('TMT_CREDENTIALS') or [{
+        "Secret_Id": config.get('Tencent_Secret_Id'),
+        "Secret_Key": config.get('Tencent_Secret_Key'),
+    }]
+
+def get_credential_pool(config: Dict[str, Any]) -> CredentialPool:
+    """
+    按配置复用凭据池，使同一进程中的多轮翻译 (包括流式流水线的各个阶段) 共享每个账号的 QPS 配额。
+    凭据中未填写的 Region / Project_ID / QPS / Endpoint_URL 使用 Tencent_Region、Tencent_Project_ID、
+    TMT_QPS 与 TMT_ENDPOINT_URL。TMT_ADAPTIVE_RATE 开启时 QPS 只是起始速率，
+    各账号的限速器按 AIMD 在 Max_QPS (默认 TMT_MAX_QPS) 以内自动调整。
+    """
+    specs = credential_specs(config)
+    default_qps = config_qps(config)
+    default_endpoint = config.get('TMT_ENDPOINT_URL') or None
+    adaptive = bool(config.get('TMT_ADAPTIVE_RATE'))
+    default_max_qps = config.get('TMT_MAX_QPS') or None
+    key = json.dumps([specs, default_qps, default_endpoint, config.get('Tencent_Region'),
+                      config.get('Tencent_Project_ID'), adaptive, default_max_qps], sort_keys=True)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            credentials = []
+            for spec in specs:
+                client = get_tmt_client(
+                    spec.get('Secret_Id'), spec.get('Secret_Key'),
+                    spec.get('Region') or config.get('Tencent_Region'),
+                    spec.get('Project_ID', config.get('Tencent_Project_ID')),
+                    spec.get('Endpoint_URL') or default_endpoint
+                )
+                name = spec.get('Name') or "/".join(filter(None, [client.region, str(client.secret_id)[:8]]))
+                credentials.append(PooledCredential(name, client, spec.get('QPS') or default_qps,
+                                                 spec.get('Weight'), spec.get('Char_Quota'), adaptive,
+                                                 spec.get('Max_QPS') or default_max_qps))
+            pool = _POOLS[key] = CredentialPool(credentials)
+        return pool
+
+def split_oversized_text(text: str, limit: int = TMT_MAX_CHAR_COUNT, level: int = 0) -> Tuple[List[str], List[str]]:
+    """
+    把超过 limit 字符的文本切成不超过 limit 的若干段，尽量在句子边界处切分，相邻的句子尽量合并到同一段。
+    :return: (分段列表, 分隔符列表)，满足 分段[0] + 分隔符[0] + 分段[1] + ... == text。
+    """
+    if len(text) <= limit:
+        return [text], []
+    body = text.strip()
+    if body and len(body) != len(text):
+        # 首尾空白不在任何两段之间，附加到第一段与最后一段上 (切分时预留出它们的长度)
+        lead = text[:len(text) - len(text.lstrip())]
+        trail = text[len(lead) + len(body):]
+        pieces, separators = split_oversized_text(body, max(1, limit - len(lead) - len(trail)), level)
+        pieces[0] = lead + pieces[0]
+        pieces[-1] += trail
+        return pieces, separators
+    if level >= len(_SPLIT_PATTERNS):
+        pieces = [text[i:i + limit] for i in range(0, len(text), limit)]
+        return pieces, [''] * (len(pieces) - 1)
+
+    parts = _SPLIT_PATTERNS[level].split(text)
+    pieces: List[str] = []
+    separators: List[str] = []
+    gap = '' # 上一个单元之后的分隔符
+    for i in range(0, len(parts), 2):
+        token = parts[i]
+        separator = parts[i + 1] if i + 1 < len(parts) else ''
+        if not token:
+            gap += separator
+            continue
+        sub_pieces, sub_separators = split_oversized_text(token, limit, level + 1)
+        for k, piece in enumerate(sub_pieces):
+            joiner = sub_separators[k - 1] if k else gap
+            if k == 0 and pieces and len(pieces[-1]) + len(joiner) + len(piece) <= limit:
+                pieces[-1] += joiner + piece
+            else:
+                if pieces:
+                    separators.append(joiner)
+                pieces.append(piece)
+        gap = separator
+    return pieces, separators
+
+def join_translated_pieces(translated: List[str], separators: List[str], to_lang: str) -> str:
+    """split_oversized_text 的逆操作：按原分隔符拼接各段译文；任一段失败则整体返回错误标记。"""
+    if any(TMT_ERROR_MARKER in piece for piece in translated):
+        return TMT_ERROR_MARKER
+    no_space = to_lang in NO_SPACE_LANGS
+    parts = [translated[0]]
+    for separator, piece in zip(separators, translated[1:]):
+        if no_space and not separator.strip():
+            separator = ''
+        elif not no_space and not separator:
+            separator = ' '
+        parts.append(separator)
+        parts.append(piece)
+    return "".join(parts)
+
+def _plan_batches(texts: List[str], max_size: int = TMT_MAX_CHAR_COUNT, max_texts: int = TMT_MAX_TEXT_COUNT,
+                  measure: Callable[[str], int] = len) -> List[List[int]]:
+    """
+    首次适应递减 (first-fit decreasing) 装箱：按长度从长到短，把每个文本放入第一个还装得下的批次，
+    每批不超过 max_texts 条、max_size 字符 (measure 可改为按字节计算)。相比按输入顺序贪心分批，批次更满、请求更少。
+    :return: 每个批次包含的文本下标 (批次内按原顺序排列)，调用方据此把结果放回原位置。
+    """
+    sizes = [measure(text) for text in texts]
+    batches: List[List[int]] = []
+    batch_chars: List[int] = []
+    open_batches: List[int] = [] # 尚未装满的批次下标，装满的批次不再参与查找
+    for index in sorted(range(len(texts)), key=lambda i: sizes[i], reverse=True):
+        text_len = sizes[index]
+        for position, batch_index in enumerate(open_batches):
+            if batch_chars[batch_index] + text_len <= max_size:
+                break
+        else:
+            batch_index = len(batches)
+            batches.append([])
+            batch_chars.append(0)
+            open_batches.append(batch_index)
+            position = len(open_batches) - 1
+        batches[batch_index].append(index)
+        batch_chars[batch_index] += text_len
+        if len(batches[batch_index]) >= max_texts or batch_chars[batch_index] >= max_size:
+            del open_batches[position]
+    return [sorted(batch) for batch in batches]
+
+def run_batches(
+    texts: List[str], from_lang: str, to_lang: str, pool: CredentialPool,
+    max_workers: int = TMT_DEFAULT_WORKERS, max_retries: int = TMT_DEFAULT_MAX_RETRIES,
+    extra_limiter=None, verbose: bool = True, report=None,
+    on_batch_done: Callable[[List[str], List[str]], None] = None,
+    max_size: int = TMT_MAX_CHAR_COUNT, max_texts: int = TMT_MAX_TEXT_COUNT,
+    measure: Callable[[str], int] = len, split_limit: int = TMT_MAX_CHAR_COUNT
 ) -> List[str]:
     """
-    执行一次腾讯云 API 请求和签名。
+    批次调度核心 (与服务商无关)：切分超长文本、装箱分批，由线程池并发发送到 pool 中的凭据，
+    按 BatchOutcome 重试、二分或换用其他凭据，结果按输入顺序返回。
+    max_size / max_texts / measure 为服务商的批次限制，split_limit 为单个片段的最大字符数。
     """
-    
-    timestamp = int(time.time())
-    
-    payload_data = {
-        "Source": from_lang,
-        "Target": to_lang,
-        "ProjectId": project_id,
-        "SourceTextList": texts
+    text_len = sum([len(text) for text in texts])
+
+    # 超长文本切分为多个单元；owners[j] 为第 j 个单元所属的原文下标
+    units: List[str] = []
+    owners: List[int] = []
+    splits: Dict[int, Tuple[int, List[str]]] = {} # 原文下标 -> (第一个单元的下标, 分隔符)
+    for i, text in enumerate(texts):
+        pieces, separators = split_oversized_text(text, split_limit)
+        if len(pieces) > 1:
+            splits[i] = (len(units), separators)
+        units.extend(pieces)
+        owners.extend([i] * len(pieces))
+    batches = _plan_batches(units, max_size, max_texts, measure)
+    if verbose:
+        print(f"➡️➡️➡️ 总文本长度: {text_len} 字符, 分为 {len(batches)} 批 "
+              f"(平均 {text_len / max(len(batches), 1):.0f} 字符/批"
+              + (f"，{len(splits)} 个超长片段已切分" if splits else "") + ")，分批翻译中...")
+    limiters = {
+        credential: CompositeLimiter([extra_limiter, credential.limiter]) if extra_limiter else credential.limiter
+        for credential in pool.credentials
     }
-    payload = json.dumps(payload_data)
-    
-    headers = _get_signed_headers(TMT_ACTION, payload, timestamp, region, secret_id, secret_key)
-    
-    translation_result = _make_tmt_request(TMT_ENDPOINT, headers, payload, delay, texts, attempt_number=1)
-
-    if translation_result is not None:
-        # 第一次尝试成功
-        # print(f"  ✅ 成功翻译 {len(texts)} 个文本片段。")
-        return translation_result
-    else:
-        # 第一次尝试失败，等待并进行重试
-        print("  ⚠️ 第一次尝试失败，等待 10 秒后重试...")
-        time.sleep(10)
-        
-        # 第二次尝试 (重试)
-        translation_result = _make_tmt_request(TMT_ENDPOINT, headers, payload, delay, texts, attempt_number=2)
+    usage: Dict[str, Dict[str, int]] = {} # 凭据名 -> 本次成功发送的批次数与字符数
 
-        if translation_result is not None:
-            # 第二次尝试成功
-            # print(f"  ✅ 成功翻译 {len(texts)} 个文本片段。")
-            return translation_result
-        else:
-            # 第二次尝试仍失败，最终返回错误标记
-            print(f"  ❌ 第二次尝试失败，返回错误标记 '&&error&&' * {len(texts)}")
-            time.sleep(10) # 最终失败后仍然等待
-            return ["&&error&&"] * len(texts)
+    unit_results: List[str] = [None] * len(units)
+    remaining = {i: len(separators) + 1 for i, (_, separators) in splits.items()} # 被切分的原文还差几段
+    translated: List[str] = [None] * len(texts)
+    start = time.perf_counter()
+    progress_bar = tqdm(total=len(units), desc="翻译文本片段", unit="片段", leave=True, disable=not verbose)
+
+    def finish(batch: List[int], results: List[str]):
+        # 记录一个批次的结果；被切分的原文在最后一段完成时拼接
+        done = []
+        for j, result in zip(batch, results):
+            unit_results[j] = result
+            owner = owners[j]
+            if owner not in splits:
+                translated[owner] = result
+                done.append(owner)
+                continue
+            remaining[owner] -= 1
+            if remaining[owner] == 0:
+                first, separators = splits[owner]
+                translated[owner] = join_translated_pieces(
+                    unit_results[first:first + len(separators) + 1], separators, to_lang)
+                done.append(owner)
+        if on_batch_done is not None and done:
+            on_batch_done([texts[i] for i in done], [translated[i] for i in done])
+        progress_bar.update(len(batch))
+
+    def fail(batch: List[int], error_code: str):
+        print(f"  ❌ {len(batch)} 个片段翻译失败 ({error_code})，写入错误标记 '{TMT_ERROR_MARKER}'。")
+        if report is not None:
+            report.record_failed_batch()
+        finish(batch, [TMT_ERROR_MARKER] * len(batch))
 
-def tmt_translate_batch(texts: List[str], from_lang: str, to_lang: str, config: Dict[str, Any]) -> List[str]:
+    in_flight: Dict[Any, Tuple[List[int], int, PooledCredential, int]] = {} # future -> (批次, 重试次数, 凭据, 预留字符数)
+    delayed: List[Tuple[float, int, List[int], int]] = [] # (到期时间, 序号, 批次, 重试次数) 的最小堆
+    sequence = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit(batch: List[int], attempt: int):
+            batch_texts = [units[j] for j in batch]
+            chars = sum(len(text) for text in batch_texts)
+            credential = pool.acquire(chars)
+            if credential is None:
+                errors = sorted({c.last_error for c in pool.credentials if c.last_error})
+                fail(batch, "NoAvailableCredential" + (f": {', '.join(errors)}" if errors else ""))
+                return
+            future = executor.submit(
+                credential.client.attempt_batch,
+                batch_texts, from_lang, to_lang,
+                limiters[credential], report, attempt, max_retries
+            )
+            in_flight[future] = (batch, attempt, credential, chars)
+
+        for batch in batches:
+            submit(batch, 0)
+        try:
+            while in_flight or delayed:
+                now = time.monotonic()
+                while delayed and delayed[0][0] <= now:
+                    _, _, batch, attempt = heapq.heappop(delayed)
+                    submit(batch, attempt)
+                timeout = max(0.0, delayed[0][0] - now) if delayed else None
+                if not in_flight:
+                    time.sleep(timeout)
+                    continue
+                finished, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    batch, attempt, credential, chars = in_flight.pop(future)
+                    outcome = future.result()
+                    if outcome.action != "done":
+                        pool.release(credential, chars)
+                    if outcome.action == "done":
+                        item = usage.setdefault(credential.name, {"batches": 0, "chars": 0})
+                        item["batches"] += 1
+                        item["chars"] += chars
+                        finish(batch, outcome.result)
+                    elif outcome.action == "reroute":
+                        if pool.suspend(credential, outcome.error_code):
+                            print(f"  ❌ 凭据 {credential.name} 不可用 ({outcome.error_code})，"
+                                  f"暂停 {TMT_CREDENTIAL_SUSPEND_SECONDS:.0f} 秒，批次改由其他凭据发送。")
+                        submit(batch, attempt)
+                    elif outcome.action == "retry":
+                        if report is not None:
+                            report.record_retry()
+                        sequence += 1
+                        heapq.heappush(delayed, (time.monotonic() + outcome.delay, sequence, batch, attempt + 1))
+                    elif outcome.action == "bisect":
+                        middle = len(batch) // 2
+                        submit(batch[:middle], 0)
+                        submit(batch[middle:], 0)
+                    else:
+                        fail(batch, outcome.error_code)
+        except BaseException:
+            # Ctrl-C 或回调出错时取消尚未开始的批次，不再等待整轮跑完
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            progress_bar.close()
+            if report is not None:
+                report.add('api_batch', time.perf_counter() - start, items=len(texts), chars=text_len,
+                           bytes=sum(len(text.encode('utf-8')) for text in texts), calls=len(batches))
+                credentials = report.extra.setdefault('credentials', {})
+                for name, item in usage.items():
+                    total = credentials.setdefault(name, {"batches": 0, "chars": 0})
+                    total["batches"] += item["batches"]
+                    total["chars"] += item["chars"]
+                # 自适应限速器的当前速率与观测延迟 (限速器跨轮复用，数值为累计状态的快照)
+                for credential in pool.credentials:
+                    if isinstance(credential.limiter, AdaptiveRateLimiter):
+                        report.extra.setdefault('rate_control', {})[credential.name] = credential.limiter.stats()
+
+    return translated
+
+def tmt_translate_batch(
+    texts: List[str], from_lang: str, to_lang: str, config: Dict[str, Any],
+    on_batch_done: Callable[[List[str], List[str]], None] = None
+) -> List[str]:
     """
     处理整个文本列表的分批和翻译，确保符合 API 限制，并从配置字典中读取参数。
+    各批次由线程池并发发送，共享一个令牌桶限速器；结果按输入顺序返回。
+
+    超过 TMT_MAX_CHAR_COUNT 的文本先在句子边界处切开，各段翻译完成后再拼接回一条译文。
+    失败的批次按错误码处理 (见 classify_tmt_error)：需要等待的重试放入延迟队列，到期后重新提交，
+    等待期间 worker 继续处理其他批次；输入无效的批次二分，直到隔离出出错的单个片段。
+
+    :param on_batch_done: 每个批次完成后在主线程中调用 on_batch_done(原文列表, 译文列表)，
+                          可用于即时写入翻译记忆库等 (被切分的文本在全部分段完成后才会传入)。
+    配置中的 RUN_REPORT (可选的 RunReport) 用于记录 api_batch 阶段、每次请求的延迟与重试次数以及各凭据的用量；
+    TMT_MAX_RETRIES 为每个批次的最大重试次数。
+    批次按 TMT_CREDENTIALS 分配给多个凭据 (见 CredentialPool)，结果仍按输入顺序返回；
+    TMT_POOL 可直接指定凭据池。RATE_LIMITER (可选) 是在各凭据自身限速之外额外生效的限速器。
     """
-    # for t in texts:
-    #     if '=' in t or '#' in t:
-    #         print(f"{t}包含特殊符号，停止翻译")
-    #         exit(1)
-    # return texts
-    secret_id = config.get('Tencent_Secret_Id')
-    secret_key = config.get('Tencent_Secret_Key')
-    region = config.get('Tencent_Region')
-    project_id = config.get('Tencent_Project_ID')
-    delay = config.get('API_DELAY_SECONDS') # 假设这些值都有合理的默认值或已在调用方验证
-
-    if not secret_id or not secret_key:
-        print("  ❌ 错误：Tencent_Secret_Id 或 Tencent_Secret_Key 配置缺失。")
-        return ["CONFIG_ERROR"] * len(texts) if texts else []
-        
-    all_translated_texts = []
-    current_batch_texts = []
-    current_batch_char_count = 0
-    text_len = sum([len(text) for text in texts])
-    print(f"➡️➡️➡️ 总文本长度: {text_len} 字符, 分批翻译中...")
-    progress_bar = tqdm(texts, desc="翻译文本片段", unit="片段", leave=True)
-    for text in progress_bar:
-    # for text in texts:
-        text_len = len(text)
-        # 检查是否需要发送当前已累积的批次 (当前文本的加入会导致超限)
-        # 注意：这里是检查 *加入当前文本* 是否会导致超限，如果是，则先发送当前批次。
-        # 实际更严谨的做法是：如果当前批次已满（达到 TMT_MAX_TEXT_COUNT），或者
-        # 加上当前文本后会超过 TMT_MAX_CHAR_COUNT，就发送旧批次。
-        # 优化判断逻辑: 如果当前批次已满（> TMT_MAX_TEXT_COUNT - 1），或者加上当前文本后会超长
-        if (len(current_batch_texts) >= TMT_MAX_TEXT_COUNT or
-            (current_batch_char_count + text_len > TMT_MAX_CHAR_COUNT and current_batch_texts)): 
-            
-            # 如果批次非空，则发送当前批次
-            if current_batch_texts:
-                translated_batch = tmt_translate_single_batch(
-                    current_batch_texts, from_lang, to_lang, 
-                    secret_id, secret_key, region, project_id, delay
-                )
-                all_translated_texts.extend(translated_batch)
-                
-                # 重置批次
-                current_batch_texts = []
-                current_batch_char_count = 0
-            
-        
-        # ***** 修正点：将当前文本添加到批次 *****
-        current_batch_texts.append(text)
-        current_batch_char_count += text_len
-    # 发送最后一个批次
-    if current_batch_texts:
-        translated_batch = tmt_translate_single_batch(
-            current_batch_texts, from_lang, to_lang,
-            secret_id, secret_key, region, project_id, delay # <-- **修正：现在传递所有参数**
-        )
-        all_translated_texts.extend(translated_batch)
+    max_workers = config.get('TMT_MAX_WORKERS') or TMT_DEFAULT_WORKERS
+    verbose = config.get('VERBOSE', True)
+    report = config.get('RUN_REPORT')
+    max_retries = config.get('TMT_MAX_RETRIES')
+    max_retries = TMT_DEFAULT_MAX_RETRIES if max_retries is None else max_retries
+    pool = config.get('TMT_POOL')
+
+    if pool is None:
+        missing = [i for i, spec in enumerate(credential_specs(config), 1)
+                   if not spec.get('Secret_Id') or not spec.get('Secret_Key')]
+        if missing:
+            if config.get('TMT_CREDENTIALS'):
+                print(f"  ❌ 错误：TMT_CREDENTIALS 第 {missing[0]} 项缺少 Secret_Id 或 Secret_Key。")
+            else:
+                print("  ❌ 错误：Tencent_Secret_Id 或 Tencent_Secret_Key 配置缺失。")
+            return ["CONFIG_ERROR"] * len(texts) if texts else []
+        pool = get_credential_pool(config)
+    pool.resize_pools(max_workers)
 
-    return all_translated_texts
\ No newline at end of file
+    return run_batches(
+        texts, from_lang, to_lang, pool, max_workers=max_workers, max_retries=max_retries,
+        extra_limiter=config.get('RATE_LIMITER'), verbose=verbose, report=report, on_batch_done=on_batch_done
+    )
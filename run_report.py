@@ -0,0 +1,152 @@
+# run_report.py
+# 轻量的运行统计：记录每个阶段 (解析、语言检测、编码、API 批次、解码、JSON 写出、XML 改写、加密、打包) 的
+# 用时、条目数、字符数与字节数，以及每次 API 请求的延迟与重试次数，最后按版本输出机器可读的 JSON 报告。
+# export.py / import_data.py 使用模块级的当前报告 (get_report)；translate.py 的每一轮各自创建报告并显式传递，
+# 以便流式流水线中同时运行的多个版本互不干扰。
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+DEFAULT_REPORT_DIR = "data/reports/"
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """最近秩法百分位数，sorted_values 需已排序且非空。"""
+    rank = max(1, math.ceil(percent / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class StageStats:
+    """单个阶段的累计统计。with report.stage(...) as stats 中可以继续累加 items/chars/bytes。"""
+    __slots__ = ("calls", "seconds", "items", "chars", "bytes")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.items = 0
+        self.chars = 0
+        self.bytes = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {name: getattr(self, name) for name in self.__slots__}
+        result["seconds"] = round(self.seconds, 6)
+        if self.seconds > 0:
+            for name in ("items", "chars", "bytes"):
+                if getattr(self, name):
+                    result[f"{name}_per_second"] = round(getattr(self, name) / self.seconds, 2)
+        return result
+
+
+class RunReport:
+    """线程安全的运行统计，可在多个 worker 线程中同时记录。"""
+
+    def __init__(self, name: str, version: Optional[int] = None):
+        self.name = name
+        self.version = version
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages: Dict[str, StageStats] = {}
+        self.latencies: List[float] = []
+        self.requests = 0
+        self.failed_requests = 0
+        self.retries = 0
+        self.failed_batches = 0
+        self.extra: Dict[str, Any] = {}
+
+    def add(self, stage: str, seconds: float = 0.0, items: int = 0, chars: int = 0, bytes: int = 0, calls: int = 1):
+        """直接累加一个阶段的统计 (例如子进程返回的用时)。"""
+        with self._lock:
+            stats = self.stages.setdefault(stage, StageStats())
+            stats.calls += calls
+            stats.seconds += seconds
+            stats.items += items
+            stats.chars += chars
+            stats.bytes += bytes
+
+    @contextmanager
+    def stage(self, stage: str, items: int = 0, chars: int = 0, bytes: int = 0):
+        """计时上下文；yield 的 StageStats 用于在阶段内补充条目/字符/字节数。"""
+        pending = StageStats()
+        pending.items, pending.chars, pending.bytes = items, chars, bytes
+        start = time.perf_counter()
+        try:
+            yield pending
+        finally:
+            self.add(stage, time.perf_counter() - start, pending.items, pending.chars, pending.bytes)
+
+    def record_request(self, latency: float, ok: bool):
+        """记录一次 API 请求 (单次 HTTP 往返) 的延迟。"""
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            if not ok:
+                self.failed_requests += 1
+
+    def record_retry(self, count: int = 1):
+        with self._lock:
+            self.retries += count
+
+    def record_failed_batch(self):
+        with self._lock:
+            self.failed_batches += 1
+
+    @property
+    def wall_seconds(self) -> float:
+        return time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self.latencies)
+            api: Dict[str, Any] = {
+                "requests": self.requests,
+                "failed_requests": self.failed_requests,
+                "retries": self.retries,
+                "failed_batches": self.failed_batches,
+            }
+            if latencies:
+                api["latency_ms"] = {
+                    "mean": round(sum(latencies) / len(latencies) * 1000, 2),
+                    **{f"p{p}": round(_percentile(latencies, p) * 1000, 2) for p in (50, 90, 95, 99)},
+                    "max": round(latencies[-1] * 1000, 2),
+                }
+            return {
+                "name": self.name,
+                "version": self.version,
+                "started_at": self.started_at,
+                "wall_seconds": round(self.wall_seconds, 6),
+                "stages": {name: stats.to_dict() for name, stats in self.stages.items()},
+                "api": api,
+                **self.extra,
+            }
+
+    def save(self, report_dir: str = None) -> str:
+        """写出 <report_dir>/<name>[_v<version>].json，返回文件路径。"""
+        report_dir = report_dir or DEFAULT_REPORT_DIR
+        os.makedirs(report_dir, exist_ok=True)
+        filename = f"{self.name}_v{self.version}.json" if self.version is not None else f"{self.name}.json"
+        path = os.path.join(report_dir, filename)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=4)
+        return path
+
+
+_CURRENT_REPORT: Optional[RunReport] = None
+
+def start_report(name: str, version: Optional[int] = None) -> RunReport:
+    """开始新的模块级报告 (export.py / import_data.py 使用)。"""
+    global _CURRENT_REPORT
+    _CURRENT_REPORT = RunReport(name, version)
+    return _CURRENT_REPORT
+
+def get_report() -> RunReport:
+    """返回当前报告；尚未开始时创建一个默认报告，保证调用方无需判空。"""
+    global _CURRENT_REPORT
+    if _CURRENT_REPORT is None:
+        _CURRENT_REPORT = RunReport("run")
+    return _CURRENT_REPORT
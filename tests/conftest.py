@@ -0,0 +1,7 @@
+# 测试以仓库根目录为工作目录运行，并把根目录加入 sys.path 以导入各脚本模块。
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
@@ -0,0 +1,64 @@
+# asset_codec: 进程内 AES 与外部工具的一致性。
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from asset_codec import (AesEcbCodec, KAT_CIPHERTEXT, KAT_PLAINTEXT, _AES_BACKEND, get_codec,
+                         path_id_filename)
+
+pytestmark = pytest.mark.skipif(_AES_BACKEND is None, reason="未安装 cryptography / pycryptodome")
+
+TEXTS = {
+    '46': '<entry name="A">你好，圣巢</entry>',
+    '47': '',
+    '48': 'x' * 16,
+    '49': '<entry name="B">Line 1\r\nLine 2 ✓ —</entry>',
+}
+
+
+def test_known_answer():
+    codec = AesEcbCodec()
+    assert codec.self_check()
+    assert codec.encrypt_many({'1': KAT_PLAINTEXT}) == {'1': KAT_CIPHERTEXT}
+
+
+def test_round_trip_and_bom():
+    codec = AesEcbCodec()
+    encrypted = codec.encrypt_many(TEXTS)
+    assert codec.decrypt_many(encrypted) == TEXTS
+    # 外部工具写出的文件带 UTF-8 BOM
+    assert codec.decrypt_many({'1': '\ufeff' + KAT_CIPHERTEXT}) == {'1': KAT_PLAINTEXT}
+
+
+def test_decrypt_skips_non_encrypted_assets():
+    assert AesEcbCodec().decrypt_many({'1': 'plain text', '2': 'QUJD'}) == {}
+
+
+def test_auto_prefers_verified_aes():
+    assert get_codec('auto').name == AesEcbCodec.name
+
+
+def _dotnet():
+    return shutil.which('dotnet') or next(
+        (path for path in [os.path.expanduser('~/.dotnet/dotnet')] if os.path.exists(path)), None)
+
+
+@pytest.mark.skipif(_dotnet() is None or not os.path.exists('HollowKnight_TextAssetDecryptor.dll'),
+                    reason="没有 dotnet 或外部工具")
+def test_matches_external_tool(tmp_path):
+    plain_dir = tmp_path / "plain"
+    plain_dir.mkdir()
+    for path_id, text in TEXTS.items():
+        (plain_dir / path_id_filename(path_id)).write_text(text, encoding='utf-8', newline='')
+    for mode, input_dir, output_dir in [('-e', plain_dir, tmp_path / "enc"), ('-d', tmp_path / "enc", tmp_path / "dec")]:
+        subprocess.run([_dotnet(), 'HollowKnight_TextAssetDecryptor.dll', mode, str(input_dir), '-o', str(output_dir)],
+                       check=True, capture_output=True)
+
+    def read(directory):
+        return {path_id: (directory / path_id_filename(path_id)).read_bytes().decode('utf-8-sig')
+                for path_id in TEXTS}
+
+    assert read(tmp_path / "enc") == AesEcbCodec().encrypt_many(TEXTS)
+    assert read(tmp_path / "dec") == TEXTS
@@ -0,0 +1,84 @@
+# asset_patch: 补丁格式的生成、应用与损坏检测 (用假的对象布局代替 UnityPy 解析)。
+import types
+
+import pytest
+
+import asset_patch
+from asset_patch import MAGIC, OP_COPY, OP_INSERT, _diff_ops, apply_patch, create_patch
+
+HEADER = b"H" * 32
+OBJECTS = {1: b"A" * 100, 2: b"B" * 50, 3: b"C" * 70}
+
+
+def _build(objects):
+    """按 Path ID 顺序拼接对象 (每个对象后对齐填充到 8 字节)，返回 (文件内容, 布局)。"""
+    content = bytearray(HEADER)
+    layout = {}
+    for path_id, body in objects.items():
+        layout[path_id] = (len(content), len(body))
+        content += body + b"\0" * (-len(body) % 8)
+    return bytes(content), layout
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    source, source_layout = _build(OBJECTS)
+    target, target_layout = _build({**OBJECTS, 2: b"translated" * 9})
+    layouts = {source: source_layout, target: target_layout}
+    # create_patch 只通过 object_layout(UnityPy.load(...).file) 读取布局
+    def load(path_or_bytes):
+        if isinstance(path_or_bytes, str):
+            with open(path_or_bytes, 'rb') as f:
+                path_or_bytes = f.read()
+        return types.SimpleNamespace(file=layouts[path_or_bytes])
+    monkeypatch.setattr(asset_patch, 'UnityPy', types.SimpleNamespace(load=load))
+    monkeypatch.setattr(asset_patch, 'object_layout', lambda layout: layout)
+    source_path = tmp_path / "resources.assets"
+    source_path.write_bytes(source)
+    return source_path, source, target, source_layout, target_layout
+
+
+def test_diff_copies_unchanged_objects(files):
+    _, source, target, source_layout, target_layout = files
+    ops = _diff_ops(source, target, source_layout, target_layout)
+    # 头部 INSERT，对象 1 COPY (含填充)，对象 2 INSERT，对象 3 COPY
+    assert [op for op, _, _ in ops] == [OP_INSERT, OP_COPY, OP_INSERT, OP_COPY]
+    assert sum(length for _, _, length in ops) == len(target)
+
+
+def test_create_and_apply(files, tmp_path):
+    source_path, source, target, _, _ = files
+    patch_path = str(tmp_path / "out" / "v1.hkpatch")
+    header = create_patch(str(source_path), target, patch_path)
+    assert header["target_size"] == len(target)
+    assert header["insert_bytes"] < len(target)
+    with open(patch_path, 'rb') as f:
+        assert f.read(4) == MAGIC
+
+    output = tmp_path / "new.assets"
+    apply_patch(patch_path, str(source_path), str(output))
+    assert output.read_bytes() == target
+
+    apply_patch(patch_path, str(source_path), in_place=True)
+    assert source_path.read_bytes() == target
+
+
+def test_apply_rejects_bad_input(files, tmp_path):
+    source_path, source, target, _, _ = files
+    patch_path = tmp_path / "v1.hkpatch"
+    create_patch(str(source_path), target, str(patch_path))
+
+    other = tmp_path / "other.assets"
+    other.write_bytes(source[:-1] + b"X")
+    with pytest.raises(ValueError, match="原始文件不一致"):
+        apply_patch(str(patch_path), str(other), str(tmp_path / "a.assets"))
+
+    truncated = tmp_path / "truncated.hkpatch"
+    truncated.write_bytes(patch_path.read_bytes()[:-5])
+    with pytest.raises(ValueError, match="损坏"):
+        apply_patch(str(truncated), str(source_path), str(tmp_path / "b.assets"))
+    assert not (tmp_path / "b.assets").exists()
+
+    (tmp_path / "junk.hkpatch").write_bytes(b"nope")
+    with pytest.raises(ValueError, match="不是有效的资源补丁文件"):
+        apply_patch(str(tmp_path / "junk.hkpatch"), str(source_path), str(tmp_path / "c.assets"))
@@ -0,0 +1,61 @@
+# Segmenter: 编码后按片段原样填回必须还原文本，分隔符与空白保持不变。
+import json
+import os
+
+import pytest
+
+from localization_core import SEGMENTER, Segmenter, _decode_text, _encode_text
+
+SAMPLES = [
+    "",
+    "   ",
+    "Hello world",
+    "Hello&lt;br&gt;World",
+    "<page>First page<br>  Second line  <hpage>",
+    "Take {0} geo&amp;#8217;s",
+    "&#8220;Quoted&#8221; text&amp;#123;tail",
+    "A&amp;lt;b&amp;gt;B &amp; C",
+]
+
+
+def _identity(encoded):
+    return [encoded.text[start:end] for start, end in zip(encoded.starts, encoded.ends)]
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_round_trip(text):
+    encoded = Segmenter().encode(text)
+    assert Segmenter.decode(encoded, _identity(encoded)) == encoded.text
+    assert all(segment == segment.strip() and segment for segment in encoded.segments)
+
+
+def test_delimiters_preserved_and_punctuation_decoded():
+    encoded = SEGMENTER.encode("&#8220;Hi&#8221;&lt;br&gt; there")
+    assert encoded.text == "“Hi”&lt;br&gt; there"
+    assert encoded.segments == ("“Hi”", "there")
+    assert Segmenter.decode(encoded, ["你好", "那里"]) == "你好&lt;br&gt;那里"
+
+
+def test_missing_translations_drop_segments():
+    encoded = SEGMENTER.encode("one<br>two<br>three")
+    assert Segmenter.decode(encoded, ["1"]) == "1<br><br>"
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_matches_legacy_interface(text):
+    encoded = SEGMENTER.encode(text)
+    segments, reconstruction_map = _encode_text(text)
+    assert segments == list(encoded.segments)
+    translated = [f"<{segment}>" for segment in segments]
+    assert _decode_text(translated, reconstruction_map) == Segmenter.decode(
+        encoded, [f"<{segment}>" for segment in encoded.segments])
+
+
+@pytest.mark.skipif(not os.path.exists("data/localization_export.json"), reason="没有导出数据")
+def test_round_trip_export_data():
+    with open("data/localization_export.json", 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    segmenter = Segmenter()
+    for entry in entries:
+        encoded = segmenter.encode(entry.get('original_en_text') or '')
+        assert Segmenter.decode(encoded, _identity(encoded)) == encoded.text, entry['key']
@@ -0,0 +1,82 @@
+# qcloud_core: 批次规划、超长文本切分与错误码分类。
+import random
+
+import pytest
+
+from qcloud_core import (BAD_INPUT, CREDENTIAL, FATAL, RETRY_RESIGN, RETRY_THROTTLE, RETRY_TRANSIENT,
+                         TMT_ERROR_MARKER, TMT_MAX_CHAR_COUNT, TMT_MAX_TEXT_COUNT, _plan_batches,
+                         classify_tmt_error, join_translated_pieces, split_oversized_text)
+
+
+def _check_plan(texts, batches, max_size=TMT_MAX_CHAR_COUNT, max_texts=TMT_MAX_TEXT_COUNT):
+    assert sorted(index for batch in batches for index in batch) == list(range(len(texts)))
+    for batch in batches:
+        assert batch == sorted(batch)
+        assert len(batch) <= max_texts
+        assert sum(len(texts[index]) for index in batch) <= max_size
+
+
+def test_plan_respects_char_limit():
+    rng = random.Random(0)
+    texts = ["x" * rng.randint(1, TMT_MAX_CHAR_COUNT) for _ in range(500)]
+    batches = _plan_batches(texts)
+    _check_plan(texts, batches)
+    # 首次适应递减：总批次数不超过下界的 1.25 倍
+    assert len(batches) <= 1.25 * sum(map(len, texts)) / TMT_MAX_CHAR_COUNT + 1
+
+
+def test_plan_respects_text_count_limit():
+    texts = ["a"] * (TMT_MAX_TEXT_COUNT * 3 + 7)
+    batches = _plan_batches(texts)
+    _check_plan(texts, batches)
+    assert [len(batch) for batch in batches] == [TMT_MAX_TEXT_COUNT] * 3 + [7]
+
+
+def test_plan_exact_fit_and_custom_measure():
+    texts = ["x" * 1000, "y" * 500, "z" * 1500]
+    batches = _plan_batches(texts)
+    _check_plan(texts, batches)
+    assert len(batches) == 2
+    utf8 = lambda text: len(text.encode('utf-8'))
+    texts = ["中" * 400, "文" * 400]
+    batches = _plan_batches(texts, measure=utf8)
+    assert len(batches) == 2
+
+
+@pytest.mark.parametrize("text", [
+    "Short sentence.",
+    "First sentence. " * 200,
+    "  " + "Clause, another clause; " * 150 + "  ",
+    "。".join(["这是一个很长的中文句子"] * 300),
+    "x" * 4000,
+    "word " * 700 + "y" * 2000,
+])
+def test_split_oversized_round_trip(text):
+    pieces, separators = split_oversized_text(text)
+    assert len(separators) == len(pieces) - 1
+    assert all(0 < len(piece) <= TMT_MAX_CHAR_COUNT for piece in pieces)
+    rebuilt = pieces[0] + "".join(separator + piece for separator, piece in zip(separators, pieces[1:]))
+    assert rebuilt == text
+
+
+def test_join_translated_pieces():
+    assert join_translated_pieces(["A.", "B."], [" "], 'en') == "A. B."
+    assert join_translated_pieces(["A.", "B."], [""], 'en') == "A. B."
+    assert join_translated_pieces(["甲。", "乙。"], [" "], 'zh') == "甲。乙。"
+    assert join_translated_pieces(["A", TMT_ERROR_MARKER], [" "], 'en') == TMT_ERROR_MARKER
+
+
+@pytest.mark.parametrize("code, category", [
+    ("RequestLimitExceeded", RETRY_THROTTLE),
+    ("LimitExceeded.Something", RETRY_THROTTLE),
+    ("AuthFailure.SignatureExpire", RETRY_RESIGN),
+    ("AuthFailure.SecretIdNotFound", CREDENTIAL),
+    ("FailedOperation.NoFreeAmount", CREDENTIAL),
+    ("UnsupportedOperation.TextTooLong", BAD_INPUT),
+    ("UnsupportedOperation.UnsupportedLanguage", FATAL),
+    ("InvalidParameterValue", BAD_INPUT),
+    ("InternalError", RETRY_TRANSIENT),
+    ("", RETRY_TRANSIENT),
+])
+def test_classify_tmt_error(code, category):
+    assert classify_tmt_error(code) == category
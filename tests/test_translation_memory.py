@@ -0,0 +1,36 @@
+# TranslationMemory: 按语言方向查询、跳过错误标记、淘汰与持久化。
+import time
+
+from translation_memory import TranslationMemory
+
+
+def test_store_and_lookup(tmp_path):
+    tm = TranslationMemory(str(tmp_path / "tm.db"))
+    assert tm.store([("Hello", "你好"), ("Bad", "&&error&&"), ("Empty", "")], 'en', 'zh') == 1
+    assert tm.lookup(["Hello", "Hello", "Bad", "Other"], 'en', 'zh') == {"Hello": "你好"}
+    assert tm.lookup(["Hello"], 'zh', 'en') == {}
+    assert tm.stats() == {"hits": 1, "misses": 3, "entries": 1}
+    tm.close()
+    # 重新打开后仍可命中
+    tm = TranslationMemory(str(tmp_path / "tm.db"))
+    assert tm.lookup(["Hello"], 'en', 'zh') == {"Hello": "你好"}
+    tm.close()
+
+
+def test_lookup_many_texts(tmp_path):
+    tm = TranslationMemory(str(tmp_path / "tm.db"))
+    pairs = [(f"text {i}", f"译文 {i}") for i in range(1200)] # 超过单条查询的参数上限
+    tm.store(pairs, 'en', 'zh')
+    assert tm.lookup([source for source, _ in pairs], 'en', 'zh') == dict(pairs)
+    tm.close()
+
+
+def test_evict(tmp_path):
+    tm = TranslationMemory(str(tmp_path / "tm.db"))
+    tm.store([("old", "旧")], 'en', 'zh')
+    tm._conn.execute("UPDATE tm SET last_used = ?", (time.time() - 10 * 86400,))
+    tm.store([("a", "甲"), ("b", "乙"), ("c", "丙")], 'en', 'zh')
+    assert tm.evict(max_age_days=5) == 1
+    assert tm.evict(max_entries=2) == 1
+    assert len(tm) == 2
+    tm.close()
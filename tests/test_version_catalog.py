@@ -0,0 +1,71 @@
+# VersionCatalog: 登记、父版本、完整性校验与重建。
+import json
+import os
+
+from version_catalog import VersionCatalog
+
+FILE_FORMAT = "localization_translated_v{}.json"
+
+
+def _write_version(data_dir, version, texts):
+    path = os.path.join(data_dir, FILE_FORMAT.format(version))
+    data = [{"key": str(i), "secondary_translated_text": text} for i, text in enumerate(texts)]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    return path, data
+
+
+def _load(path, columns=None):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_record_and_query(tmp_path):
+    catalog = VersionCatalog(str(tmp_path / "catalog.json"))
+    path1, data1 = _write_version(tmp_path, 1, ["你好", "世界"])
+    path2, data2 = _write_version(tmp_path, 2, ["Hello", "&&error&&"])
+    catalog.record(1, path1, data1, source='en', target='zh', api_chars=4, seconds=1.23456)
+    record = catalog.record(2, path2, data2, source='zh', target='en')
+    assert record["errors"] == 1 and record["rows"] == 2 and record["parent"] == 1
+
+    reopened = VersionCatalog(str(tmp_path / "catalog.json"))
+    assert reopened.loaded and reopened.latest_version == 2
+    assert reopened.parent(2)["path"] == path1
+    assert reopened.get(1)["seconds"] == 1.235
+    assert reopened.parent(1) is None
+    assert reopened.verify() == []
+
+
+def test_verify_detects_changes(tmp_path):
+    catalog = VersionCatalog(str(tmp_path / "catalog.json"))
+    path, data = _write_version(tmp_path, 1, ["你好"])
+    catalog.record(1, path, data)
+    with open(path, 'rb') as f:
+        original = f.read()
+
+    os.utime(path, ns=(0, 0))
+    assert len(catalog.verify()) == 1
+    assert catalog.verify(deep=True) == [] # 内容未变，只有修改时间变化
+
+    _write_version(tmp_path, 1, ["你好!"])
+    assert "文件大小" in catalog.verify(deep=True)[0]
+    with open(path, 'wb') as f:
+        f.write(original.replace("你".encode('utf-8'), "您".encode('utf-8')))
+    assert "内容哈希" in catalog.verify(deep=True)[0]
+
+    os.remove(path)
+    assert "不存在" in catalog.verify()[0]
+    assert "不在版本目录中" in catalog.verify([3])[0]
+
+
+def test_rebuild_keeps_metadata(tmp_path):
+    data_dir = str(tmp_path) + os.sep
+    catalog = VersionCatalog(str(tmp_path / "catalog.json"))
+    path1, data1 = _write_version(tmp_path, 1, ["你好"])
+    catalog.record(1, path1, data1, source='en', target='zh', api_chars=2)
+    _write_version(tmp_path, 3, ["&&error&&"])
+
+    assert catalog.rebuild(data_dir, FILE_FORMAT, load=_load) == 2
+    assert catalog.get(1)["source"] == 'en' and catalog.get(1)["api_chars"] == 2
+    assert catalog.get(3)["errors"] == 1 and catalog.get(3)["parent"] == 2
+    assert catalog.latest_version == 3
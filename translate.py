@@ -1,15 +1,71 @@
 # translate.py
+import argparse
 import json
 import os
+import queue
 import re # 需要导入 re 模块
+import threading
+import time
 from typing import List, Dict, Any
 from tqdm import tqdm
 from localization_core import (
-    init_config, get_config,find_latest_translation_file,translate_entries_batch
+    init_config, get_config,find_latest_translation_file,translate_entries_batch,
+    compute_entry_hash, load_content_index,
+    get_translation_memory, load_translation_file, save_translation_version, translation_version_path
 )
+from qcloud_core import TokenBucket, get_credential_pool
+from translation_memory import ERROR_MARKERS
+from run_report import RunReport
 import pandas as pd
 # 确保在任何函数调用前初始化配置
 init_config()
+
+class TranslationJournal:
+    """
+    翻译断点日志：每完成一个 API 批次就追加一行 JSON (批次序号、原文、译文)。
+    重新运行同一版本时读取日志，已完成的片段不再发送，从中断处继续。
+    每次写入只 flush，按 fsync_interval 秒合并一次 fsync，避免拖慢主循环。
+    """
+    def __init__(self, path: str, fsync_interval: float = 5.0):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.translations: Dict[str, str] = {}
+        self.batch_count = 0
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break # 崩溃时写了一半的最后一行，忽略
+                    self.batch_count = max(self.batch_count, record['batch'] + 1)
+                    for source, target in zip(record['source'], record['target']):
+                        # 失败的片段不恢复，重跑时重新翻译
+                        if not any(marker in target for marker in ERROR_MARKERS):
+                            self.translations[source] = target
+        self._file = open(path, 'a', encoding='utf-8')
+        self._last_fsync = time.monotonic()
+
+    def record(self, sources: List[str], targets: List[str]):
+        """追加一个已完成批次。"""
+        line = json.dumps({"batch": self.batch_count, "source": sources, "target": targets}, ensure_ascii=False)
+        self._file.write(line + "\n")
+        self._file.flush()
+        self.batch_count += 1
+        now = time.monotonic()
+        if now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    def close(self, remove: bool = False):
+        """关闭日志；remove=True 表示本轮结果已写入版本文件，删除日志文件 (日志已关闭时也可调用)。"""
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
+
 def fix_translation_errors_fallback(
     error_file: str, 
     error_version: int, 
@@ -87,6 +143,25 @@ def fix_translation_errors_fallback(
         
     print(f"-> 翻译修复结果已保存到 {output_file}。")
     return output_file
+def _save_version(data: List[Dict[str, Any]], version: int, report: RunReport,
+                  from_lang: str, to_lang: str, seconds: float = None) -> str:
+    """
+    保存版本文件并登记到版本目录 (语言方向、实际发送的 API 字符数、用时)，计入 json_dump 阶段。
+    :param seconds: 本版本的翻译用时，默认为报告开始至今的时间。
+    """
+    api_batch = report.stages.get('api_batch')
+    with report.stage('json_dump', items=len(data)) as stats:
+        output_file = save_translation_version(
+            data, version, source=from_lang, target=to_lang, api_chars=api_batch.chars if api_batch else 0,
+            seconds=report.wall_seconds if seconds is None else seconds
+        )
+        stats.bytes = os.path.getsize(output_file)
+    return output_file
+
+def _save_report(report: RunReport):
+    path = report.save(get_config('REPORT_DIR'))
+    print(f"-> 运行报告已保存到 {path}。")
+
 def translate_exported_data(input_file: str, next_version: int,from_lang: str, to_lang: str) -> str:
     """
     读取指定的 JSON 文件进行翻译，并保存为新的版本文件。
@@ -103,17 +178,262 @@ def translate_exported_data(input_file: str, next_version: int,from_lang: str, t
         print(f"  [错误] 翻译输入文件 {input_file} 不存在。请先运行 export.py。")
         return ""
 
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load_translation_file(input_file)
 
     total_items = len(data)
     print(f"-> 准备翻译 {total_items} 个条目...")
 
+    # 断点日志：若上次运行中断，则从日志中恢复已完成的批次
+    journal = TranslationJournal(output_file + ".journal", get_config('JOURNAL_FSYNC_INTERVAL') or 5.0)
+    if journal.batch_count:
+        print(f"-> 发现断点日志，已完成 {journal.batch_count} 个批次，将从中断处继续。")
+    report = RunReport('translate', next_version)
+    try:
+        data_transed = run_translation_hop(data, next_version, from_lang, to_lang, journal=journal, report=report)
+        output_file = _save_version(data_transed, next_version, report, from_lang, to_lang)
+    except BaseException:
+        # 网络失败或 Ctrl-C：保留日志，下次运行同一版本时续传
+        journal.close()
+        print(f"-> 翻译中断，进度已保存到 {journal.path}，重新运行即可继续。")
+        raise
+    journal.close(remove=True)
+        
+    print(f"-> 翻译结果已保存到 {output_file}。")
+    _save_report(report)
+    return output_file
+
+def _resolve_pipeline_range(df_trans_loop: pd.DataFrame, start_version: int = None, end_version: int = None):
+    """
+    确定流水线的版本范围和输入文件。
+    返回 (输入文件, 起始版本, 结束版本)，范围无效时返回 None。
+    """
+    input_file, latest_version, next_version = find_latest_translation_file()
+    start_version = start_version or next_version
+    end_version = end_version or int(df_trans_loop['版本'].max())
+    if start_version < 1 or end_version < start_version:
+        print(f"  [错误] 无效的版本范围 v{start_version} - v{end_version}。")
+        return None
+    for version in range(start_version, end_version + 1):
+        if version > len(df_trans_loop) or version != df_trans_loop['版本'][version-1]:
+            print(f"未找到对应版本号:{version},错误退出。")
+            return None
+    if start_version != next_version:
+        # 从指定版本开始：输入为前一个版本 (按版本目录查找，JSON 或列式存储)，v1 的输入为导出文件
+        if start_version > 1:
+            input_file = translation_version_path(start_version - 1)
+            if input_file is None:
+                print(f"  [错误] 输入版本 v{start_version - 1} 不存在。")
+                return None
+        else:
+            input_file = "./data/" + get_config('EXPORT_FILE_NAME')
+    if not os.path.exists(input_file):
+        print(f"  [错误] 翻译输入文件 {input_file} 不存在。")
+        return None
+    return input_file, start_version, end_version
+
+def run_pipeline(df_trans_loop: pd.DataFrame, start_version: int = None, end_version: int = None, snapshot_every: int = 1) -> List[Dict[str, Any]]:
+    """
+    在一个进程内连续执行多轮翻译 (默认从下一个版本一直到 翻译顺序.csv 末尾)。
+    数据在各轮之间保留在内存中，只按 snapshot_every 间隔 (以及最后一轮) 写出版本文件。
+
+    :param snapshot_every: 每隔多少轮写一次快照；0 表示只在最后一轮写出。
+    :return: 每轮的统计信息列表。
+    """
+    resolved = _resolve_pipeline_range(df_trans_loop, start_version, end_version)
+    if resolved is None:
+        return []
+    input_file, start_version, end_version = resolved
+
+    print(f"-> 流水线: v{start_version} - v{end_version}，输入文件: {input_file}")
+    data = load_translation_file(input_file)
+
+    hop_stats = []
+    unsaved_journals: List[TranslationJournal] = [] # 所在版本尚未写出快照的断点日志
+    pipeline_start = time.perf_counter()
+    for version in range(start_version, end_version + 1):
+        from_lang, to_lang = df_trans_loop['翻译源'][version-1], df_trans_loop['翻译目标'][version-1]
+        print(f"----开始翻译版本:v{version},翻译语言: {from_lang} -> {to_lang}----")
+
+        hop_start = time.perf_counter()
+        report = RunReport('translate', version)
+        output_file = "./data/" + get_config('TRANSLATED_FILE_FORMAT').format(version)
+        journal = TranslationJournal(output_file + ".journal", get_config('JOURNAL_FSYNC_INTERVAL') or 5.0)
+        pass_stats: Dict[str, int] = {}
+        try:
+            data = run_translation_hop(data, version, from_lang, to_lang, journal=journal, report=report,
+                                       stats=pass_stats)
+        except BaseException:
+            journal.close()
+            print(f"-> 翻译中断，v{version} 的进度已保存到 {journal.path}。")
+            raise
+        # 日志保留到包含本轮结果的快照写出之后，快照之间崩溃时已完成的各轮可从日志恢复
+        journal.close()
+        unsaved_journals.append(journal)
+        translate_seconds = time.perf_counter() - hop_start
+
+        is_last = (version == end_version)
+        if is_last or (snapshot_every and (version - start_version + 1) % snapshot_every == 0):
+            snapshot_file = _save_version(data, version, report, from_lang, to_lang)
+            print(f"-> 快照已保存到 {snapshot_file}。")
+            for saved_journal in unsaved_journals:
+                saved_journal.close(remove=True)
+            unsaved_journals.clear()
+
+        stats = {
+            "version": version, "from": from_lang, "to": to_lang,
+            "seconds": time.perf_counter() - hop_start,
+            "translate_seconds": translate_seconds,
+            "chars": pass_stats.get('chars', 0),
+            "api_chars": pass_stats.get('api_chars', 0),
+        }
+        hop_stats.append(stats)
+        print(f"-> v{version} 完成: 用时 {stats['seconds']:.1f}s，片段字符 {stats['chars']}，实际发送 {stats['api_chars']} 字符。")
+        report.extra.update(source=from_lang, target=to_lang, segments=pass_stats.get('segments', 0),
+                            unique_segments=pass_stats.get('unique_segments', 0), api_chars=stats['api_chars'])
+        _save_report(report)
+
+    print(f"\n--------流水线汇总 (总用时 {time.perf_counter() - pipeline_start:.1f}s)--------")
+    for stats in hop_stats:
+        print(f"  v{stats['version']:<3} {stats['from']:>2} -> {stats['to']:<2}  {stats['seconds']:8.1f}s  "
+              f"字符 {stats['chars']:>8}  发送 {stats['api_chars']:>8}")
+    return hop_stats
+
+def run_streaming_pipeline(
+    df_trans_loop: pd.DataFrame, start_version: int = None, end_version: int = None,
+    snapshot_every: int = 1, chunk_size: int = None
+) -> List[Dict[str, Any]]:
+    """
+    流式流水线：把条目切成小块，每一轮翻译是一个独立阶段 (线程)，
+    某一块在 vN 完成后立即送入 vN+1，而不必等待 vN 翻译完全部条目。
+    各阶段 API 延迟互相重叠，总用时约缩短为原来的 1/流水线深度。
+
+    配置了 STREAM_STAGE_QPS 时每个阶段有自己的限速器，否则各阶段共用一个按全部账号 QPS 之和限速的令牌桶，
+    N 个阶段同时运行时总速率也不会超过账号配额；各账号自身的限速始终生效 (见 qcloud_core.get_credential_pool)。
+    每个阶段写自己版本的断点日志，全部快照写出后才删除；中断后重新运行时各阶段从日志恢复已完成的批次。
+    :return: 每个阶段的统计信息列表。
+    """
+    resolved = _resolve_pipeline_range(df_trans_loop, start_version, end_version)
+    if resolved is None:
+        return []
+    input_file, start_version, end_version = resolved
+    chunk_size = chunk_size or get_config('STREAM_CHUNK_SIZE') or 200
+
+    data = load_translation_file(input_file)
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+    versions = list(range(start_version, end_version + 1))
+    print(f"-> 流式流水线: v{start_version} - v{end_version}，{len(data)} 个条目分为 {len(chunks)} 块，输入文件: {input_file}")
+
+    get_translation_memory() # 在主线程中打开记忆库，避免各阶段线程重复创建
+    stage_qps = get_config('STREAM_STAGE_QPS')
+    shared_limiter = None if stage_qps else TokenBucket(get_credential_pool(get_config()).total_qps)
+
+    queues = [queue.Queue() for _ in versions] # 每个阶段的输入队列
+    outputs = {version: [None] * len(chunks) for version in versions}
+    stage_stats = [{"version": version, "busy_seconds": 0.0, "chars": 0} for version in versions]
+    reports = [RunReport('translate', version) for version in versions] # 每个阶段一份，互不干扰
+    journals = [
+        TranslationJournal("./data/" + get_config('TRANSLATED_FILE_FORMAT').format(version) + ".journal",
+                           get_config('JOURNAL_FSYNC_INTERVAL') or 5.0)
+        for version in versions
+    ]
+    for journal in journals:
+        if journal.batch_count:
+            print(f"-> 发现断点日志 {journal.path}，已完成 {journal.batch_count} 个批次，将从中断处继续。")
+    errors: List[BaseException] = []
+    bars = [
+        tqdm(total=len(data), desc=f"v{version} {df_trans_loop['翻译源'][version-1]}->{df_trans_loop['翻译目标'][version-1]}",
+             unit="条", position=i, leave=True)
+        for i, version in enumerate(versions)
+    ]
+
+    def stage_worker(stage_index: int):
+        version = versions[stage_index]
+        from_lang, to_lang = df_trans_loop['翻译源'][version-1], df_trans_loop['翻译目标'][version-1]
+        limiter = TokenBucket(stage_qps) if stage_qps else shared_limiter
+        while True:
+            item = queues[stage_index].get()
+            if item is None:
+                break
+            if errors:
+                continue # 其它阶段已出错，只排空队列
+            chunk_index, chunk = item
+            try:
+                started = time.perf_counter()
+                source_key = 'original_en_text' if version == 1 else 'secondary_translated_text'
+                stage_stats[stage_index]["chars"] += sum(len(entry.get(source_key) or '') for entry in chunk)
+                # 复制条目：上一阶段的结果要保留为该版本的快照
+                chunk = run_translation_hop([dict(entry) for entry in chunk], version, from_lang, to_lang,
+                                            journal=journals[stage_index], rate_limiter=limiter, verbose=False,
+                                            report=reports[stage_index])
+                stage_stats[stage_index]["busy_seconds"] += time.perf_counter() - started
+            except BaseException as e:
+                errors.append(e)
+                continue
+            outputs[version][chunk_index] = chunk
+            bars[stage_index].update(len(chunk))
+            if stage_index + 1 < len(versions):
+                queues[stage_index + 1].put((chunk_index, chunk))
+        if stage_index + 1 < len(versions):
+            queues[stage_index + 1].put(None) # 结束标记传给下一阶段
+
+    pipeline_start = time.perf_counter()
+    threads = [threading.Thread(target=stage_worker, args=(i,), daemon=True) for i in range(len(versions))]
+    for thread in threads:
+        thread.start()
+    for chunk_index, chunk in enumerate(chunks):
+        queues[0].put((chunk_index, chunk))
+    queues[0].put(None)
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=0.5) # 带超时的 join，保证 Ctrl-C 能及时响应
+    except KeyboardInterrupt:
+        # 各阶段线程可能仍在写日志，不在此关闭；日志每个批次都已 flush
+        errors.append(KeyboardInterrupt())
+        print("\n-> 流水线被中断，已翻译的批次保存在各版本的断点日志中，重新运行即可继续。")
+        raise
+    finally:
+        for bar in bars:
+            bar.close()
+    if errors:
+        for journal in journals:
+            journal.close()
+        print("-> 流水线出错，已翻译的批次保存在各版本的断点日志中，重新运行即可继续。")
+        raise errors[0]
+
+    # 按 snapshot_every 写出版本快照 (最后一轮始终写出)
+    for i, version in enumerate(versions):
+        if version == end_version or (snapshot_every and (i + 1) % snapshot_every == 0):
+            version_data = [entry for chunk in outputs[version] for entry in chunk]
+            output_file = _save_version(version_data, version, reports[i], df_trans_loop['翻译源'][version-1],
+                                        df_trans_loop['翻译目标'][version-1], stage_stats[i]['busy_seconds'])
+            print(f"-> 快照已保存到 {output_file}。")
+    for journal in journals:
+        journal.close(remove=True)
+
+    print(f"\n--------流式流水线汇总 (总用时 {time.perf_counter() - pipeline_start:.1f}s)--------")
+    for stats in stage_stats:
+        print(f"  v{stats['version']:<3} 阶段忙碌 {stats['busy_seconds']:8.1f}s  字符 {stats['chars']:>8}")
+    for stats, report in zip(stage_stats, reports):
+        report.extra.update(busy_seconds=round(stats['busy_seconds'], 6), chunks=len(chunks))
+        _save_report(report)
+    return stage_stats
+
+def run_translation_hop(
+    data: List[Dict[str, Any]], next_version: int, from_lang: str, to_lang: str,
+    journal=None, rate_limiter=None, verbose: bool = True, report: RunReport = None, stats: Dict[str, int] = None
+) -> List[Dict[str, Any]]:
+    """
+    在内存中对条目列表执行一轮 (一个版本) 翻译，结果保存在 'secondary_translated_text'。
+    :param report: 该版本的 RunReport，记录编码、API 批次与解码阶段。
+    :param stats: 可选的统计字典，见 translate_entries_batch。
+    """
     is_initial_translation = (next_version == 1)
+    options = dict(journal=journal, rate_limiter=rate_limiter, verbose=verbose, report=report, stats=stats)
 
     if is_initial_translation:
         # 策略 1: 首次翻译 (V1) - EN -> ZH
-        data_transed = translate_entries_batch(data, 'en', 'zh', source_key='original_en_text')
+        data_transed = translate_entries_batch(data, 'en', 'zh', source_key='original_en_text', **options)
         #制作一个二次翻译字段保存首次翻译结果
         for item in data:
             item['translated_text'] = item.get('secondary_translated_text')
@@ -122,17 +442,101 @@ def translate_exported_data(input_file: str, next_version: int,from_lang: str, t
         #将上一个版本的'secondary_translated_text'结果作为'translated_text'
         for item in data:
             item['translated_text'] = item.get('secondary_translated_text')
-        data_transed = translate_entries_batch(data, from_lang , to_lang, source_key='translated_text') # 结果保存在'secondary_translated_text'
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(data_transed, f, ensure_ascii=False, indent=4)
-        
-    print(f"-> 翻译结果已保存到 {output_file}。")
-    return output_file
+        data_transed = translate_entries_batch(data, from_lang , to_lang, source_key='translated_text', **options) # 结果保存在'secondary_translated_text'
+    return data_transed
+
+def incremental_update(df_trans_loop: pd.DataFrame) -> int:
+    """
+    增量翻译：游戏更新后重新 export 时，只把新增或源文本变化的条目依次送过整条翻译链，
+    未变化的条目直接沿用旧版本文件中的结果。旧版本文件会被按新导出顺序重写。
+    返回重新翻译的条目数。
+    """
+    export_file = "./data/" + get_config('EXPORT_FILE_NAME')
+    _, latest_version, _ = find_latest_translation_file()
+    if latest_version == 0:
+        print("  [错误] 尚无任何翻译版本，请先执行完整翻译。")
+        return 0
+
+    with open(export_file, 'r', encoding='utf-8') as f:
+        export_data = json.load(f)
+
+    # 1. 与 v1 的内容哈希索引对比，找出新增/变化的条目
+    v1_file = translation_version_path(1)
+    if v1_file is None:
+        print("  [错误] 版本 v1 不存在，无法判断哪些条目发生了变化，请先执行完整翻译。")
+        return 0
+    old_index = load_content_index(v1_file)
+    changed = [entry for entry in export_data if old_index.get(entry['key']) != compute_entry_hash(entry)]
+    removed_count = len(set(old_index) - {entry['key'] for entry in export_data})
+    print(f"-> 新导出 {len(export_data)} 个条目：新增/变化 {len(changed)} 个，删除 {removed_count} 个。")
+    if not changed and not removed_count:
+        print("-> 没有需要更新的条目。")
+        return 0
+
+    # 2. 变化的条目依次通过每一轮翻译，每轮与旧版本的未变化条目合并后写回
+    subset = [dict(entry) for entry in changed]
+    changed_keys = {entry['key'] for entry in changed}
+    for version in range(1, latest_version + 1):
+        from_lang, to_lang = df_trans_loop['翻译源'][version-1], df_trans_loop['翻译目标'][version-1]
+        print(f"----增量翻译版本:v{version},翻译语言: {from_lang} -> {to_lang}----")
+        report = RunReport('translate_incremental', version)
+        if subset:
+            subset = run_translation_hop(subset, version, from_lang, to_lang, report=report)
+        subset_by_key = {entry['key']: entry for entry in subset}
+
+        version_file = translation_version_path(version)
+        if version_file is None:
+            print(f"  [警告] 旧版本 v{version} 不存在，无法沿用未变化条目，跳过写入该版本。")
+            continue
+        old_by_key = {entry['key']: entry for entry in load_translation_file(version_file)}
+
+        merged = []
+        for entry in export_data:
+            key = entry['key']
+            if key in changed_keys:
+                merged.append(dict(subset_by_key[key]))
+            else:
+                # 源文本未变：沿用旧译文，其余字段 (文件路径、中文原文) 以新导出为准
+                item = dict(entry)
+                item['translated_text'] = old_by_key.get(key, {}).get('translated_text')
+                item['secondary_translated_text'] = old_by_key.get(key, {}).get('secondary_translated_text')
+                merged.append(item)
+
+        version_file = _save_version(merged, version, report, from_lang, to_lang)
+        print(f"-> 已更新 {version_file}。")
+        _save_report(report)
+    return len(changed)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按 翻译顺序.csv 执行机器翻译")
+    parser.add_argument('--incremental', action='store_true',
+                        help="重新 export 后只翻译新增/变化的条目，并更新所有已有版本")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="在一个进程内连续执行多轮翻译 (默认从下一个版本到 CSV 末尾)")
+    parser.add_argument('--start', type=int, default=None, help="流水线起始版本 (默认: 最新版本 + 1)")
+    parser.add_argument('--end', type=int, default=None, help="流水线结束版本 (默认: CSV 最后一个版本)")
+    parser.add_argument('--snapshot-every', type=int, default=1,
+                        help="流水线每隔多少轮写一次版本文件，0 表示只写最后一轮 (默认: 1)")
+    parser.add_argument('--stream', action='store_true',
+                        help="与 --pipeline 一起使用：按块流式推进，各轮翻译并行重叠")
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help="流式流水线每块的条目数 (默认: 配置 STREAM_CHUNK_SIZE)")
+    args = parser.parse_args()
+
     #加载翻译顺序表
     df_trans_loop = pd.read_csv("翻译顺序.csv")
+
+    if args.incremental:
+        print("--------增量翻译--------")
+        incremental_update(df_trans_loop)
+        exit(0)
+    if args.pipeline:
+        print("--------流水线模式--------")
+        if args.stream:
+            run_streaming_pipeline(df_trans_loop, args.start, args.end, args.snapshot_every, args.chunk_size)
+        else:
+            run_pipeline(df_trans_loop, args.start, args.end, args.snapshot_every)
+        exit(0)
     
     # 1. 查找最新的文件
     # 2. 调用翻译函数
@@ -0,0 +1,212 @@
+# translation_backends.py
+# 可插拔的翻译服务：每个服务商实现 TranslationBackend (批次限制、限速器、重试策略与语言代码映射)，
+# translate_entries_batch 通过 get_translator 取得翻译器，不再直接依赖 tmt_translate_batch。
+# - TencentBackend: 腾讯云 TMT (qcloud_core，支持 TMT_CREDENTIALS 多账号)；
+# - BaiduBackend: 百度通用文本翻译 (baidu_core)；
+# - BackendRouter: TRANSLATION_BACKENDS 配置了多个服务时，把一轮翻译切块分给各服务并发处理，
+#   吞吐量叠加；某个服务不可用时，剩余的块与失败的片段自动改由其他服务翻译。
+import threading
+from typing import List, Dict, Any, Callable, Optional
+
+from baidu_core import BAIDU_LANGUAGE_CODES, BAIDU_MAX_QUERY_BYTES, BAIDU_MAX_TEXT_COUNT, BAIDU_SPLIT_CHARS, \
+    get_baidu_pool, utf8_query_size
+from qcloud_core import TMT_DEFAULT_MAX_RETRIES, TMT_DEFAULT_WORKERS, TMT_ERROR_MARKER, credential_specs, \
+    get_credential_pool, run_batches, tmt_translate_batch
+from translation_memory import ERROR_MARKERS
+
+DEFAULT_BACKENDS = ["tencent"]
+DEFAULT_CHUNK_SIZE = 500
+
+
+def is_failed(text: str) -> bool:
+    return any(marker in text for marker in ERROR_MARKERS)
+
+
+class TranslationBackend:
+    """
+    翻译服务接口。translate 对一组片段完成整轮翻译 (分批、并发、重试)，结果按输入顺序返回，
+    失败的片段为错误标记；on_batch_done(原文列表, 译文列表) 在每个批次完成后调用。
+    """
+    name = "base"
+    LANGUAGE_CODES: Dict[str, str] = {} # 本项目的语言代码 -> 服务商的语言代码，未列出的相同
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+
+    def map_lang(self, lang: str) -> str:
+        return self.LANGUAGE_CODES.get(lang, lang)
+
+    def is_configured(self) -> bool:
+        raise NotImplementedError
+
+    @property
+    def capacity(self) -> float:
+        """每秒可发送的请求数，用于日志与报告。"""
+        raise NotImplementedError
+
+    def translate(self, texts: List[str], from_lang: str, to_lang: str,
+                  on_batch_done: Callable[[List[str], List[str]], None] = None) -> List[str]:
+        raise NotImplementedError
+
+
+class TencentBackend(TranslationBackend):
+    """腾讯云 TMT：每批 1500 字符 / 300 条，按 TMT_CREDENTIALS (或 Tencent_*) 的账号限速。"""
+    name = "tencent"
+
+    def is_configured(self) -> bool:
+        return all(spec.get('Secret_Id') and spec.get('Secret_Key') for spec in credential_specs(self.config))
+
+    @property
+    def capacity(self) -> float:
+        return get_credential_pool(self.config).total_qps
+
+    def translate(self, texts, from_lang, to_lang, on_batch_done=None):
+        return tmt_translate_batch(texts, self.map_lang(from_lang), self.map_lang(to_lang), self.config,
+                                   on_batch_done=on_batch_done)
+
+
+class BaiduBackend(TranslationBackend):
+    """百度通用文本翻译：每批不超过 6000 字节 (UTF-8)，按 BAIDU_QPS 限速，错误码见 baidu_core。"""
+    name = "baidu"
+    LANGUAGE_CODES = BAIDU_LANGUAGE_CODES
+
+    def is_configured(self) -> bool:
+        return bool(self.config.get('Baidu_APP_ID') and self.config.get('Baidu_API_KEY'))
+
+    @property
+    def capacity(self) -> float:
+        return get_baidu_pool(self.config).total_qps
+
+    def translate(self, texts, from_lang, to_lang, on_batch_done=None):
+        if not self.is_configured():
+            print("  ❌ 错误：Baidu_APP_ID 或 Baidu_API_KEY 配置缺失。")
+            return ["CONFIG_ERROR"] * len(texts)
+        pool = get_baidu_pool(self.config)
+        max_workers = self.config.get('TMT_MAX_WORKERS') or TMT_DEFAULT_WORKERS
+        pool.resize_pools(max_workers)
+        max_retries = self.config.get('TMT_MAX_RETRIES')
+        return run_batches(
+            texts, self.map_lang(from_lang), self.map_lang(to_lang), pool,
+            max_workers=max_workers,
+            max_retries=TMT_DEFAULT_MAX_RETRIES if max_retries is None else max_retries,
+            extra_limiter=self.config.get('RATE_LIMITER'), verbose=self.config.get('VERBOSE', True),
+            report=self.config.get('RUN_REPORT'), on_batch_done=on_batch_done,
+            max_size=BAIDU_MAX_QUERY_BYTES, max_texts=BAIDU_MAX_TEXT_COUNT, measure=utf8_query_size,
+            split_limit=BAIDU_SPLIT_CHARS
+        )
+
+
+class BackendRouter:
+    """
+    把一轮翻译切成 chunk_size 个片段一块，各服务各用一个线程从共享队列中取块翻译 (快的服务自然多取)。
+    某个服务整块失败 (或抛出异常) 时视为不可用，本轮不再使用；失败的片段交给尚未尝试过的服务重新翻译。
+    """
+
+    def __init__(self, backends: List[TranslationBackend], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 verbose: bool = True, report=None):
+        self.backends = backends
+        self.chunk_size = chunk_size
+        self.verbose = verbose
+        self.report = report
+
+    def translate(self, texts: List[str], from_lang: str, to_lang: str,
+                  on_batch_done: Callable[[List[str], List[str]], None] = None) -> List[str]:
+        results: List[Optional[str]] = [None] * len(texts)
+        # 待翻译的块: (片段下标, 已尝试过的服务名)
+        pending = [(list(range(i, min(i + self.chunk_size, len(texts)))), frozenset())
+                   for i in range(0, len(texts), self.chunk_size)]
+        condition = threading.Condition()
+        in_flight = [0]
+        usage = {backend.name: {"chunks": 0, "texts": 0, "failed_over": 0} for backend in self.backends}
+        if self.verbose:
+            names = ", ".join(f"{backend.name} ({backend.capacity:g} QPS)" for backend in self.backends)
+            print(f"➡️➡️➡️ {len(texts)} 个片段分为 {len(pending)} 块，由 {names} 并发翻译...")
+
+        def done_callback(sources: List[str], targets: List[str]):
+            # 各服务的回调在不同线程中触发，串行化后再交给调用方 (翻译记忆库、断点日志)
+            if on_batch_done is not None:
+                with condition:
+                    on_batch_done(sources, targets)
+
+        def worker(backend: TranslationBackend):
+            while True:
+                with condition:
+                    while True:
+                        chunk = next((item for item in pending if backend.name not in item[1]), None)
+                        if chunk is not None:
+                            pending.remove(chunk)
+                            in_flight[0] += 1
+                            break
+                        if in_flight[0] == 0:
+                            condition.notify_all()
+                            return
+                        condition.wait() # 其他服务的块可能失败后重新入队
+                indices, tried = chunk
+                try:
+                    translated = backend.translate([texts[i] for i in indices], from_lang, to_lang, done_callback)
+                except Exception as e:
+                    print(f"  ❌ 翻译服务 {backend.name} 出错: {e}")
+                    translated = None
+                with condition:
+                    in_flight[0] -= 1
+                    failed = list(indices) if translated is None else \
+                        [i for i, text in zip(indices, translated) if is_failed(text)]
+                    if translated is not None:
+                        for i, text in zip(indices, translated):
+                            results[i] = text
+                    usage[backend.name]["chunks"] += 1
+                    usage[backend.name]["texts"] += len(indices) - len(failed)
+                    if failed:
+                        usage[backend.name]["failed_over"] += len(failed)
+                        pending.append((failed, tried | {backend.name}))
+                    condition.notify_all()
+                    if failed and len(failed) == len(indices) and len(indices) > 1:
+                        print(f"  ❌ 翻译服务 {backend.name} 不可用，剩余片段改由其他服务翻译。")
+                        return
+
+        threads = [threading.Thread(target=worker, args=(backend,), daemon=True) for backend in self.backends]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 所有服务都失败的片段保留最后一次的错误标记 (服务抛出异常时没有译文)
+        for indices, _ in pending:
+            for i in indices:
+                if results[i] is None:
+                    results[i] = TMT_ERROR_MARKER
+        if self.report is not None:
+            backends = self.report.extra.setdefault('backends', {})
+            for name, item in usage.items():
+                total = backends.setdefault(name, {"chunks": 0, "texts": 0, "failed_over": 0})
+                for field, value in item.items():
+                    total[field] += value
+        return results
+
+
+BACKENDS = {
+    TencentBackend.name: TencentBackend,
+    BaiduBackend.name: BaiduBackend,
+}
+
+def get_translator(config: Dict[str, Any]):
+    """
+    按 TRANSLATION_BACKENDS (默认只用腾讯云) 创建翻译器：单个服务时直接返回该服务，
+    多个服务时返回 BackendRouter (跳过未配置密钥的服务)。
+    """
+    names = config.get('TRANSLATION_BACKENDS') or DEFAULT_BACKENDS
+    unknown = [name for name in names if name not in BACKENDS]
+    if unknown:
+        raise ValueError(f"未知的翻译服务: {', '.join(unknown)} (可选: {', '.join(BACKENDS)})")
+    if len(names) == 1:
+        return BACKENDS[names[0]](config)
+    # 路由器自己打印进度，各服务不再逐块输出
+    backends = [BACKENDS[name](dict(config, VERBOSE=False)) for name in names]
+    configured = [backend for backend in backends if backend.is_configured()]
+    for backend in backends:
+        if backend not in configured:
+            print(f"  [警告] 翻译服务 {backend.name} 未配置密钥，已跳过。")
+    if len(configured) <= 1:
+        return configured[0] if configured else backends[0]
+    return BackendRouter(configured, config.get('BACKEND_CHUNK_SIZE') or DEFAULT_CHUNK_SIZE,
+                         config.get('VERBOSE', True), config.get('RUN_REPORT'))
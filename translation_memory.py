@@ -0,0 +1,129 @@
+# translation_memory.py
+# 片段级翻译记忆库：以 (原文, 源语言, 目标语言) 为键，把 API 结果持久化到 SQLite。
+# 相同的片段（UI 标签、重复台词、按 &lt;br&gt; 拆出的短句）在不同条目/不同次运行之间只需翻译一次。
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Tuple
+
+# 这些标记表示翻译失败，不能写入记忆库
+ERROR_MARKERS = ("&&error&&", "CONFIG_ERROR")
+_SQLITE_MAX_VARS = 500 # 单条 IN (...) 查询的参数上限，留足余量
+
+
+class TranslationMemory:
+    """
+    基于 SQLite 的翻译记忆库。
+    每个 API 批次完成后立即写入，因此中途崩溃后重跑同一版本几乎不需要再调用 API。
+    连接由内部锁保护，可在流式流水线的多个阶段线程中共享。
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.RLock()
+        # WAL + NORMAL: 每批一次提交的开销很小，且崩溃后已提交的数据不会丢失
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tm (
+                source TEXT NOT NULL,
+                from_lang TEXT NOT NULL,
+                to_lang TEXT NOT NULL,
+                target TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (source, from_lang, to_lang)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tm_last_used ON tm (last_used)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, texts: Iterable[str], from_lang: str, to_lang: str) -> Dict[str, str]:
+        """
+        批量查询记忆库，返回 {原文: 译文}，只包含命中的片段。命中的条目会刷新 last_used。
+        """
+        with self._lock:
+            unique_texts = list(dict.fromkeys(texts))
+            found: Dict[str, str] = {}
+            for i in range(0, len(unique_texts), _SQLITE_MAX_VARS):
+                chunk = unique_texts[i:i + _SQLITE_MAX_VARS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT source, target FROM tm WHERE from_lang = ? AND to_lang = ? AND source IN ({placeholders})",
+                    [from_lang, to_lang] + chunk
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE tm SET last_used = ? WHERE source = ? AND from_lang = ? AND to_lang = ?",
+                    [(now, source, from_lang, to_lang) for source in found]
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(unique_texts) - len(found)
+            return found
+
+    def store(self, pairs: Iterable[Tuple[str, str]], from_lang: str, to_lang: str) -> int:
+        """写入一批 (原文, 译文)，跳过失败标记。返回实际写入条数。"""
+        with self._lock:
+            now = time.time()
+            rows = [
+                (source, from_lang, to_lang, target, now, now)
+                for source, target in pairs
+                if target and not any(marker in target for marker in ERROR_MARKERS)
+            ]
+            if rows:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO tm (source, from_lang, to_lang, target, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+            return len(rows)
+
+    def evict(self, max_entries: int = None, max_age_days: float = None) -> int:
+        """
+        按年龄和容量淘汰条目：
+        - max_age_days: 删除超过该天数未被使用的条目；
+        - max_entries: 只保留最近使用的 max_entries 条。
+        返回删除的条目数。
+        """
+        with self._lock:
+            removed = 0
+            if max_age_days:
+                cutoff = time.time() - max_age_days * 86400
+                removed += self._conn.execute("DELETE FROM tm WHERE last_used < ?", (cutoff,)).rowcount
+            if max_entries:
+                stale = self._conn.execute(
+                    "SELECT source, from_lang, to_lang FROM tm ORDER BY last_used DESC LIMIT -1 OFFSET ?",
+                    (max_entries,)
+                ).fetchall()
+                self._conn.executemany(
+                    "DELETE FROM tm WHERE source = ? AND from_lang = ? AND to_lang = ?", stale
+                )
+                removed += len(stale)
+            self._conn.commit()
+            return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,221 @@
+# version_catalog.py
+# 版本目录 (data/catalog.json)：记录每个翻译版本的文件路径、父版本、语言方向、条目数、内容哈希、
+# 实际发送的 API 字符数、用时与错误条目数。
+# 查找最新版本 / 父版本 / 指定版本只需查字典，不再每次列出 data/ 并逐个匹配文件名，也不必打开版本文件；
+# 完整性校验只比较文件大小与修改时间 (--deep 时重新计算文件哈希)，无需重新解析 4 MB 的 JSON。
+# 目录不存在时 (旧数据) 自动从 data/ 与列式存储重建一次。
+#
+# 用法:
+#   python version_catalog.py show              # 列出所有版本
+#   python version_catalog.py verify [--deep]   # 校验版本文件是否在目录之外被修改或删除
+#   python version_catalog.py rebuild           # 手动放入/删除版本文件后重新扫描
+import argparse
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+from translation_memory import ERROR_MARKERS
+from version_store import VERSION_FILE_PATTERN
+
+CATALOG_FORMAT_VERSION = 1
+DEFAULT_CATALOG_PATH = "data/catalog.json"
+TEXT_COLUMN = 'secondary_translated_text'
+
+
+def file_hash(path: str) -> str:
+    """版本文件内容的 SHA-1 (按块读取，不解析 JSON)。"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def count_errors(data: List[Dict[str, Any]]) -> int:
+    """译文中含错误标记的条目数。"""
+    return sum(1 for entry in data if any(marker in (entry.get(TEXT_COLUMN) or '') for marker in ERROR_MARKERS))
+
+
+class VersionCatalog:
+    """
+    版本目录：{版本号: 记录} 保存在一个 JSON 文件中，进程内只读取一次。
+    记录字段: version, parent, path, format, source, target, rows, bytes, mtime_ns, content_hash,
+    api_chars, seconds, errors, created_at。
+    """
+    def __init__(self, catalog_path: str = DEFAULT_CATALOG_PATH):
+        self.catalog_path = catalog_path
+        self.versions: Dict[int, Dict[str, Any]] = {}
+        self.latest_version = 0
+        self.loaded = False
+        if os.path.exists(catalog_path):
+            with open(catalog_path, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+            if content.get('format') == CATALOG_FORMAT_VERSION:
+                self.versions = {int(version): record for version, record in content['versions'].items()}
+                self.latest_version = max(self.versions, default=0)
+                self.loaded = True
+
+    # -- 查询 --
+    def get(self, version: int) -> Optional[Dict[str, Any]]:
+        return self.versions.get(version)
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        return self.versions.get(self.latest_version)
+
+    def parent(self, version: int) -> Optional[Dict[str, Any]]:
+        """父版本 (本版本的翻译输入) 的记录；父版本为导出文件 (0) 或不在目录中时返回 None。"""
+        record = self.versions.get(version)
+        return self.versions.get(record['parent']) if record and record.get('parent') else None
+
+    # -- 写入 --
+    def save(self):
+        """原子写入目录文件 (先写临时文件再替换)。"""
+        directory = os.path.dirname(self.catalog_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        content = {
+            "format": CATALOG_FORMAT_VERSION,
+            "versions": {str(version): self.versions[version] for version in sorted(self.versions)},
+        }
+        tmp_path = self.catalog_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(content, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.catalog_path)
+
+    def _file_fields(self, path: str) -> Dict[str, Any]:
+        stat = os.stat(path)
+        return {
+            "path": path,
+            "format": "columnar" if VERSION_FILE_PATTERN.match(os.path.basename(path)) else "json",
+            "bytes": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "content_hash": file_hash(path),
+        }
+
+    def record(self, version: int, path: str, data: List[Dict[str, Any]], parent: int = None,
+               source: str = None, target: str = None, api_chars: int = 0, seconds: float = 0.0) -> Dict[str, Any]:
+        """登记刚写出的版本文件 (覆盖同一版本的旧记录) 并保存目录。"""
+        record = {
+            "version": version,
+            "parent": version - 1 if parent is None else parent,
+            **self._file_fields(path),
+            "source": source,
+            "target": target,
+            "rows": len(data),
+            "api_chars": api_chars,
+            "seconds": round(seconds, 3),
+            "errors": count_errors(data),
+            "created_at": datetime.now().isoformat(timespec='seconds'),
+        }
+        self.versions[version] = record
+        self.latest_version = max(self.latest_version, version)
+        self.save()
+        return record
+
+    def relocate(self, version: int, path: str):
+        """版本换了存储格式 (例如导入列式存储) 时只更新文件字段，保留语言方向、用时等元数据。"""
+        record = self.versions.get(version)
+        if record is None:
+            return
+        record.update(self._file_fields(path))
+        self.save()
+
+    def rebuild(self, data_dir: str, file_format: str, store=None, load=None) -> int:
+        """
+        扫描 data_dir 中的 JSON 版本文件与列式存储 store，重建目录 (同一版本优先使用列式存储)。
+        已登记版本的语言方向、用时等元数据予以保留。load(path) 读取版本文件以统计条目数与错误数。
+        返回登记的版本数。
+        """
+        pattern = re.compile(file_format.replace('{}', r'(\d+)').replace('.', r'\.') + '$')
+        found: Dict[int, str] = {}
+        if os.path.isdir(data_dir):
+            for filename in os.listdir(data_dir):
+                match = pattern.match(filename)
+                if match:
+                    found[int(match.group(1))] = data_dir + filename
+        if store is not None:
+            for version in store.versions():
+                found[version] = store.version_path(version)
+
+        old_versions = self.versions
+        self.versions = {}
+        for version in sorted(found):
+            path = found[version]
+            old = old_versions.get(version, {})
+            data = load(path, [TEXT_COLUMN])
+            self.versions[version] = {
+                "version": version,
+                "parent": old.get('parent', version - 1),
+                **self._file_fields(path),
+                "source": old.get('source'),
+                "target": old.get('target'),
+                "rows": len(data),
+                "api_chars": old.get('api_chars', 0),
+                "seconds": old.get('seconds', 0.0),
+                "errors": count_errors(data),
+                "created_at": old.get('created_at'),
+            }
+        self.latest_version = max(self.versions, default=0)
+        self.loaded = True
+        self.save()
+        return len(self.versions)
+
+    # -- 校验 --
+    def verify(self, versions: List[int] = None, deep: bool = False) -> List[str]:
+        """
+        校验版本文件是否存在、大小与修改时间是否与登记时一致；deep=True 时再比较内容哈希
+        (修改时间变化但内容相同的文件不算错误)。返回问题列表，为空表示全部正常。
+        """
+        problems = []
+        for version in sorted(self.versions if versions is None else versions):
+            record = self.versions.get(version)
+            if record is None:
+                problems.append(f"v{version}: 不在版本目录中。")
+                continue
+            path = record['path']
+            if not os.path.exists(path):
+                problems.append(f"v{version}: 文件 {path} 不存在。")
+                continue
+            stat = os.stat(path)
+            if stat.st_size != record['bytes']:
+                problems.append(f"v{version}: 文件大小 {stat.st_size} 与登记的 {record['bytes']} 不一致。")
+            elif deep and file_hash(path) != record['content_hash']:
+                problems.append(f"v{version}: 内容哈希与登记的不一致。")
+            elif not deep and stat.st_mtime_ns != record['mtime_ns']:
+                problems.append(f"v{version}: 文件在登记后被修改过 (可用 --deep 比较内容哈希)。")
+        return problems
+
+
+if __name__ == "__main__":
+    from localization_core import init_config, get_version_catalog, rebuild_version_catalog
+
+    init_config()
+    parser = argparse.ArgumentParser(description="翻译版本目录 (查看/校验/重建)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('show', help="列出所有版本")
+    verify_parser = subparsers.add_parser('verify', help="校验版本文件是否被修改或删除")
+    verify_parser.add_argument('--deep', action='store_true', help="重新计算文件哈希 (不解析 JSON)")
+    subparsers.add_parser('rebuild', help="重新扫描 data/ 与列式存储")
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        print(f"✅ 已登记 {rebuild_version_catalog()} 个版本。")
+        exit(0)
+    catalog = get_version_catalog()
+    if args.command == 'show':
+        for version in sorted(catalog.versions):
+            record = catalog.versions[version]
+            direction = f"{record['source']} -> {record['target']}" if record.get('source') else "-"
+            print(f"  v{version:<3} {direction:<10} 条目 {record['rows']:>6}  错误 {record['errors']:>4}  "
+                  f"发送 {record['api_chars']:>8} 字符  {record['seconds']:8.1f}s  {record['path']}")
+    else:
+        problems = catalog.verify(deep=args.deep)
+        for problem in problems:
+            print(f"  [警告] {problem}")
+        if problems:
+            print(f"❌ {len(problems)} 个问题，手动修改过版本文件时可运行 python version_catalog.py rebuild。")
+            exit(1)
+        print(f"✅ {len(catalog.versions)} 个版本均与目录一致。")
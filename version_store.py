@@ -0,0 +1,299 @@
+# version_store.py
+# 版本文件的紧凑列式存储。
+# 每个 localization_translated_vN.json 都重复保存 key / 文件路径 / 英文原文 / 中文原文，
+# 20 个版本约 80 MB，几乎都是重复数据。这里把不变的列只保存一次 (base_<hash>.bin)，
+# 每个版本只保存一列译文 (vN.col)，读取时通过 mmap 只解码需要的列。
+#
+# 文件格式 (小端序)：
+#   文件头: MAGIC(4) + 格式版本 uint32 + 列数 uint32 + 元数据长度 uint32 + 元数据 JSON
+#   每列:   列名长度 uint16 + 列名 + 数据长度 uint64，随后是列数据
+#   列数据: 行数 uint32 + 空值标记 bytes[行数] + 偏移 uint64[行数 + 1] + UTF-8 字符串数据
+#
+# 用法:
+#   python version_store.py import            # 把 data/ 下所有 JSON 版本导入列式存储
+#   python version_store.py export --version 20 [--output xxx.json]
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+from array import array
+from typing import List, Dict, Any, Optional, Iterable
+
+MAGIC = b'HKTS'
+FORMAT_VERSION = 1
+BASE_COLUMNS = ['key', 'en_filepath', 'zh_filepath', 'original_en_text', 'original_zh_text']
+TEXT_COLUMN = 'secondary_translated_text'
+INPUT_COLUMN = 'translated_text' # 本轮的输入文本：v1 等于自身译文，其余通常等于上一版本的译文
+OVERRIDE_INDEX_COLUMN = 'translated_text_override_index'
+OVERRIDE_TEXT_COLUMN = 'translated_text_override'
+VERSION_FILE_PATTERN = re.compile(r'^v(\d+)\.col$')
+
+
+# --- 底层读写 ---
+def _encode_column(values: List[Optional[str]]) -> bytes:
+    """把字符串列编码为: 行数 + 空值标记 + 偏移数组 + UTF-8 数据。"""
+    nulls = bytearray(len(values))
+    offsets = array('Q', [0])
+    blob = bytearray()
+    for i, value in enumerate(values):
+        if value is None:
+            nulls[i] = 1
+        else:
+            blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    if offsets.itemsize != 8 or struct.pack('=H', 1) != struct.pack('<H', 1):
+        raise RuntimeError("当前平台不支持列式存储格式 (需要小端序 64 位偏移)。")
+    return struct.pack('<I', len(values)) + bytes(nulls) + offsets.tobytes() + bytes(blob)
+
+
+def _decode_column(buffer, start: int) -> List[Optional[str]]:
+    """从 buffer[start:] 解码一列字符串。"""
+    (count,) = struct.unpack_from('<I', buffer, start)
+    nulls_start = start + 4
+    offsets_start = nulls_start + count
+    blob_start = offsets_start + 8 * (count + 1)
+    nulls = buffer[nulls_start:offsets_start]
+    offsets = array('Q')
+    offsets.frombytes(buffer[offsets_start:blob_start])
+    blob = buffer[blob_start:blob_start + offsets[count]]
+    return [
+        None if nulls[i] else blob[offsets[i]:offsets[i + 1]].decode('utf-8')
+        for i in range(count)
+    ]
+
+
+def _write_table(path: str, columns: Dict[str, List[Optional[str]]], metadata: Dict[str, Any]):
+    """原子写入一个多列文件 (先写临时文件再替换)。"""
+    meta_bytes = json.dumps(metadata, ensure_ascii=False).encode('utf-8')
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<III', FORMAT_VERSION, len(columns), len(meta_bytes)) + meta_bytes)
+        for name, values in columns.items():
+            data = _encode_column(values)
+            name_bytes = name.encode('utf-8')
+            f.write(struct.pack('<H', len(name_bytes)) + name_bytes + struct.pack('<Q', len(data)))
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _read_table(path: str, wanted: Iterable[str] = None):
+    """
+    通过 mmap 读取多列文件，只解码 wanted 中的列 (None 表示全部)。
+    返回 (元数据, {列名: 值列表})。
+    """
+    wanted = set(wanted) if wanted is not None else None
+    columns: Dict[str, List[Optional[str]]] = {}
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if buffer[:4] != MAGIC:
+                raise ValueError(f"{path} 不是有效的列式存储文件。")
+            format_version, column_count, meta_length = struct.unpack_from('<III', buffer, 4)
+            if format_version != FORMAT_VERSION:
+                raise ValueError(f"{path} 的格式版本 {format_version} 不受支持。")
+            position = 16
+            metadata = json.loads(buffer[position:position + meta_length].decode('utf-8'))
+            position += meta_length
+            for _ in range(column_count):
+                (name_length,) = struct.unpack_from('<H', buffer, position)
+                position += 2
+                name = buffer[position:position + name_length].decode('utf-8')
+                position += name_length
+                (data_length,) = struct.unpack_from('<Q', buffer, position)
+                position += 8
+                if wanted is None or name in wanted:
+                    columns[name] = _decode_column(buffer, position)
+                position += data_length
+    return metadata, columns
+
+
+def _column_hash(values: List[Optional[str]]) -> str:
+    digest = hashlib.sha1()
+    for value in values:
+        digest.update(b'\x00' if value is None else b'\x01' + value.encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+
+# --- 版本库 ---
+class VersionStore:
+    """
+    列式版本库：不变列保存在 base_<hash>.bin，每个版本保存在 vN.col。
+    vN.col 只包含一列译文 (secondary_translated_text)，以及 translated_text 与推导值不一致的少量覆盖项。
+    """
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self._base_cache: Dict[str, Dict[str, List[Optional[str]]]] = {}
+
+    def version_path(self, version: int) -> str:
+        return os.path.join(self.store_dir, f"v{version}.col")
+
+    def versions(self) -> List[int]:
+        if not os.path.isdir(self.store_dir):
+            return []
+        found = []
+        for filename in os.listdir(self.store_dir):
+            match = VERSION_FILE_PATTERN.match(filename)
+            if match:
+                found.append(int(match.group(1)))
+        return sorted(found)
+
+    def has_version(self, version: int) -> bool:
+        return os.path.exists(self.version_path(version))
+
+    # -- 不变列 --
+    def _save_base(self, data: List[Dict[str, Any]]) -> str:
+        base_columns = {name: [entry.get(name) for entry in data] for name in BASE_COLUMNS}
+        digest = hashlib.sha1()
+        for name in BASE_COLUMNS:
+            digest.update(_column_hash(base_columns[name]).encode('ascii'))
+        base_id = digest.hexdigest()[:16]
+        base_path = os.path.join(self.store_dir, f"base_{base_id}.bin")
+        if not os.path.exists(base_path):
+            _write_table(base_path, base_columns, {"rows": len(data)})
+        self._base_cache[base_id] = base_columns
+        return base_id
+
+    def _load_base(self, base_id: str, columns: Iterable[str] = None) -> Dict[str, List[Optional[str]]]:
+        cached = self._base_cache.get(base_id)
+        if cached is not None:
+            return cached
+        _, base_columns = _read_table(os.path.join(self.store_dir, f"base_{base_id}.bin"), columns)
+        if columns is None:
+            self._base_cache[base_id] = base_columns
+        return base_columns
+
+    # -- 版本列 --
+    def _parent_text(self, version: int, base_id: str):
+        """返回 (上一版本的译文列, 其哈希)；上一版本不存在或行不一致时返回 (None, None)。"""
+        if version <= 1 or not self.has_version(version - 1):
+            return None, None
+        metadata, columns = _read_table(self.version_path(version - 1), [TEXT_COLUMN])
+        if metadata.get('base') != base_id:
+            return None, None
+        return columns[TEXT_COLUMN], metadata.get('text_hash')
+
+    def save(self, version: int, data: List[Dict[str, Any]]) -> str:
+        """保存一个版本，返回 vN.col 路径。若下一版本依赖本版本的译文，会同步更新其覆盖项。"""
+        os.makedirs(self.store_dir, exist_ok=True)
+        texts = [entry.get(TEXT_COLUMN) for entry in data]
+        text_hash = _column_hash(texts)
+        # 下一版本的 translated_text 由本版本译文推导；本版本译文变化时先取出下一版本，写完后重新保存
+        child = self.load(version + 1) if self._child_depends_on(version, text_hash) else None
+
+        base_id = self._save_base(data)
+        parent_texts, parent_hash = self._parent_text(version, base_id)
+        derived = parent_texts if parent_texts is not None else texts
+        override_index, override_text = [], [] # 行号以字符串形式存为一列
+        for i, entry in enumerate(data):
+            value = entry.get(INPUT_COLUMN)
+            if value != derived[i]:
+                override_index.append(str(i))
+                override_text.append(value)
+
+        metadata = {
+            "version": version,
+            "base": base_id,
+            "rows": len(data),
+            "text_hash": text_hash,
+            "parent_hash": parent_hash, # 推导 translated_text 时依赖的上一版本译文
+        }
+        path = self.version_path(version)
+        _write_table(path, {
+            TEXT_COLUMN: texts,
+            OVERRIDE_INDEX_COLUMN: override_index,
+            OVERRIDE_TEXT_COLUMN: override_text,
+        }, metadata)
+
+        if child is not None:
+            self.save(version + 1, child)
+        return path
+
+    def _child_depends_on(self, version: int, new_text_hash: str) -> bool:
+        """下一版本是否依赖本版本的译文，且本次保存会改变它。"""
+        if not self.has_version(version + 1):
+            return False
+        metadata, _ = _read_table(self.version_path(version + 1), [])
+        return metadata.get('parent_hash') not in (None, new_text_hash)
+
+    def load(self, version: int, columns: Iterable[str] = None) -> List[Dict[str, Any]]:
+        """
+        读取一个版本，返回与 JSON 版本文件相同结构的条目列表。
+        columns 可只选取需要的字段 (例如 import_data 只需要 key / zh_filepath / 译文)。
+        """
+        wanted = list(columns) if columns is not None else BASE_COLUMNS + [INPUT_COLUMN, TEXT_COLUMN]
+        metadata, version_columns = _read_table(self.version_path(version))
+        base_columns = self._load_base(metadata['base'])
+        texts = version_columns[TEXT_COLUMN]
+
+        result_columns = {name: base_columns[name] for name in wanted if name in base_columns}
+        if TEXT_COLUMN in wanted:
+            result_columns[TEXT_COLUMN] = texts
+        if INPUT_COLUMN in wanted:
+            if metadata.get('parent_hash') is not None:
+                parent_texts, parent_hash = self._parent_text(version, metadata['base'])
+                if parent_hash != metadata['parent_hash']:
+                    raise ValueError(f"v{version} 依赖的 v{version - 1} 已被修改，无法还原 translated_text。")
+                inputs = list(parent_texts)
+            else:
+                inputs = list(texts)
+            for index, value in zip(version_columns[OVERRIDE_INDEX_COLUMN], version_columns[OVERRIDE_TEXT_COLUMN]):
+                inputs[int(index)] = value
+            result_columns[INPUT_COLUMN] = inputs
+
+        # 按 JSON 文件中的字段顺序组装
+        order = [name for name in BASE_COLUMNS + [INPUT_COLUMN, TEXT_COLUMN] if name in result_columns]
+        return [
+            {name: result_columns[name][i] for name in order}
+            for i in range(metadata['rows'])
+        ]
+
+    # -- JSON 兼容 --
+    def import_json(self, json_path: str, version: int) -> str:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return self.save(version, data)
+
+    def export_json(self, version: int, json_path: str) -> str:
+        data = self.load(version)
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        return json_path
+
+
+if __name__ == "__main__":
+    from localization_core import init_config, get_config, get_version_catalog
+
+    init_config()
+    parser = argparse.ArgumentParser(description="版本文件的列式存储 (导入/导出 JSON)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('import', help="把 data/ 下所有 JSON 版本文件导入列式存储")
+    export_parser = subparsers.add_parser('export', help="把某个版本导出为 JSON")
+    export_parser.add_argument('--version', type=int, required=True)
+    export_parser.add_argument('--output', default=None, help="输出路径 (默认: data/ 下的标准文件名)")
+    args = parser.parse_args()
+
+    store = VersionStore(get_config('VERSION_STORE_DIR') or "./data/store/")
+    format_string = get_config('TRANSLATED_FILE_FORMAT')
+    if args.command == 'import':
+        pattern = re.compile(format_string.replace('{}', r'(\d+)').replace('.', r'\.') + '$')
+        found = sorted(
+            (int(match.group(1)), filename)
+            for filename in os.listdir("./data/")
+            for match in [pattern.match(filename)] if match
+        )
+        for version, filename in found:
+            path = store.import_json(os.path.join("./data/", filename), version)
+            get_version_catalog().relocate(version, path) # 同一版本优先使用列式存储
+            print(f"-> v{version}: {filename} ({os.path.getsize(os.path.join('./data/', filename)) / 1e6:.1f} MB) "
+                  f"-> {path} ({os.path.getsize(path) / 1e6:.2f} MB)")
+        print(f"✅ 已导入 {len(found)} 个版本。")
+    else:
+        if not store.has_version(args.version):
+            print(f"[错误] 列式存储中不存在版本 v{args.version}。")
+            exit(1)
+        output = args.output or os.path.join("./data/", format_string.format(args.version))
+        store.export_json(args.version, output)
+        print(f"✅ v{args.version} 已导出到 {output}。")